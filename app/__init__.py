@@ -1,10 +1,17 @@
+import sqlite3
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import make_transient_to_detached
+from app.cache import TTLCache
 from app.config import Config
 
 db = SQLAlchemy()
 login_manager = LoginManager()
+# Снимки пользователей сессии по id: load_user не ходит в базу на каждый запрос
+user_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
 
 
 def create_app(config=None):
@@ -14,25 +21,121 @@ def create_app(config=None):
     app.config.from_mapping(
         SECRET_KEY='dev',
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        # Порог "заканчивается" для автоматического списка покупок:
+        # сначала по категории, затем по единице измерения, иначе общий
+        LOW_STOCK_THRESHOLD=2,
+        LOW_STOCK_THRESHOLDS_BY_CATEGORY={},
+        LOW_STOCK_THRESHOLDS_BY_UNIT={"г": 200, "мл": 200},
+        DB_POOL_SIZE=Config.DB_POOL_SIZE,
+        DB_MAX_OVERFLOW=Config.DB_MAX_OVERFLOW,
+        DB_POOL_TIMEOUT=Config.DB_POOL_TIMEOUT,
+        DB_POOL_RECYCLE=Config.DB_POOL_RECYCLE,
+        DB_POOL_PRE_PING=Config.DB_POOL_PRE_PING,
+        USER_CACHE_TTL=Config.USER_CACHE_TTL,
+        USER_CACHE_SIZE=Config.USER_CACHE_SIZE,
+        INSTRUMENTATION=Config.INSTRUMENTATION,
+        PAGE_CACHE_MAX_BYTES=Config.PAGE_CACHE_MAX_BYTES,
+        PAGE_CACHE_TTL=Config.PAGE_CACHE_TTL,
+        PAGE_CACHE_URL=Config.PAGE_CACHE_URL,
+        PASSWORD_HASH_METHOD=Config.PASSWORD_HASH_METHOD,
+        PASSWORD_HASH_WORKERS=Config.PASSWORD_HASH_WORKERS,
+        PASSWORD_HASH_QUEUE=Config.PASSWORD_HASH_QUEUE,
+        PASSWORD_HASH_TIMEOUT=Config.PASSWORD_HASH_TIMEOUT,
+        LOGIN_IP_BURST=Config.LOGIN_IP_BURST,
+        LOGIN_IP_PER_MINUTE=Config.LOGIN_IP_PER_MINUTE,
+        LOGIN_ACCOUNT_BURST=Config.LOGIN_ACCOUNT_BURST,
+        LOGIN_ACCOUNT_PER_MINUTE=Config.LOGIN_ACCOUNT_PER_MINUTE,
+        EVENTS_BACKEND=Config.EVENTS_BACKEND,
+        EVENTS_MAX_STREAMS=Config.EVENTS_MAX_STREAMS,
+        EVENTS_QUEUE_SIZE=Config.EVENTS_QUEUE_SIZE,
+        EVENTS_KEEPALIVE=Config.EVENTS_KEEPALIVE,
+        QUERY_BUDGETS={},
     )
 
     
     if config:
         app.config.update(config)
 
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+    user_cache.ttl = app.config["USER_CACHE_TTL"]
+    user_cache.maxsize = app.config["USER_CACHE_SIZE"]
+
     db.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = "auth.login"
 
-    from app import routes, auth, models  
+    from app import routes, auth, api, models  
 
     app.register_blueprint(routes.main)
     app.register_blueprint(auth.auth)
+    app.register_blueprint(api.api)
+
+    from app.pagecache import init_page_cache
+    init_page_cache(app)
+
+    from app.passwords import init_password_hasher
+    from app.ratelimit import init_login_limits
+    init_password_hasher(app)
+    init_login_limits(app)
+
+    from app.realtime import init_events
+    init_events(app)
+
+    if app.config["INSTRUMENTATION"]:
+        from app.instrumentation import init_instrumentation
+        init_instrumentation(app)
 
     return app
 
 
+def engine_options(config):
+    # SQLite (разработка, тесты) использует собственные пулы без этих параметров
+    if str(config.get("SQLALCHEMY_DATABASE_URI", "")).startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+
+def dispose_engines(app):
+    """Сбрасывает пул соединений, унаследованный от родительского процесса (после fork)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
 @login_manager.user_loader
 def load_user(user_id):
     from app.models import User
-    return User.query.get(int(user_id))
\ No newline at end of file
+    user_id = int(user_id)
+    cached = user_cache.get(user_id)
+    if cached is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        # Отдельный снимок: объект запроса может быть изменен или сброшен при commit
+        cached = User(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            password_hash=user.password_hash,
+            date_joined=user.date_joined,
+        )
+        make_transient_to_detached(cached)
+        user_cache.set(user_id, cached)
+        return user
+    # Присоединяем копию снимка к сессии запроса без SELECT
+    return db.session.merge(cached, load=False)
+
+
+@event.listens_for(Engine, "connect")
+def sqlite_unicode_lower(dbapi_connection, connection_record):
+    # Встроенный lower() в SQLite меняет регистр только у ASCII, а названия продуктов - кириллица
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function(
+            "lower", 1, lambda value: value.lower() if isinstance(value, str) else value, deterministic=True
+        )
@@ -0,0 +1,269 @@
+"""
+Аналитика порчи и потребления продуктов по журналу событий.
+
+Воркер (worker.py) пересчитывает дневные итоги waste_rollup по категориям
+пользователя: колонки журнала (вместе с архивом) читаются пачками прямо в
+массивы NumPy, группировка и суммы считаются векторно, ORM-объекты не
+создаются. Пересчитываются только пользователи, у которых с прошлого прохода
+появились события (отметка в worker_state), первый проход считает всех.
+Страница статистики читает готовые итоги (waste_report).
+
+Семантика совпадает с Product и app/events.py:
+    added        - событие added, день записи
+    consumed     - событие consumed (съеден), день удаления
+    discarded    - событие discarded (выброшен), день удаления
+    expired      - событие expired, день expiry_date
+    срок жизни   - days_in_fridge на момент удаления (целые дни вниз)
+    days_left    - days_until_expiry на момент удаления (целые дни к нулю)
+    доля отходов - discarded / (consumed + discarded)
+"""
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+from app import db
+from app.events import KIND_CODES, iter_events
+from app.models import ProductEvent, WasteRollup, WorkerState
+from app.pagecache import bump_data_version
+from app.utils import request_now
+
+WORKER_NAME = "waste_rollup"
+
+# Виды событий в итогах (edited не влияет на порчу и потребление)
+ROLLUP_KINDS = ("added", "consumed", "expired", "discarded")
+ROLLUP_FIELDS = (*ROLLUP_KINDS, "lifetimes", "fridge_days", "days_left")
+ANALYTICS_COLUMNS = ("user_id", "kind", "occurred_at", "category", "expiry_date", "date_added")
+
+LOAD_CHUNK = 50_000
+WRITE_BATCH = 5000
+# Транзакция веб-процесса может зафиксироваться позже отметки воркера
+LATE_COMMIT_MARGIN = timedelta(minutes=10)
+
+DAILY_DAYS = 30
+WEEKLY_WEEKS = 12
+
+DAY = np.timedelta64(1, "D")
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+NAT = np.iinfo(np.int64).min
+
+
+def datetime_column(values):
+    # naive UTC -> datetime64[us], None -> NaT; в разы быстрее np.array(values, dtype="datetime64[us]")
+    return np.fromiter(
+        (NAT if value is None else (value - EPOCH) // MICROSECOND for value in values),
+        dtype=np.int64, count=len(values),
+    ).view("datetime64[us]")
+
+
+def load_columns(user_ids=None, chunk_size=LOAD_CHUNK):
+    """
+    Читает колонки журнала событий в массивы NumPy
+
+    Args:
+        user_ids: ID пользователей (None - все пользователи)
+        chunk_size: размер пачки чтения
+
+    Returns:
+        tuple: (словарь массивов user_id, kind, category, occurred_at, expiry_date,
+                date_added; список названий категорий по коду category)
+    """
+    codes = {}
+    parts = []
+    for user_id in (user_ids if user_ids is not None else [None]):
+        chunks = iter_events(user_id=user_id, kinds=ROLLUP_KINDS, chunk_size=chunk_size, columns=ANALYTICS_COLUMNS)
+        for rows in chunks:
+            _, users, kind, occurred_at, categories, expiry_date, date_added = zip(*rows)
+            parts.append({
+                "user_id": np.array(users, dtype=np.int64),
+                "kind": np.array(kind, dtype=np.int8),
+                "category": np.fromiter(
+                    (codes.setdefault(category, len(codes)) for category in categories),
+                    dtype=np.int64, count=len(rows),
+                ),
+                "occurred_at": datetime_column(occurred_at),
+                "expiry_date": datetime_column(expiry_date),
+                "date_added": datetime_column(date_added),
+            })
+    columns = {
+        name: np.concatenate([part[name] for part in parts]) if parts else np.array([], dtype=dtype)
+        for name, dtype in (("user_id", np.int64), ("kind", np.int8), ("category", np.int64),
+                            ("occurred_at", "datetime64[us]"), ("expiry_date", "datetime64[us]"),
+                            ("date_added", "datetime64[us]"))
+    }
+    return columns, list(codes)
+
+
+def aggregate(columns):
+    """
+    Группирует события по (пользователь, категория, день)
+
+    Args:
+        columns: массивы из load_columns()
+
+    Returns:
+        dict: массивы user_id, category, day и ROLLUP_FIELDS по группам
+    """
+    kind, occurred_at = columns["kind"], columns["occurred_at"]
+    expiry_date, date_added = columns["expiry_date"], columns["date_added"]
+
+    # Момент события: для expired - сам срок годности
+    is_expired = kind == KIND_CODES["expired"]
+    moment = np.where(is_expired & ~np.isnat(expiry_date), expiry_date, occurred_at)
+    day = moment.astype("datetime64[D]").astype(np.int64)
+    user_id, category = columns["user_id"], columns["category"]
+
+    order = np.lexsort((day, category, user_id))
+    user_id, category, day = user_id[order], category[order], day[order]
+    starts = np.ones(len(order), dtype=bool)
+    starts[1:] = (user_id[1:] != user_id[:-1]) | (category[1:] != category[:-1]) | (day[1:] != day[:-1])
+    groups = np.empty(len(order), dtype=np.int64)
+    groups[order] = np.cumsum(starts) - 1
+    size = int(starts.sum())
+
+    result = {
+        "user_id": user_id[starts],
+        "category": category[starts],
+        "day": day[starts].astype("datetime64[D]"),
+    }
+    for name in ROLLUP_KINDS:
+        result[name] = np.bincount(groups[kind == KIND_CODES[name]], minlength=size)
+
+    # Срок жизни - по съеденным и выброшенным продуктам с известными датами
+    removed = (kind == KIND_CODES["consumed"]) | (kind == KIND_CODES["discarded"])
+    lifetime = removed & ~np.isnat(date_added) & ~np.isnat(expiry_date)
+    in_fridge = (occurred_at[lifetime] - date_added[lifetime]) // DAY
+    left = expiry_date[lifetime] - occurred_at[lifetime]
+    days_left = np.where(left >= np.timedelta64(0), left // DAY, -(-left // DAY))
+    result["lifetimes"] = np.bincount(groups[lifetime], minlength=size)
+    result["fridge_days"] = np.bincount(groups[lifetime], weights=in_fridge, minlength=size)
+    result["days_left"] = np.bincount(groups[lifetime], weights=days_left, minlength=size)
+    return result
+
+
+def write_rollups(user_ids, rollups, categories):
+    """Заменяет итоги пользователей (None - всех) новыми в текущей транзакции."""
+    table = WasteRollup.__table__
+    if user_ids is None:
+        db.session.execute(delete(table))
+    else:
+        db.session.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+
+    names = ("user_id", "category", "day", *ROLLUP_FIELDS)
+    rows = [dict(zip(names, values)) for values in zip(*(rollups[name].tolist() for name in names))]
+    for row in rows:
+        row["category"] = categories[row["category"]]
+    for start in range(0, len(rows), WRITE_BATCH):
+        db.session.execute(insert(table), rows[start:start + WRITE_BATCH])
+    return len(rows)
+
+
+def rebuild_rollups(user_ids=None):
+    """
+    Пересчитывает итоги пользователей по журналу событий (без commit)
+
+    Returns:
+        int: количество записанных строк итогов
+    """
+    if user_ids is not None:
+        user_ids = sorted(user_ids)
+    columns, categories = load_columns(user_ids)
+    return write_rollups(user_ids, aggregate(columns), categories)
+
+
+def refresh_rollups(clock=datetime.utcnow, margin=LATE_COMMIT_MARGIN):
+    """
+    Проход воркера: пересчитывает итоги пользователей с новыми событиями
+
+    Версии данных этих пользователей увеличиваются в той же транзакции,
+    чтобы кэш страницы статистики увидел новые итоги.
+
+    Returns:
+        int: количество записанных строк итогов
+    """
+    now = clock()
+    state = db.session.get(WorkerState, WORKER_NAME)
+    user_ids = None
+    if state is not None:
+        user_ids = db.session.scalars(
+            select(ProductEvent.user_id).where(ProductEvent.occurred_at >= state.watermark - margin).distinct()
+        ).all()
+    written = rebuild_rollups(user_ids) if user_ids is None or user_ids else 0
+    if user_ids is None:
+        user_ids = db.session.scalars(select(WasteRollup.user_id).distinct()).all()
+    # Итоги показываются на кэшированной странице статистики
+    for user_id in sorted(user_ids):
+        bump_data_version(user_id)
+    if state is None:
+        db.session.add(WorkerState(name=WORKER_NAME, watermark=now))
+    else:
+        state.watermark = now
+    db.session.commit()
+    return written
+
+
+def summarize(added=0, consumed=0, expired=0, discarded=0, lifetimes=0, fridge_days=0.0, days_left=0.0):
+    removed = consumed + discarded
+    return {
+        "added": added,
+        "consumed": consumed,
+        "expired": expired,
+        "discarded": discarded,
+        "avg_shelf_life": round(fridge_days / lifetimes, 1) if lifetimes else None,
+        "avg_days_left": round(days_left / lifetimes, 1) if lifetimes else None,
+        "waste_rate": round(discarded / removed, 3) if removed else None,
+    }
+
+
+def waste_report(user_id, today=None, days=DAILY_DAYS, weeks=WEEKLY_WEEKS):
+    """
+    Аналитика порчи пользователя из готовых итогов waste_rollup
+
+    Args:
+        user_id: ID пользователя
+        today: текущий день UTC (по умолчанию день запроса)
+        days: длина дневного ряда
+        weeks: длина недельного ряда (недели с понедельника)
+
+    Returns:
+        dict: total и categories (итоги за все время с avg_shelf_life, avg_days_left,
+              waste_rate), daily и weekly (ряды с нулями в пустые дни)
+    """
+    today = today or request_now().date()
+    sums = [func.sum(getattr(WasteRollup, name)) for name in ROLLUP_FIELDS]
+    scope = WasteRollup.user_id == user_id
+
+    totals = dict.fromkeys(ROLLUP_FIELDS, 0)
+    categories = []
+    for category, *values in db.session.execute(
+        select(WasteRollup.category, *sums).where(scope).group_by(WasteRollup.category)
+    ):
+        values = dict(zip(ROLLUP_FIELDS, values))
+        for name in ROLLUP_FIELDS:
+            totals[name] += values[name]
+        categories.append(dict(summarize(**values), category=category))
+    categories.sort(key=lambda row: (-row["added"], row["category"]))
+
+    first_week = today - timedelta(days=today.weekday() + 7 * (weeks - 1))
+    first_day = today - timedelta(days=days - 1)
+    since = min(first_week, first_day)
+    by_day = {
+        day: dict(zip(ROLLUP_KINDS, values))
+        for day, *values in db.session.execute(
+            select(WasteRollup.day, *sums[:len(ROLLUP_KINDS)])
+            .where(scope, WasteRollup.day >= since, WasteRollup.day <= today)
+            .group_by(WasteRollup.day)
+        )
+    }
+
+    def point(start, length):
+        counts = [by_day.get(start + timedelta(days=offset), {}) for offset in range(length)]
+        return {name: sum(count.get(name, 0) for count in counts) for name in ROLLUP_KINDS}
+
+    return {
+        "total": summarize(**totals),
+        "categories": categories,
+        "daily": [dict(point(first_day + timedelta(days=i), 1), day=first_day + timedelta(days=i))
+                  for i in range(days)],
+        "weekly": [dict(point(first_week + timedelta(weeks=i), 7), week=first_week + timedelta(weeks=i))
+                   for i in range(weeks)],
+    }
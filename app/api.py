@@ -0,0 +1,217 @@
+from flask import Blueprint, Response, current_app, request, jsonify, abort, stream_with_context
+from flask_login import login_required, current_user
+from app import db
+from app.models import ShoppingItem
+from app.categories import category_names
+from app.repository import ProductRepository, PAGE_ORDERS
+from app.stats import get_statistics, invalidate_statistics
+from app.bulk import FORMATS, ProductImportError, export_products, import_products
+from app.shopping import ShoppingItemError, apply_batch, parse_item, update_item
+from app.frequency import running_out, top_items
+from app.search import search_products
+from app.realtime import EventStreamsBusy, event_stream, events_broker
+
+api = Blueprint("api", __name__, url_prefix="/api")
+
+MAX_PAGE_SIZE = 200
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def page_args(default_order="expiry", default_limit=50):
+    # Общие параметры постраничного вывода: order, after, limit
+    order = request.args.get("order", default_order)
+    if order not in PAGE_ORDERS:
+        abort(400, f"order должен быть одним из: {', '.join(PAGE_ORDERS)}")
+    limit = request.args.get("limit", default_limit, type=int)
+    return order, request.args.get("after") or None, max(1, min(limit, MAX_PAGE_SIZE))
+
+
+@api.route("/products")
+@login_required
+def products():
+    order, after, limit = page_args()
+    repo = ProductRepository(current_user.id)
+    try:
+        rows, next_cursor = repo.page(order=order, after=after, limit=limit)
+    except ValueError as e:
+        abort(400, str(e))
+
+    response = jsonify({
+        "items": [row.to_dict() for row in rows],
+        "next": next_cursor,
+    })
+    # ETag по содержимому страницы: клиент с If-None-Match получает 304 без тела
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@api.route("/statistics")
+@login_required
+def statistics():
+    stats = get_statistics(current_user.id)
+    waste = stats["waste"]
+    response = jsonify({
+        "categories": [{"category": category, "count": count} for category, count in stats["categories"]],
+        "ranks": [{"rank": rank, "count": count} for rank, count in stats["ranks"]],
+        "longest_living": stats["longest_living"],
+        "next": stats["next_cursor"],
+        "waste": {
+            "total": waste["total"],
+            "categories": waste["categories"],
+            "daily": [dict(point, day=point["day"].isoformat()) for point in waste["daily"]],
+            "weekly": [dict(point, week=point["week"].isoformat()) for point in waste["weekly"]],
+        },
+    })
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def bulk_format():
+    # Формат из ?format=..., иначе по Content-Type запроса
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = "ndjson" if request.mimetype in ("application/x-ndjson", "application/json") else "csv"
+    if fmt not in FORMATS:
+        abort(400, f"format должен быть одним из: {', '.join(FORMATS)}")
+    return fmt
+
+
+@api.route("/products/import", methods=["POST"])
+@login_required
+def import_products_view():
+    fmt = bulk_format()
+    try:
+        imported = import_products(request.stream, fmt, current_user.id)
+    except ProductImportError as e:
+        return jsonify({"imported": 0, "errors": e.errors}), 400
+    invalidate_statistics(current_user.id)
+    return jsonify({"imported": imported})
+
+
+@api.route("/products/export")
+@login_required
+def export_products_view():
+    fmt = bulk_format()
+    response = Response(
+        stream_with_context(export_products(current_user.id, fmt)),
+        mimetype=MIMETYPES[fmt],
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename=products.{fmt}"
+    return response
+
+
+@api.route("/products/search")
+@login_required
+def search_products_view():
+    # Автодополнение названий: ?q=<начало или часть названия>&limit=10
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", 10, type=int)
+    return jsonify({"query": query, "results": search_products(current_user.id, query, limit)})
+
+
+@api.route("/events")
+@login_required
+def events():
+    # Поток server-sent events: дельты продуктов и списка покупок пользователя после каждого commit
+    broker = events_broker()
+    try:
+        subscription = broker.subscribe(current_user.id)
+    except EventStreamsBusy:
+        response = jsonify({"error": "Слишком много открытых потоков обновлений"})
+        response.status_code = 503
+        response.headers["Retry-After"] = "60"
+        return response
+    # Без stream_with_context: контекст запроса и сессия базы закрываются до начала потока
+    response = Response(
+        event_stream(broker, subscription, keepalive=current_app.config["EVENTS_KEEPALIVE"]),
+        mimetype="text/event-stream",
+    )
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    response.headers["Cache-Control"] = "no-cache"
+    # nginx не должен буферизовать поток
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@api.route("/shopping_items/batch", methods=["POST"])
+@login_required
+def shopping_items_batch():
+    data = request.get_json(silent=True)
+    try:
+        result = apply_batch(current_user.id, data.get("operations") if isinstance(data, dict) else None)
+    except ShoppingItemError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    return jsonify(dict(result, success=True))
+
+
+def conditional_json(payload):
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@api.route("/shopping_items")
+@login_required
+def shopping_items():
+    items = (
+        ShoppingItem.query.filter_by(user_id=current_user.id)
+        .order_by(ShoppingItem.priority, ShoppingItem.is_purchased, ShoppingItem.id)
+        .all()
+    )
+    return conditional_json({"items": [item.to_dict() for item in items]})
+
+
+@api.route("/shopping_items", methods=["POST"])
+@login_required
+def create_shopping_item():
+    try:
+        values = parse_item(request.get_json(silent=True) or {})
+    except ShoppingItemError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    item = ShoppingItem(user_id=current_user.id, is_purchased=False, **values)
+    db.session.add(item)
+    db.session.commit()
+    return jsonify({"success": True, "item": item.to_dict()}), 201
+
+
+@api.route("/shopping_items/<int:id>", methods=["PATCH"])
+@login_required
+def update_shopping_item(id):
+    try:
+        item = update_item(current_user.id, id, request.get_json(silent=True))
+    except ShoppingItemError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    if item is None:
+        abort(404)
+    return jsonify({"success": True, "item": item.to_dict()})
+
+
+@api.route("/shopping_items/<int:id>", methods=["DELETE"])
+@login_required
+def delete_shopping_item(id):
+    item = db.session.get(ShoppingItem, id)
+    if item is None or item.user_id != current_user.id:
+        abort(404)
+    db.session.delete(item)
+    db.session.commit()
+    return jsonify({"success": True, "deleted": id})
+
+
+@api.route("/shopping_items/categories")
+@login_required
+def shopping_item_categories():
+    # Загружается страницей списка покупок отдельно, только для выпадающего списка формы
+    return conditional_json({"categories": category_names(current_user.id)})
+
+
+@api.route("/shopping_items/suggestions")
+@login_required
+def shopping_item_suggestions():
+    return conditional_json({
+        "popular": top_items(current_user.id, limit=10),
+        "restock": running_out(current_user.id, horizon_days=3, limit=10),
+    })
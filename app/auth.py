@@ -1,12 +1,23 @@
 # auth.py
-from flask import Blueprint, render_template, redirect, url_for, flash, request
-from app import db
+import math
+from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response
+from app import db, user_cache
 from app.models import User
-from flask_login import login_user, logout_user, login_required
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.passwords import PasswordHasherBusy, password_hasher
+from app.ratelimit import limit_login
+from flask_login import login_user, logout_user, login_required, current_user
 
 auth = Blueprint("auth", __name__)
 
+BUSY_MESSAGE = "Сервер перегружен, попробуйте еще раз через несколько секунд"
+
+
+def retry_later(template, message, status, retry_after):
+    flash(message)
+    response = make_response(render_template(template), status)
+    response.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
 
 @auth.route("/register", methods=["GET", "POST"])
 def register():
@@ -27,8 +38,12 @@ def register():
             flash("Пользователь с таким именем или email уже существует")
             return redirect(url_for("auth.register"))
 
-        new_user = User(username=username, email=email)
-        new_user.set_password(password)
+        try:
+            password_hash = password_hasher().hash(password)
+        except PasswordHasherBusy:
+            return retry_later("register.html", BUSY_MESSAGE, 503, 1)
+
+        new_user = User(username=username, email=email, password_hash=password_hash)
         db.session.add(new_user)
         db.session.commit()
         flash("Регистрация прошла успешно. Теперь вы можете войти.")
@@ -41,10 +56,27 @@ def login():
     if request.method == "POST":
         username_or_email = request.form.get("username_or_email")
         password = request.form.get("password")
+        # Лимит проверяется до поиска пользователя и хэширования пароля
+        retry_after = limit_login(username_or_email)
+        if retry_after:
+            message = f"Слишком много попыток входа. Попробуйте через {math.ceil(retry_after)} с"
+            return retry_later("login.html", message, 429, retry_after)
         user = User.query.filter(
             (User.username == username_or_email) | (User.email == username_or_email)
         ).first()
-        if user and user.check_password(password):
+        hasher = password_hasher()
+        verified = False
+        try:
+            verified = user is not None and hasher.verify(user.password_hash, password)
+            if verified and hasher.needs_rehash(user.password_hash):
+                # Параметры хэширования изменились: пересчитываем хэш, пока пароль известен
+                user.password_hash = hasher.hash(password)
+                db.session.commit()
+        except PasswordHasherBusy:
+            if not verified:
+                return retry_later("login.html", BUSY_MESSAGE, 503, 1)
+            # Не удалось только пересчитать хэш: повторим при следующем входе
+        if verified:
             login_user(user)
             flash("Вы успешно вошли в систему")
             return redirect(url_for("main.index"))
@@ -56,6 +88,7 @@ def login():
 @auth.route("/logout")
 @login_required
 def logout():
+    user_cache.delete(current_user.id)
     logout_user()
     flash("Вы вышли из системы")
     return redirect(url_for("auth.login"))
@@ -0,0 +1,207 @@
+"""
+Потоковый импорт и экспорт продуктов в CSV и NDJSON.
+
+Импорт читает тело запроса построчно, проверяет каждую строку и вставляет
+продукты пачками (executemany) в одной транзакции. Экспорт - генератор,
+который читает продукты keyset-страницами, поэтому память не растет с
+размером файла.
+"""
+import csv
+import io
+import json
+import math
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import and_, insert, or_
+from app import db
+from app.models import Product
+from app.frequency import record_added
+from app.categories import adjust_categories
+from app.events import log_events
+from app.pagecache import bump_data_version
+from app.realtime import publish_resync
+from app.utils import as_utc
+
+FORMATS = ("csv", "ndjson")
+FIELDS = ("name", "category", "quantity", "unit", "expiry_date", "date_added")
+REQUIRED = ("name", "category", "quantity", "unit", "expiry_date")
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+
+
+class ProductImportError(Exception):
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} некорректных строк")
+        self.errors = errors
+
+
+def parse_datetime(value):
+    # Принимает как дату из формы (YYYY-MM-DD), так и ISO datetime из экспорта;
+    # значение со смещением приводится к naive UTC, как хранятся даты в базе
+    return as_utc(datetime.fromisoformat(str(value).strip())).replace(tzinfo=None)
+
+
+def parse_quantity(value):
+    # float() принимает и "nan", "inf", а вставка NaN нарушает ограничения таблицы
+    quantity = float(value)
+    if not math.isfinite(quantity) or quantity <= 0:
+        raise ValueError(f"количество должно быть положительным числом: {value}")
+    return quantity
+
+
+def parse_row(row, user_id):
+    """Проверяет строку импорта и возвращает словарь для вставки; ValueError при ошибке."""
+    missing = [field for field in REQUIRED if row.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"не заполнены поля: {', '.join(missing)}")
+
+    values = {
+        "name": str(row["name"]).strip()[:100],
+        "category": str(row["category"]).strip()[:50],
+        "quantity": parse_quantity(row["quantity"]),
+        "unit": str(row["unit"]).strip()[:20],
+        "expiry_date": parse_datetime(row["expiry_date"]),
+        "user_id": user_id,
+    }
+    if row.get("date_added"):
+        values["date_added"] = parse_datetime(row["date_added"])
+    else:
+        values["date_added"] = datetime.utcnow()
+    return values
+
+
+def read_rows(stream, fmt):
+    """
+    Итератор (номер строки, dict) по бинарному потоку в формате CSV или NDJSON
+
+    Некорректная строка дает (номер строки, исключение) вместо dict. Если
+    файл не читается дальше (не UTF-8, испорченный CSV), это исключение
+    последнее.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    line_num = 0
+    # Текст декодируется лениво, поэтому ошибки кодировки возникают при чтении строк
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text)
+            for row in reader:
+                line_num = reader.line_num
+                yield line_num, row
+        else:
+            for line_num, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_num, e
+                    continue
+                yield line_num, row if isinstance(row, dict) else ValueError("ожидается JSON-объект")
+    except UnicodeDecodeError:
+        yield line_num + 1, ValueError("файл должен быть в кодировке UTF-8")
+    except csv.Error as e:
+        yield line_num + 1, ValueError(f"некорректная строка CSV: {e}")
+
+
+def insert_batch(batch, user_id):
+    ids = db.session.scalars(insert(Product).returning(Product.id, sort_by_parameter_order=True), batch).all()
+    log_events("added", user_id, [dict(row, product_id=id) for row, id in zip(batch, ids)])
+    record_added(user_id, batch)
+    adjust_categories(user_id, Counter(row["category"] for row in batch))
+
+
+def import_products(stream, fmt, user_id):
+    """
+    Импортирует продукты пользователя из потока
+
+    Все строки вставляются в одной транзакции: если хотя бы одна строка
+    некорректна, транзакция откатывается, а остальные строки только
+    проверяются, чтобы вернуть полный список ошибок.
+
+    Returns:
+        int: количество импортированных продуктов
+
+    Raises:
+        ProductImportError: со списком ошибок {"line", "error"}
+    """
+    errors = []
+    batch = []
+    imported = 0
+    try:
+        for line_num, row in read_rows(stream, fmt):
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                values = parse_row(row, user_id)
+            except (ValueError, TypeError) as e:
+                errors.append({"line": line_num, "error": str(e)})
+                batch = []
+                if len(errors) >= MAX_ERRORS:
+                    break
+                continue
+
+            # После первой ошибки импорт уже не состоится: строки не копятся в памяти
+            if errors:
+                continue
+            batch.append(values)
+            if len(batch) >= BATCH_SIZE:
+                insert_batch(batch, user_id)
+                imported += len(batch)
+                batch = []
+
+        if errors:
+            raise ProductImportError(errors)
+        if batch:
+            insert_batch(batch, user_id)
+            imported += len(batch)
+        if imported:
+            bump_data_version(user_id, products=True)
+            publish_resync(user_id, "products")
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return imported
+
+
+def iter_products(user_id, chunk_size=BATCH_SIZE):
+    """Итератор по продуктам пользователя (кортежи FIELDS) keyset-страницами по (expiry_date, id)."""
+    columns = [getattr(Product, field) for field in FIELDS]
+    last = None
+    while True:
+        query = db.session.query(Product.id, *columns).filter(Product.user_id == user_id)
+        if last is not None:
+            query = query.filter(or_(
+                Product.expiry_date > last[0],
+                and_(Product.expiry_date == last[0], Product.id > last[1]),
+            ))
+        rows = query.order_by(Product.expiry_date, Product.id).limit(chunk_size).all()
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:]
+        last = (rows[-1].expiry_date, rows[-1].id)
+
+
+def export_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_products(user_id, fmt):
+    """Генератор фрагментов файла экспорта в формате CSV или NDJSON (по BATCH_SIZE строк)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(FIELDS)
+
+    for count, row in enumerate(iter_products(user_id), start=1):
+        values = [export_value(value) for value in row]
+        if fmt == "csv":
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(FIELDS, values)), ensure_ascii=False) + "\n")
+        if count % BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
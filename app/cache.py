@@ -0,0 +1,71 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Потокобезопасный in-process кэш с ограничением размера (LRU) и временем жизни записей
+
+    Кэш живет в памяти одного процесса: при нескольких воркерах gunicorn
+    инвалидация локальна для воркера, поэтому ttl ограничивает устаревание.
+
+    Args:
+        maxsize: максимальное число записей
+        ttl: время жизни записи в секундах
+        clock: источник времени (для тестов)
+        maxbytes: бюджет памяти в байтах (None - без ограничения)
+        sizeof: размер значения в байтах для maxbytes
+    """
+
+    def __init__(self, maxsize=1024, ttl=300, clock=time.monotonic, maxbytes=None, sizeof=sys.getsizeof):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at, size = entry
+            if expires_at <= self.clock():
+                del self._data[key]
+                self.bytes -= size
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        with self._lock:
+            self._pop(key)
+            if self.maxbytes is not None and size > self.maxbytes:
+                return
+            self._data[key] = (value, self.clock() + (self.ttl if ttl is None else ttl), size)
+            self.bytes += size
+            while len(self._data) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+                self.bytes -= self._data.popitem(last=False)[1][2]
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,143 @@
+"""
+Словарь категорий продуктов пользователя.
+
+Таблица user_category хранит для каждого пользователя его категории и число
+продуктов в каждой. Счетчики меняются в той же транзакции, что и продукты:
+изменения через ORM отслеживаются событием after_flush, массовая вставка
+(импорт) вызывает adjust_categories() явно. Кэш категорий сбрасывается
+только после commit (событие after_commit). Поэтому формы и статистика читают
+O(категорий пользователя) строк по индексу (user_id, name), а не группируют
+все продукты, и не видят категории других пользователей.
+"""
+from collections import Counter
+from sqlalchemy import delete, event, inspect, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from app.cache import TTLCache
+from app.models import Product, UserCategory
+
+# Категории пользователя: [(категория, количество)]; сбрасывается после commit
+# изменения, ttl ограничивает устаревание в других воркерах
+category_cache = TTLCache(maxsize=4096, ttl=300)
+
+
+def invalidate_after_commit(user_id, session=None):
+    # Сброс до commit позволил бы параллельному запросу снова закэшировать старые счетчики
+    session = session or db.session
+    session.info.setdefault("category_users", set()).add(user_id)
+
+
+def adjust_categories(user_id, deltas, connection=None, session=None):
+    """
+    Меняет счетчики продуктов в категориях пользователя в текущей транзакции
+
+    Args:
+        user_id: ID пользователя
+        deltas: {категория: изменение числа продуктов}
+        connection: соединение транзакции (по умолчанию соединение db.session)
+        session: сессия транзакции, после commit которой сбрасывается кэш (по умолчанию db.session)
+    """
+    connection = connection or db.session.connection()
+    table = UserCategory.__table__
+    for name, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        scope = (table.c.user_id == user_id, table.c.name == name)
+        bump = update(table).where(*scope).values(product_count=table.c.product_count + delta)
+        if not connection.execute(bump).rowcount and delta > 0:
+            try:
+                with connection.begin_nested():
+                    connection.execute(insert(table).values(user_id=user_id, name=name, product_count=delta))
+            except IntegrityError:
+                # Строку одновременно вставила параллельная транзакция
+                connection.execute(bump)
+        if delta < 0:
+            connection.execute(delete(table).where(*scope, table.c.product_count <= 0))
+    invalidate_after_commit(user_id, session)
+
+
+def rebuild_categories(user_id):
+    """Пересчитывает категории пользователя по его продуктам (после массовой загрузки в обход ORM)."""
+    table = UserCategory.__table__
+    db.session.execute(delete(table).where(table.c.user_id == user_id))
+    db.session.execute(
+        insert(table).from_select(
+            ["user_id", "name", "product_count"],
+            select(Product.user_id, Product.category, db.func.count())
+            .where(Product.user_id == user_id)
+            .group_by(Product.user_id, Product.category),
+        )
+    )
+    invalidate_after_commit(user_id)
+
+
+def user_categories(user_id):
+    """Категории пользователя с числом продуктов: [(категория, количество)] по убыванию количества."""
+    categories = category_cache.get(user_id)
+    if categories is None:
+        categories = [
+            tuple(row) for row in db.session.execute(
+                select(UserCategory.name, UserCategory.product_count)
+                .where(UserCategory.user_id == user_id)
+                .order_by(UserCategory.product_count.desc(), UserCategory.name)
+            )
+        ]
+        category_cache.set(user_id, categories)
+    return categories
+
+
+def category_names(user_id):
+    """Названия категорий пользователя по алфавиту (для выпадающих списков)."""
+    return sorted(name for name, _ in user_categories(user_id))
+
+
+def product_key(product, history=False):
+    # (user_id, категория) продукта; history=True - значения до изменения
+    if not history:
+        return product.user_id, product.category
+    state = inspect(product)
+    values = []
+    for attr in ("user_id", "category"):
+        added, unchanged, deleted = state.attrs[attr].history
+        values.append((deleted or unchanged or added or [None])[0])
+    return tuple(values)
+
+
+@event.listens_for(Session, "after_flush")
+def track_product_categories(session, flush_context):
+    # new / dirty / deleted здесь еще в состоянии до flush
+    deltas = Counter()
+    for product in session.new:
+        if isinstance(product, Product):
+            deltas[product_key(product)] += 1
+    for product in session.deleted:
+        if isinstance(product, Product):
+            deltas[product_key(product, history=True)] -= 1
+    for product in session.dirty:
+        if isinstance(product, Product) and session.is_modified(product, include_collections=False):
+            old, new = product_key(product, history=True), product_key(product)
+            if old != new:
+                deltas[old] -= 1
+                deltas[new] += 1
+
+    by_user = {}
+    for (user_id, category), delta in deltas.items():
+        if user_id is not None and delta:
+            by_user.setdefault(user_id, {})[category] = delta
+    if by_user:
+        connection = session.connection()
+        for user_id in sorted(by_user):
+            adjust_categories(user_id, by_user[user_id], connection, session)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_categories(session):
+    for user_id in session.info.pop("category_users", ()):
+        category_cache.delete(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def keep_categories(session):
+    # Откаченные счетчики не менялись: кэш остается верным
+    session.info.pop("category_users", None)
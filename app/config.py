@@ -3,4 +3,46 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///fridge_planner.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Пул соединений с PostgreSQL на один процесс (воркер gunicorn)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') not in ('0', 'false', 'False')
+
+    # Кэш пользователя сессии для load_user; USER_CACHE_TTL=0 отключает кэш
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+
+    # Метрики /metrics и заголовок Server-Timing (app/instrumentation.py)
+    INSTRUMENTATION = os.environ.get('INSTRUMENTATION', '0') in ('1', 'true', 'True')
+
+    # Кэш отрендеренных страниц (app/pagecache.py): бюджет памяти на процесс,
+    # максимальное время жизни записи и общее хранилище (redis://...)
+    PAGE_CACHE_MAX_BYTES = int(os.environ.get('PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+    PAGE_CACHE_URL = os.environ.get('PAGE_CACHE_URL', '')
+
+    # Хэширование паролей (app/passwords.py): метод с параметрами, как он записан
+    # в хэше (другой метод пересчитывается при входе), потоки и очередь на процесс
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 8))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+    # Попытки входа (app/ratelimit.py): емкость ведра и пополнение в минуту
+    # для IP-адреса и для учетной записи; емкость 0 отключает лимит
+    LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', 20))
+    LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', 10))
+    LOGIN_ACCOUNT_BURST = int(os.environ.get('LOGIN_ACCOUNT_BURST', 5))
+    LOGIN_ACCOUNT_PER_MINUTE = float(os.environ.get('LOGIN_ACCOUNT_PER_MINUTE', 2))
+
+    # Поток обновлений страниц /api/events (app/realtime.py): брокер (local / postgres,
+    # пусто - по базе), предел открытых потоков на процесс (0 отключает поток),
+    # очередь сообщений потока и пауза между keepalive-комментариями в секундах
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', '')
+    EVENTS_MAX_STREAMS = int(os.environ.get('EVENTS_MAX_STREAMS', 1000))
+    EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+    EVENTS_KEEPALIVE = float(os.environ.get('EVENTS_KEEPALIVE', 15))
@@ -0,0 +1,179 @@
+"""
+Журнал событий продуктов (added / edited / consumed / expired / discarded).
+
+Журнал только дополняется и пишется в той же транзакции, что и изменение
+продукта, поэтому таблица product остается маленькой (удаленные продукты из
+нее по-прежнему удаляются), а история сохраняется для прогнозов и аналитики
+порчи. Событие хранит снимок полей продукта; вид события - код SmallInteger.
+
+Старые события переносятся пачками в product_event_archive (archive_events,
+вызывается воркером), чтобы оперативная часть журнала не росла. Для
+аналитических задач iter_events() читает архив и журнал keyset-страницами по id.
+"""
+from datetime import datetime
+from sqlalchemy import func, insert, literal, select
+from app import db
+from app.models import Notification, Product, ProductEvent, ProductEventArchive
+from app.utils import as_utc
+
+# Код события = позиция в кортеже + 1; коды хранятся в базе, порядок не менять
+EVENT_KINDS = ("added", "edited", "consumed", "expired", "discarded")
+KIND_CODES = {kind: code for code, kind in enumerate(EVENT_KINDS, start=1)}
+
+# Колонки снимка продукта в событии
+SNAPSHOT_FIELDS = ("name", "category", "quantity", "unit", "expiry_date", "date_added")
+EVENT_COLUMNS = ("id", "user_id", "product_id", "kind", "occurred_at", *SNAPSHOT_FIELDS)
+
+CHUNK_SIZE = 5000
+ARCHIVE_BATCH = 5000
+
+
+def naive_utc(value):
+    return as_utc(value).replace(tzinfo=None) if value is not None else None
+
+
+def log_event(kind, product, now=None):
+    """
+    Добавляет событие продукта в текущую транзакцию (без commit)
+
+    У нового продукта должен быть id: вызывать после db.session.flush().
+    """
+    db.session.add(ProductEvent(
+        user_id=product.user_id,
+        product_id=product.id,
+        kind=KIND_CODES[kind],
+        occurred_at=naive_utc(now) or datetime.utcnow(),
+        name=product.name,
+        category=product.category,
+        quantity=product.quantity,
+        unit=product.unit,
+        expiry_date=naive_utc(product.expiry_date),
+        date_added=naive_utc(product.date_added),
+    ))
+
+
+def log_events(kind, user_id, rows, now=None):
+    """
+    Пачка событий одним executemany (массовый импорт)
+
+    Args:
+        kind: вид события
+        user_id: ID пользователя
+        rows: словари с product_id и полями SNAPSHOT_FIELDS
+        now: время события (naive UTC)
+    """
+    now = naive_utc(now) or datetime.utcnow()
+    db.session.execute(insert(ProductEvent), [
+        dict(
+            {field: row.get(field) for field in SNAPSHOT_FIELDS},
+            user_id=user_id, product_id=row["product_id"], kind=KIND_CODES[kind], occurred_at=now,
+        )
+        for row in rows
+    ])
+
+
+def removal_kind(product, reason=None, now=None):
+    """Вид события удаления: явная причина или discarded для просроченного продукта, иначе consumed."""
+    if reason in ("consumed", "discarded"):
+        return reason
+    return "discarded" if product.is_expired(now) else "consumed"
+
+
+def log_expired(after_id, now):
+    """
+    События expired для уведомлений 'expired' с id > after_id (в транзакции сканера сроков)
+
+    Время события - время сканирования (журнал упорядочен по времени записи),
+    момент порчи - expiry_date в снимке.
+    """
+    columns = [getattr(Product, field) for field in SNAPSHOT_FIELDS]
+    expired = (
+        select(
+            Product.user_id,
+            Product.id,
+            literal(KIND_CODES["expired"]),
+            literal(naive_utc(now)),
+            *columns,
+        )
+        .select_from(Notification)
+        .join(Product, Product.id == Notification.product_id)
+        .where(Notification.id > after_id, Notification.kind == "expired")
+        .order_by(Notification.id)
+    )
+    return db.session.execute(
+        insert(ProductEvent).from_select(
+            ["user_id", "product_id", "kind", "occurred_at", *SNAPSHOT_FIELDS], expired
+        )
+    ).rowcount
+
+
+def archive_events(before, batch_size=ARCHIVE_BATCH):
+    """
+    Переносит события, записанные раньше before, в архив пачками по batch_size
+
+    Каждая пачка - отдельная транзакция: INSERT ... SELECT в архив и DELETE
+    из журнала по одному и тому же списку id. occurred_at - время записи,
+    поэтому переносится начало журнала, и id в архиве меньше id в журнале.
+
+    Returns:
+        int: количество перенесенных событий
+    """
+    live, archive = ProductEvent.__table__, ProductEventArchive.__table__
+    moved = 0
+    while True:
+        ids = db.session.scalars(
+            select(live.c.id).where(live.c.occurred_at < before).order_by(live.c.id).limit(batch_size)
+        ).all()
+        if not ids:
+            return moved
+        db.session.execute(
+            insert(archive).from_select(
+                list(EVENT_COLUMNS),
+                select(*(live.c[column] for column in EVENT_COLUMNS)).where(live.c.id.in_(ids)),
+            )
+        )
+        db.session.execute(live.delete().where(live.c.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+
+
+def iter_events(user_id=None, since_id=0, kinds=None, chunk_size=CHUNK_SIZE, archived=True, columns=EVENT_COLUMNS):
+    """
+    Читает журнал событий пачками (сначала архив, затем оперативную часть)
+
+    Args:
+        user_id: только события пользователя (None - всех)
+        since_id: только события с id больше указанного (продолжение чтения)
+        kinds: виды событий (None - все)
+        chunk_size: размер пачки
+        archived: читать ли архив
+        columns: читаемые колонки из EVENT_COLUMNS (id добавляется всегда)
+
+    Yields:
+        list: до chunk_size строк с колонками columns в порядке id
+    """
+    columns = ("id", *(column for column in columns if column != "id"))
+    tables = [ProductEventArchive.__table__] if archived else []
+    tables.append(ProductEvent.__table__)
+    for table in tables:
+        conditions = []
+        if user_id is not None:
+            conditions.append(table.c.user_id == user_id)
+        if kinds:
+            conditions.append(table.c.kind.in_([KIND_CODES[kind] for kind in kinds]))
+        last_id = since_id
+        while True:
+            rows = db.session.execute(
+                select(*(table.c[column] for column in columns))
+                .where(table.c.id > last_id, *conditions)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            yield rows
+            last_id = rows[-1].id
+
+
+def last_notification_id():
+    return db.session.scalar(select(func.max(Notification.id))) or 0
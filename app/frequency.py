@@ -0,0 +1,136 @@
+"""
+Модель частоты покупок для подсказок в списке покупок.
+
+Для каждого пользователя и названия продукта хранится счетчик добавлений с
+экспоненциальным затуханием (период полураспада HALF_LIFE_DAYS) и оценка
+интервала между покупками. Счетчик хранится в виде
+
+    score_key = ln(score) + t / TAU,   t - время последнего добавления в днях,
+
+тогда затухший счетчик в момент T равен exp(score_key - T / TAU), и порядок
+по score_key не зависит от T: top-K - это чтение индекса (user_id, score_key).
+Добавление продукта: score_key = logaddexp(score_key, t / TAU).
+"""
+import math
+from datetime import datetime, timedelta
+from app import db
+from app.models import ItemFrequency
+
+HALF_LIFE_DAYS = 30
+TAU = HALF_LIFE_DAYS / math.log(2)
+# Вес нового интервала в скользящем среднем интервала между покупками
+INTERVAL_ALPHA = 0.3
+EPOCH = datetime(2020, 1, 1)
+
+
+def days(moment):
+    return (moment.replace(tzinfo=None) - EPOCH).total_seconds() / 86400
+
+
+def logaddexp(a, b):
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def decayed_score(item, now=None):
+    now = now or datetime.utcnow()
+    return math.exp(item.score_key - days(now) / TAU)
+
+
+def name_key(name):
+    return name.strip().lower()
+
+
+def record_added(user_id, products, now=None):
+    """
+    Учитывает добавленные продукты; вызывается в транзакции добавления (без commit)
+
+    Args:
+        user_id: ID пользователя
+        products: итерируемое словарей с name, category, unit
+        now: время добавления (naive UTC)
+    """
+    now = (now or datetime.utcnow()).replace(tzinfo=None)
+    batch = {}
+    for product in products:
+        key = name_key(product["name"])
+        count, _ = batch.get(key, (0, None))
+        batch[key] = (count + 1, (product["name"].strip(), product["category"], product["unit"]))
+    if not batch:
+        return
+
+    existing = {
+        item.name_key: item
+        for item in ItemFrequency.query.filter(
+            ItemFrequency.user_id == user_id, ItemFrequency.name_key.in_(batch)
+        )
+    }
+    t = days(now) / TAU
+    for key, (count, (name, category, unit)) in batch.items():
+        item = existing.get(key)
+        if item is None:
+            item = ItemFrequency(user_id=user_id, name_key=key, count=count, score_key=t + math.log(count))
+            db.session.add(item)
+        else:
+            interval = (now - item.last_added).total_seconds() / 86400
+            if interval >= 1 / 24:
+                # Повторное добавление в течение часа - та же покупка, интервал не обновляем
+                item.avg_interval_days = (
+                    interval if item.avg_interval_days is None
+                    else INTERVAL_ALPHA * interval + (1 - INTERVAL_ALPHA) * item.avg_interval_days
+                )
+            item.count += count
+            item.score_key = logaddexp(item.score_key, t + math.log(count))
+        item.name, item.category, item.unit = name, category, unit
+        item.last_added = now
+        if item.avg_interval_days is not None:
+            item.next_restock_at = now + timedelta(days=item.avg_interval_days)
+
+
+def record_consumed(user_id, name, now=None):
+    """Отмечает, что продукт закончился (удален из холодильника); без commit."""
+    now = (now or datetime.utcnow()).replace(tzinfo=None)
+    ItemFrequency.query.filter_by(user_id=user_id, name_key=name_key(name)).update(
+        {"last_consumed": now}, synchronize_session=False
+    )
+
+
+def to_suggestion(item, now):
+    return {
+        "name": item.name,
+        "category": item.category,
+        "unit": item.unit,
+        "frequency": item.count,
+        "score": round(decayed_score(item, now), 3),
+        "next_restock_at": item.next_restock_at.isoformat() if item.next_restock_at else None,
+    }
+
+
+def top_items(user_id, limit=10, now=None):
+    """Часто покупаемые продукты с учетом давности: top-K по индексу (user_id, score_key)."""
+    now = now or datetime.utcnow()
+    items = (
+        ItemFrequency.query.filter(ItemFrequency.user_id == user_id)
+        .order_by(ItemFrequency.score_key.desc())
+        .limit(limit)
+        .all()
+    )
+    return [to_suggestion(item, now) for item in items]
+
+
+def running_out(user_id, horizon_days=3, limit=10, now=None):
+    """
+    Продукты, которые по обычному интервалу покупок пора пополнить в ближайшие horizon_days дней,
+    в порядке ожидаемой даты пополнения
+    """
+    now = now or datetime.utcnow()
+    items = (
+        ItemFrequency.query.filter(
+            ItemFrequency.user_id == user_id,
+            ItemFrequency.next_restock_at <= now + timedelta(days=horizon_days),
+        )
+        .order_by(ItemFrequency.next_restock_at)
+        .limit(limit)
+        .all()
+    )
+    return [to_suggestion(item, now) for item in items]
@@ -0,0 +1,204 @@
+"""
+Инструментирование запросов (включается INSTRUMENTATION=True).
+
+Для каждого запроса измеряются общее время, число и время SQL-запросов
+(события SQLAlchemy) и время рендеринга шаблонов (сигналы Flask). Итоги
+отдаются заголовком Server-Timing и накапливаются по эндпоинтам для
+/metrics в текстовом формате Prometheus. Метрики хранятся в памяти
+процесса: при нескольких воркерах gunicorn каждый отдает свои.
+
+В тестах QUERY_BUDGETS = {"main.index": 6} заставляет запрос, превысивший
+бюджет SQL-запросов, падать с AssertionError; для произвольного кода есть
+контекстный менеджер query_budget().
+"""
+import threading
+import time
+from contextlib import contextmanager
+from flask import Response, current_app, g, has_request_context, request
+from flask import before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Границы корзин гистограммы длительности запроса, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestStats:
+    __slots__ = ("started", "sql_count", "sql_time", "template_time", "_sql_started", "_template_started")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self._sql_started = None
+        self._template_started = None
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def observe(self, endpoint, method, status, duration, stats):
+        with self._lock:
+            entry = self._endpoints.setdefault((endpoint, method), {
+                "requests": {},
+                "seconds": 0.0,
+                "buckets": [0] * len(BUCKETS),
+                "sql_statements": 0,
+                "sql_seconds": 0.0,
+                "template_seconds": 0.0,
+            })
+            entry["requests"][status] = entry["requests"].get(status, 0) + 1
+            entry["seconds"] += duration
+            for number, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    entry["buckets"][number] += 1
+            entry["sql_statements"] += stats.sql_count
+            entry["sql_seconds"] += stats.sql_time
+            entry["template_seconds"] += stats.template_time
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = [
+            "# HELP fridge_requests_total Количество HTTP-запросов",
+            "# TYPE fridge_requests_total counter",
+        ]
+        with self._lock:
+            endpoints = {key: dict(value, requests=dict(value["requests"]), buckets=list(value["buckets"]))
+                         for key, value in self._endpoints.items()}
+
+        def labels(endpoint, method, **extra):
+            pairs = {"endpoint": endpoint, "method": method, **extra}
+            return ",".join(f'{key}="{value}"' for key, value in pairs.items())
+
+        for (endpoint, method), entry in sorted(endpoints.items()):
+            for status, count in sorted(entry["requests"].items()):
+                lines.append(f"fridge_requests_total{{{labels(endpoint, method, status=status)}}} {count}")
+
+        lines += [
+            "# HELP fridge_request_duration_seconds Время обработки запроса",
+            "# TYPE fridge_request_duration_seconds histogram",
+        ]
+        for (endpoint, method), entry in sorted(endpoints.items()):
+            total = sum(entry["requests"].values())
+            for bound, count in zip(BUCKETS, entry["buckets"]):
+                lines.append(f"fridge_request_duration_seconds_bucket{{{labels(endpoint, method, le=bound)}}} {count}")
+            lines.append(f"fridge_request_duration_seconds_bucket{{{labels(endpoint, method, le='+Inf')}}} {total}")
+            lines.append(f"fridge_request_duration_seconds_sum{{{labels(endpoint, method)}}} {entry['seconds']:.6f}")
+            lines.append(f"fridge_request_duration_seconds_count{{{labels(endpoint, method)}}} {total}")
+
+        for name, key, help_text in (
+            ("fridge_sql_statements_total", "sql_statements", "Количество SQL-запросов"),
+            ("fridge_sql_seconds_total", "sql_seconds", "Время выполнения SQL-запросов"),
+            ("fridge_template_seconds_total", "template_seconds", "Время рендеринга шаблонов"),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (endpoint, method), entry in sorted(endpoints.items()):
+                value = entry[key]
+                value = f"{value:.6f}" if isinstance(value, float) else value
+                lines.append(f"{name}{{{labels(endpoint, method)}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+# Открытые query_budget(): каждый собирает выполненные SQL-запросы
+_budgets = []
+
+
+def current_stats():
+    if has_request_context():
+        return g.get("request_stats")
+    return None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is not None:
+        stats._sql_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    if stats is not None and stats._sql_started is not None:
+        stats.sql_count += 1
+        stats.sql_time += time.perf_counter() - stats._sql_started
+        stats._sql_started = None
+    for budget in _budgets:
+        budget.append(statement)
+
+
+def on_before_render(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None:
+        stats._template_started = time.perf_counter()
+
+
+def on_rendered(sender, template, context, **extra):
+    stats = current_stats()
+    if stats is not None and stats._template_started is not None:
+        stats.template_time += time.perf_counter() - stats._template_started
+        stats._template_started = None
+
+
+def start_request():
+    g.request_stats = RequestStats()
+
+
+def finish_request(response):
+    stats = g.pop("request_stats", None)
+    if stats is None or request.endpoint == "metrics":
+        return response
+    duration = time.perf_counter() - stats.started
+    endpoint = request.endpoint or "unknown"
+
+    response.headers["Server-Timing"] = ", ".join((
+        f"app;dur={duration * 1000:.1f}",
+        f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.sql_count} queries"',
+        f"tpl;dur={stats.template_time * 1000:.1f}",
+    ))
+    registry.observe(endpoint, request.method, response.status_code, duration, stats)
+
+    budget = current_app.config.get("QUERY_BUDGETS", {}).get(endpoint)
+    if current_app.testing and budget is not None and stats.sql_count > budget:
+        raise AssertionError(f"{endpoint}: {stats.sql_count} SQL-запросов при бюджете {budget}")
+    return response
+
+
+def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+def init_instrumentation(app):
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    before_render_template.connect(on_before_render, app)
+    template_rendered.connect(on_rendered, app)
+    app.add_url_rule("/metrics", "metrics", metrics)
+
+
+@contextmanager
+def query_budget(limit):
+    """
+    Падает с AssertionError, если код внутри выполнил больше limit SQL-запросов
+
+        with query_budget(4):
+            client.get("/")
+    """
+    statements = []
+    _budgets.append(statements)
+    try:
+        yield statements
+    finally:
+        _budgets.remove(statements)
+    if len(statements) > limit:
+        raise AssertionError(
+            f"{len(statements)} SQL-запросов при бюджете {limit}:\n" + "\n".join(statements)
+        )
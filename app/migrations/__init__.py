@@ -0,0 +1,65 @@
+"""
+Версионные миграции схемы базы данных.
+
+Каждая миграция - модуль vNNNN_<описание>.py в этом пакете с функцией
+upgrade(conn) и строкой DESCRIPTION. Примененные версии записываются в
+таблицу schema_version, поэтому upgrade_database() можно вызывать при
+каждом запуске - выполнятся только новые миграции.
+"""
+import importlib
+import pkgutil
+from datetime import datetime, timezone
+import sqlalchemy as sa
+
+metadata = sa.MetaData()
+
+schema_version = sa.Table(
+    "schema_version",
+    metadata,
+    sa.Column("version", sa.Integer, primary_key=True),
+    sa.Column("description", sa.String(200), nullable=False),
+    sa.Column("applied_at", sa.DateTime, nullable=False),
+)
+
+
+def load_migrations():
+    migrations = []
+    for info in pkgutil.iter_modules(__path__):
+        if info.name.startswith("v") and info.name[1:5].isdigit():
+            module = importlib.import_module(f"{__name__}.{info.name}")
+            migrations.append((int(info.name[1:5]), module))
+    return sorted(migrations, key=lambda m: m[0])
+
+
+def current_version(conn):
+    schema_version.create(conn, checkfirst=True)
+    return conn.execute(sa.select(sa.func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade_database(engine, target=None):
+    """
+    Применяет все непримененные миграции, каждую в отдельной транзакции
+
+    Args:
+        engine: SQLAlchemy engine
+        target: номер версии, до которой обновить схему (по умолчанию - последняя)
+
+    Returns:
+        list: номера примененных версий
+    """
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    applied = []
+    for number, module in load_migrations():
+        if number <= version or (target is not None and number > target):
+            continue
+        with engine.begin() as conn:
+            module.upgrade(conn)
+            conn.execute(schema_version.insert().values(
+                version=number,
+                description=module.DESCRIPTION,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None),
+            ))
+        applied.append(number)
+    return applied
@@ -0,0 +1,49 @@
+"""Исходная схема: user, product, shopping_item (совместима с db_init.sql)."""
+from datetime import datetime, timezone
+import sqlalchemy as sa
+
+DESCRIPTION = "baseline schema"
+
+metadata = sa.MetaData()
+
+user = sa.Table(
+    "user",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("username", sa.String(64), unique=True, nullable=False),
+    sa.Column("email", sa.String(120), unique=True, nullable=False),
+    sa.Column("password_hash", sa.String(256), nullable=False),
+    sa.Column("date_joined", sa.DateTime, default=lambda: datetime.now(timezone.utc)),
+)
+
+product = sa.Table(
+    "product",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("category", sa.String(50), nullable=False),
+    sa.Column("quantity", sa.Float, nullable=False),
+    sa.Column("unit", sa.String(20), nullable=False),
+    sa.Column("expiry_date", sa.DateTime, nullable=False),
+    sa.Column("date_added", sa.DateTime),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=True),
+)
+
+shopping_item = sa.Table(
+    "shopping_item",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("category", sa.String(50), nullable=True),
+    sa.Column("quantity", sa.Float, nullable=True),
+    sa.Column("unit", sa.String(20), nullable=True),
+    sa.Column("priority", sa.Integer),
+    sa.Column("is_purchased", sa.Boolean),
+    sa.Column("date_added", sa.DateTime),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+)
+
+
+def upgrade(conn):
+    # checkfirst: таблицы user и product уже могут быть созданы db_init.sql
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,45 @@
+"""Составные индексы по user_id для основных запросов product и shopping_item."""
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex
+
+DESCRIPTION = "composite indexes for product and shopping_item"
+
+metadata = sa.MetaData()
+
+product = sa.Table(
+    "product",
+    metadata,
+    sa.Column("user_id", sa.Integer),
+    sa.Column("name", sa.String(100)),
+    sa.Column("quantity", sa.Float),
+    sa.Column("expiry_date", sa.DateTime),
+    sa.Column("date_added", sa.DateTime),
+)
+
+shopping_item = sa.Table(
+    "shopping_item",
+    metadata,
+    sa.Column("user_id", sa.Integer),
+    sa.Column("name", sa.String(100)),
+    sa.Column("is_purchased", sa.Boolean),
+    sa.Column("priority", sa.Integer),
+)
+
+indexes = [
+    sa.Index("ix_product_user_expiry", product.c.user_id, product.c.expiry_date),
+    sa.Index("ix_product_user_added", product.c.user_id, product.c.date_added),
+    sa.Index("ix_product_user_quantity", product.c.user_id, product.c.quantity),
+    sa.Index("ix_product_user_lower_name", product.c.user_id, sa.func.lower(product.c.name)),
+    sa.Index(
+        "ix_shopping_item_user_status",
+        shopping_item.c.user_id, shopping_item.c.is_purchased, shopping_item.c.priority,
+    ),
+    sa.Index("ix_shopping_item_user_lower_name", shopping_item.c.user_id, sa.func.lower(shopping_item.c.name)),
+]
+
+
+def upgrade(conn):
+    # IF NOT EXISTS: индексы могли быть созданы db.create_all() по моделям;
+    # индексы по выражениям (lower(name)) не видны через reflection/checkfirst
+    for index in indexes:
+        conn.execute(CreateIndex(index, if_not_exists=True))
@@ -0,0 +1,48 @@
+"""Outbox уведомлений о сроках годности, состояние воркеров и индексы для сканирования сроков."""
+from datetime import datetime, timezone
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex
+
+DESCRIPTION = "notification outbox and worker watermark"
+
+metadata = sa.MetaData()
+
+product = sa.Table(
+    "product",
+    metadata,
+    sa.Column("expiry_date", sa.DateTime),
+    sa.Column("date_added", sa.DateTime),
+)
+
+user = sa.Table("user", metadata, sa.Column("id", sa.Integer, primary_key=True))
+
+notification = sa.Table(
+    "notification",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("product_id", sa.Integer, nullable=False),
+    sa.Column("kind", sa.String(10), nullable=False),
+    sa.Column("expiry_date", sa.DateTime, nullable=False),
+    sa.Column("created_at", sa.DateTime, default=lambda: datetime.now(timezone.utc)),
+    sa.Column("delivered_at", sa.DateTime, nullable=True),
+    sa.UniqueConstraint("product_id", "kind", "expiry_date", name="uq_notification_product_kind_expiry"),
+    sa.Index("ix_notification_pending", "delivered_at", "id"),
+)
+
+worker_state = sa.Table(
+    "worker_state",
+    metadata,
+    sa.Column("name", sa.String(50), primary_key=True),
+    sa.Column("watermark", sa.DateTime, nullable=False),
+)
+
+
+def upgrade(conn):
+    notification.create(conn, checkfirst=True)
+    worker_state.create(conn, checkfirst=True)
+    for index in (
+        sa.Index("ix_product_expiry", product.c.expiry_date),
+        sa.Index("ix_product_added", product.c.date_added),
+    ):
+        conn.execute(CreateIndex(index, if_not_exists=True))
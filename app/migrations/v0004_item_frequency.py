@@ -0,0 +1,100 @@
+"""Таблица частоты покупок item_frequency с заполнением из текущих продуктов."""
+import math
+from datetime import datetime, timedelta, timezone
+import sqlalchemy as sa
+
+DESCRIPTION = "item frequency model for shopping suggestions"
+
+# Совпадает с app/frequency.py на момент миграции
+HALF_LIFE_DAYS = 30
+TAU = HALF_LIFE_DAYS / math.log(2)
+EPOCH = datetime(2020, 1, 1)
+BATCH_SIZE = 1000
+
+metadata = sa.MetaData()
+
+user = sa.Table("user", metadata, sa.Column("id", sa.Integer, primary_key=True))
+
+product = sa.Table(
+    "product",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(100)),
+    sa.Column("category", sa.String(50)),
+    sa.Column("unit", sa.String(20)),
+    sa.Column("date_added", sa.DateTime),
+    sa.Column("user_id", sa.Integer),
+)
+
+item_frequency = sa.Table(
+    "item_frequency",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("name_key", sa.String(100), nullable=False),
+    sa.Column("name", sa.String(100), nullable=False),
+    sa.Column("category", sa.String(50), nullable=True),
+    sa.Column("unit", sa.String(20), nullable=True),
+    sa.Column("count", sa.Integer, nullable=False),
+    sa.Column("score_key", sa.Float, nullable=False),
+    sa.Column("last_added", sa.DateTime, nullable=False),
+    sa.Column("last_consumed", sa.DateTime, nullable=True),
+    sa.Column("avg_interval_days", sa.Float, nullable=True),
+    sa.Column("next_restock_at", sa.DateTime, nullable=True),
+    sa.UniqueConstraint("user_id", "name_key", name="uq_item_frequency_user_name"),
+    sa.Index("ix_item_frequency_user_score", "user_id", "score_key"),
+    sa.Index("ix_item_frequency_user_restock", "user_id", "next_restock_at"),
+)
+
+
+def naive_utc(moment):
+    if moment is None:
+        return datetime.utcnow()
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def upgrade(conn):
+    if sa.inspect(conn).has_table("item_frequency"):
+        return
+    item_frequency.create(conn)
+
+    lower_name = sa.func.lower(sa.func.trim(product.c.name))
+    history = conn.execute(
+        sa.select(
+            product.c.user_id,
+            lower_name,
+            sa.func.min(product.c.name),
+            sa.func.min(product.c.category),
+            sa.func.min(product.c.unit),
+            sa.func.count(),
+            sa.func.min(product.c.date_added),
+            sa.func.max(product.c.date_added),
+        )
+        .where(product.c.user_id.isnot(None))
+        .group_by(product.c.user_id, lower_name)
+    )
+
+    batch = []
+    for user_id, key, name, category, unit, count, first, last in history:
+        first, last = naive_utc(first), naive_utc(last)
+        interval = (last - first).total_seconds() / 86400 / (count - 1) if count > 1 else None
+        batch.append({
+            "user_id": user_id,
+            "name_key": key,
+            "name": name.strip(),
+            "category": category,
+            "unit": unit,
+            "count": count,
+            # Приближение: все добавления считаются сделанными в момент последнего
+            "score_key": math.log(count) + (last - EPOCH).total_seconds() / 86400 / TAU,
+            "last_added": last,
+            "avg_interval_days": interval,
+            "next_restock_at": last + timedelta(days=interval) if interval else None,
+        })
+        if len(batch) >= BATCH_SIZE:
+            conn.execute(item_frequency.insert(), batch)
+            batch = []
+    if batch:
+        conn.execute(item_frequency.insert(), batch)
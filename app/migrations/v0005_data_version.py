@@ -0,0 +1,21 @@
+"""Версии данных пользователей для инвалидации кэша страниц."""
+import sqlalchemy as sa
+
+DESCRIPTION = "per-user data version for page cache"
+
+metadata = sa.MetaData()
+
+user = sa.Table("user", metadata, sa.Column("id", sa.Integer, primary_key=True))
+
+data_version = sa.Table(
+    "data_version",
+    metadata,
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), primary_key=True),
+    sa.Column("version", sa.Integer, nullable=False),
+    sa.Column("updated_at", sa.DateTime, nullable=False),
+)
+
+
+def upgrade(conn):
+    # Заполнение не требуется: отсутствующая строка означает версию 0
+    data_version.create(conn, checkfirst=True)
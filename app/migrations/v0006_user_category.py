@@ -0,0 +1,40 @@
+"""Словарь категорий пользователя user_category с заполнением из product.category."""
+import sqlalchemy as sa
+
+DESCRIPTION = "per-user category dictionary"
+
+metadata = sa.MetaData()
+
+user = sa.Table("user", metadata, sa.Column("id", sa.Integer, primary_key=True))
+
+product = sa.Table(
+    "product",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("category", sa.String(50)),
+    sa.Column("user_id", sa.Integer),
+)
+
+user_category = sa.Table(
+    "user_category",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, sa.ForeignKey("user.id"), nullable=False),
+    sa.Column("name", sa.String(50), nullable=False),
+    sa.Column("product_count", sa.Integer, nullable=False),
+    sa.Index("ix_user_category_user_name", "user_id", "name", unique=True),
+)
+
+
+def upgrade(conn):
+    if sa.inspect(conn).has_table("user_category"):
+        return
+    user_category.create(conn)
+    conn.execute(
+        user_category.insert().from_select(
+            ["user_id", "name", "product_count"],
+            sa.select(product.c.user_id, product.c.category, sa.func.count())
+            .where(product.c.user_id.isnot(None))
+            .group_by(product.c.user_id, product.c.category),
+        )
+    )
@@ -0,0 +1,85 @@
+"""Журнал событий продуктов product_event и его архив; текущие продукты записываются как added."""
+from datetime import datetime
+import sqlalchemy as sa
+
+DESCRIPTION = "append-only product event log with archive"
+
+# Совпадает с app/events.py на момент миграции
+ADDED = 1
+
+metadata = sa.MetaData()
+
+product = sa.Table(
+    "product",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("name", sa.String(100)),
+    sa.Column("category", sa.String(50)),
+    sa.Column("quantity", sa.Float),
+    sa.Column("unit", sa.String(20)),
+    sa.Column("expiry_date", sa.DateTime),
+    sa.Column("date_added", sa.DateTime),
+    sa.Column("user_id", sa.Integer),
+)
+
+
+def event_table(name, *indexes, **kwargs):
+    return sa.Table(
+        name,
+        metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, nullable=False),
+        sa.Column("product_id", sa.Integer, nullable=False),
+        sa.Column("kind", sa.SmallInteger, nullable=False),
+        sa.Column("occurred_at", sa.DateTime, nullable=False),
+        sa.Column("name", sa.String(100), nullable=False),
+        sa.Column("category", sa.String(50), nullable=False),
+        sa.Column("quantity", sa.Float, nullable=True),
+        sa.Column("unit", sa.String(20), nullable=True),
+        sa.Column("expiry_date", sa.DateTime, nullable=True),
+        sa.Column("date_added", sa.DateTime, nullable=True),
+        *indexes,
+        **kwargs,
+    )
+
+
+product_event = event_table(
+    "product_event",
+    sa.Index("ix_product_event_user", "user_id", "id"),
+    sa.Index("ix_product_event_occurred", "occurred_at"),
+    sqlite_autoincrement=True,
+)
+
+product_event_archive = event_table(
+    "product_event_archive",
+    sa.Index("ix_product_event_archive_user", "user_id", "id"),
+)
+
+
+def upgrade(conn):
+    if sa.inspect(conn).has_table("product_event"):
+        return
+    product_event.create(conn)
+    product_event_archive.create(conn, checkfirst=True)
+
+    # Удаленные до миграции продукты уже потеряны; текущие попадают в журнал как добавленные
+    conn.execute(
+        product_event.insert().from_select(
+            ["user_id", "product_id", "kind", "occurred_at", "name", "category",
+             "quantity", "unit", "expiry_date", "date_added"],
+            sa.select(
+                product.c.user_id,
+                product.c.id,
+                sa.literal(ADDED, sa.SmallInteger),
+                sa.func.coalesce(product.c.date_added, sa.literal(datetime.utcnow(), sa.DateTime)),
+                product.c.name,
+                product.c.category,
+                product.c.quantity,
+                product.c.unit,
+                product.c.expiry_date,
+                product.c.date_added,
+            )
+            .where(product.c.user_id.isnot(None))
+            .order_by(product.c.id),
+        )
+    )
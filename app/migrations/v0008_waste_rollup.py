@@ -0,0 +1,27 @@
+"""Дневные итоги аналитики порчи waste_rollup; заполняются воркером при первом проходе."""
+import sqlalchemy as sa
+
+DESCRIPTION = "daily waste analytics rollups"
+
+metadata = sa.MetaData()
+
+waste_rollup = sa.Table(
+    "waste_rollup",
+    metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("user_id", sa.Integer, nullable=False),
+    sa.Column("category", sa.String(50), nullable=False),
+    sa.Column("day", sa.Date, nullable=False),
+    sa.Column("added", sa.Integer, nullable=False),
+    sa.Column("consumed", sa.Integer, nullable=False),
+    sa.Column("expired", sa.Integer, nullable=False),
+    sa.Column("discarded", sa.Integer, nullable=False),
+    sa.Column("lifetimes", sa.Integer, nullable=False),
+    sa.Column("fridge_days", sa.Float, nullable=False),
+    sa.Column("days_left", sa.Float, nullable=False),
+    sa.Index("ix_waste_rollup_user_day", "user_id", "day", "category", unique=True),
+)
+
+
+def upgrade(conn):
+    waste_rollup.create(conn, checkfirst=True)
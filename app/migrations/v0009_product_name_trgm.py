@@ -0,0 +1,20 @@
+"""Триграммный индекс названий продуктов для поиска (только PostgreSQL с pg_trgm и btree_gin)."""
+import sqlalchemy as sa
+
+DESCRIPTION = "trigram index on product names for search"
+
+
+def upgrade(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    try:
+        with conn.begin_nested():
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    except sa.exc.DBAPIError:
+        # Нет прав на создание расширений: app/search.py использует индекс в памяти
+        return
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_product_user_name_trgm "
+        "ON product USING gin (user_id, lower(name) gin_trgm_ops)"
+    )
@@ -0,0 +1,11 @@
+"""Отдельная версия продуктов пользователя в data_version (индекс названий для поиска)."""
+import sqlalchemy as sa
+
+DESCRIPTION = "per-user product version for the name search index"
+
+
+def upgrade(conn):
+    # Колонка могла быть создана db.create_all() по моделям
+    columns = {column["name"] for column in sa.inspect(conn).get_columns("data_version")}
+    if "product_version" not in columns:
+        conn.exec_driver_sql("ALTER TABLE data_version ADD COLUMN product_version INTEGER NOT NULL DEFAULT 0")
@@ -0,0 +1,10 @@
+"""Длина password_hash как в db_init.sql: хэши scrypt werkzeug длиннее 128 символов."""
+
+DESCRIPTION = "widen user.password_hash to 256"
+
+
+def upgrade(conn):
+    # SQLite длину VARCHAR не проверяет; базы из старой v0001 на PostgreSQL - 128
+    if conn.dialect.name != "postgresql":
+        return
+    conn.exec_driver_sql('ALTER TABLE "user" ALTER COLUMN password_hash TYPE VARCHAR(256)')
@@ -1,8 +1,26 @@
 from datetime import datetime, timezone
-from app import db
+from sqlalchemy import event
+from app import db, user_cache
+from app.utils import as_utc, request_now
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
+# Звания продуктов: (больше скольких дней в холодильнике, звание), от старших к младшим
+RANKS = (
+    (30, "Ветеран холодильника"),
+    (20, "Опытный обитатель"),
+    (10, "Постоялец"),
+    (5, "Новосёл"),
+    (-1, "Новобранец"),
+)
+
+
+def rank_for_days(days):
+    for threshold, title in RANKS:
+        if days > threshold:
+            return title
+    return RANKS[-1][1]
+
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -15,34 +33,44 @@ class Product(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
     owner = db.relationship("User", backref=db.backref("products", lazy=True))
 
-    from datetime import datetime, timezone
+    __table_args__ = (
+        db.Index("ix_product_user_expiry", "user_id", "expiry_date"),
+        db.Index("ix_product_user_added", "user_id", "date_added"),
+        db.Index("ix_product_user_quantity", "user_id", "quantity"),
+        # Инкрементальное сканирование сроков воркером уведомлений по всем пользователям
+        db.Index("ix_product_expiry", "expiry_date"),
+        db.Index("ix_product_added", "date_added"),
+    )
+
+    # now - время запроса (request_now()), чтобы не пересчитывать его для каждого вызова
 
-    def is_expired(self):
-        return datetime.now(timezone.utc) > self.expiry_date.astimezone(timezone.utc)
+    def is_expired(self, now=None):
+        return (now or request_now()) > as_utc(self.expiry_date)
 
-    def days_until_expiry(self):
-        now = datetime.now(timezone.utc)
-        expiry_date = self.expiry_date.astimezone(timezone.utc)
+    def days_until_expiry(self, now=None):
+        now = now or request_now()
+        expiry_date = as_utc(self.expiry_date)
 
-        if self.is_expired():
+        if now > expiry_date:
             return -((now - expiry_date).days)
         return (expiry_date - now).days
 
-    def days_in_fridge(self):
-        return (datetime.now(timezone.utc) - self.date_added.astimezone(timezone.utc)).days
-
-    def get_rank(self):
-        days = self.days_in_fridge()
-        if days > 30:
-            return "Ветеран холодильника"
-        elif days > 20:
-            return "Опытный обитатель"
-        elif days > 10:
-            return "Постоялец"
-        elif days > 5:
-            return "Новосёл"
-        else:
-            return "Новобранец"
+    def days_in_fridge(self, now=None):
+        return ((now or request_now()) - as_utc(self.date_added)).days
+
+    def get_rank(self, now=None):
+        return rank_for_days(self.days_in_fridge(now))
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "quantity": self.quantity,
+            "unit": self.unit,
+            "expiry_date": self.expiry_date.isoformat(),
+            "date_added": self.date_added.isoformat() if self.date_added else None,
+        }
 
     def __repr__(self):
         return f"<Product {self.name}>"
@@ -60,15 +88,186 @@ class ShoppingItem(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     owner = db.relationship("User", backref=db.backref("shopping_items", lazy=True))
 
+    __table_args__ = (
+        db.Index("ix_shopping_item_user_status", "user_id", "is_purchased", "priority"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "quantity": self.quantity,
+            "unit": self.unit,
+            "priority": self.priority,
+            "is_purchased": bool(self.is_purchased),
+        }
+
     def __repr__(self):
         return f"<ShoppingItem {self.name}>"
 
 
+# Регистронезависимый поиск по названию в пределах пользователя; на PostgreSQL
+# миграция v0009 добавляет триграммный GIN-индекс ix_product_user_name_trgm (app/search.py)
+db.Index("ix_product_user_lower_name", Product.user_id, db.func.lower(Product.name))
+db.Index("ix_shopping_item_user_lower_name", ShoppingItem.user_id, db.func.lower(ShoppingItem.name))
+
+
+class Notification(db.Model):
+    """Исходящее уведомление о сроке годности (outbox), заполняется воркером worker.py."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    # Без внешнего ключа: продукт может быть удален, а уведомление остается
+    product_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(10), nullable=False)  # expired / expiring
+    expiry_date = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    delivered_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("product_id", "kind", "expiry_date", name="uq_notification_product_kind_expiry"),
+        db.Index("ix_notification_pending", "delivered_at", "id"),
+    )
+
+    def __repr__(self):
+        return f"<Notification {self.kind} product={self.product_id}>"
+
+
+class ItemFrequency(db.Model):
+    """
+    Частота добавления продукта пользователем (поддерживается при добавлении и удалении продуктов)
+
+    score_key - логарифм счетчика с экспоненциальным затуханием, сдвинутый на время
+    последнего добавления (см. app/frequency.py): порядок по score_key совпадает с
+    порядком по затухшему счетчику в любой момент, поэтому top-K читается по индексу.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    name_key = db.Column(db.String(100), nullable=False)  # lower(name)
+    name = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50), nullable=True)
+    unit = db.Column(db.String(20), nullable=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    score_key = db.Column(db.Float, nullable=False, default=0.0)
+    last_added = db.Column(db.DateTime, nullable=False)
+    last_consumed = db.Column(db.DateTime, nullable=True)
+    avg_interval_days = db.Column(db.Float, nullable=True)  # средний интервал между покупками
+    next_restock_at = db.Column(db.DateTime, nullable=True)  # last_added + avg_interval_days
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "name_key", name="uq_item_frequency_user_name"),
+        db.Index("ix_item_frequency_user_score", "user_id", "score_key"),
+        db.Index("ix_item_frequency_user_restock", "user_id", "next_restock_at"),
+    )
+
+    def __repr__(self):
+        return f"<ItemFrequency {self.name} x{self.count}>"
+
+
+class UserCategory(db.Model):
+    """Категория продуктов пользователя с числом продуктов (поддерживается при записи, см. app/categories.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    name = db.Column(db.String(50), nullable=False)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index("ix_user_category_user_name", "user_id", "name", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<UserCategory {self.name} x{self.product_count}>"
+
+
+class DataVersion(db.Model):
+    """
+    Версия данных пользователя (продукты и список покупок) для кэша страниц
+
+    Увеличивается в той же транзакции, что и запись (см. app/pagecache.py);
+    отсутствие строки означает версию 0. product_version меняется только при
+    записи продуктов (индекс названий app/search.py).
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    product_version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+
+class ProductEventColumns:
+    """
+    Колонки журнала событий продукта (см. app/events.py)
+
+    Журнал только дополняется; снимок полей продукта хранится в самом событии,
+    поэтому удаленные продукты остаются в истории. kind - код из EVENT_KINDS.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    # Без внешних ключей: история переживает удаление продукта
+    user_id = db.Column(db.Integer, nullable=False)
+    product_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.SmallInteger, nullable=False)
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    quantity = db.Column(db.Float, nullable=True)
+    unit = db.Column(db.String(20), nullable=True)
+    expiry_date = db.Column(db.DateTime, nullable=True)
+    date_added = db.Column(db.DateTime, nullable=True)
+
+
+class ProductEvent(ProductEventColumns, db.Model):
+    """Оперативная часть журнала; старые события переносятся в product_event_archive."""
+    __tablename__ = "product_event"
+    __table_args__ = (
+        db.Index("ix_product_event_user", "user_id", "id"),
+        db.Index("ix_product_event_occurred", "occurred_at"),
+        # id не переиспользуются после переноса событий в архив
+        {"sqlite_autoincrement": True},
+    )
+
+
+class ProductEventArchive(ProductEventColumns, db.Model):
+    """Архив журнала событий (те же колонки и id, что в product_event)."""
+    __tablename__ = "product_event_archive"
+    __table_args__ = (
+        db.Index("ix_product_event_archive_user", "user_id", "id"),
+    )
+
+
+class WasteRollup(db.Model):
+    """
+    Дневной итог журнала событий по категории пользователя (пересчитывается воркером, см. app/analytics.py)
+
+    lifetimes - число съеденных и выброшенных продуктов, fridge_days и days_left -
+    суммы их days_in_fridge и days_until_expiry на момент удаления.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    category = db.Column(db.String(50), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    added = db.Column(db.Integer, nullable=False, default=0)
+    consumed = db.Column(db.Integer, nullable=False, default=0)
+    expired = db.Column(db.Integer, nullable=False, default=0)
+    discarded = db.Column(db.Integer, nullable=False, default=0)
+    lifetimes = db.Column(db.Integer, nullable=False, default=0)
+    fridge_days = db.Column(db.Float, nullable=False, default=0.0)
+    days_left = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index("ix_waste_rollup_user_day", "user_id", "day", "category", unique=True),
+    )
+
+
+class WorkerState(db.Model):
+    """Сохраненное состояние фоновых воркеров, например отметка последнего сканирования."""
+    name = db.Column(db.String(50), primary_key=True)
+    watermark = db.Column(db.DateTime, nullable=False)
+
+
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
     date_joined = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     def set_password(self, password):
@@ -79,3 +278,9 @@ class User(db.Model, UserMixin):
 
     def __repr__(self):
         return f"<User {self.username}>"
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_cached_user(mapper, connection, target):
+    user_cache.delete(target.id)
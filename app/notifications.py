@@ -0,0 +1,132 @@
+"""
+Инкрементальное сканирование сроков годности для уведомлений.
+
+Воркер (worker.py) периодически вызывает ExpiryScanner.run(). Продукты
+выбираются по текущему состоянию срока, а не по времени изменения: так
+попадают и продукты, срок которых отредактировали, и импортированные
+со старой датой добавления. Уведомления пишутся в outbox (таблица
+notification) пачками через INSERT ... SELECT; уникальный ключ
+(product_id, kind, expiry_date) и NOT EXISTS пропускают уже записанные.
+Отметка прошлого запуска (worker_state) только расширяет окно истекших,
+если воркер долго не работал.
+
+Семантика совпадает с get_expiring_products / Product.is_expired:
+    expired  - expiry_date <= now
+    expiring - now < expiry_date <= now + expiring_days
+"""
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, exists, insert, literal, select
+from app import db
+from app.models import Notification, Product, WorkerState
+from app.events import last_notification_id, log_expired
+
+WORKER_NAME = "expiry_scanner"
+
+
+class ExpiryScanner:
+    """
+    Args:
+        expiring_days: за сколько дней до истечения срока предупреждать
+        batch_size: сколько уведомлений вставлять за одну транзакцию
+        lookback: сколько времени назад истекший продукт еще получает уведомление
+        clock: функция текущего времени (naive UTC); в тестах - фиктивные часы
+    """
+
+    def __init__(self, expiring_days=3, batch_size=1000, lookback=timedelta(days=1),
+                 clock=datetime.utcnow, name=WORKER_NAME):
+        self.expiring_days = expiring_days
+        self.batch_size = batch_size
+        self.lookback = lookback
+        self.clock = clock
+        self.name = name
+
+    def load_watermark(self, now):
+        state = db.session.get(WorkerState, self.name)
+        return state.watermark if state else now - self.lookback
+
+    def save_watermark(self, watermark):
+        state = db.session.get(WorkerState, self.name)
+        if state is None:
+            db.session.add(WorkerState(name=self.name, watermark=watermark))
+        else:
+            state.watermark = watermark
+
+    def windows(self, since, now):
+        """
+        Условия попадания продукта в уведомления на момент now
+
+        Оба условия - диапазоны по сроку (индекс ix_product_expiry); уже
+        уведомленные продукты отсекает NOT EXISTS в enqueue().
+
+        Args:
+            since: отметка прошлого запуска
+            now: текущее время
+        """
+        horizon = now + timedelta(days=self.expiring_days)
+        expired_since = min(since, now - self.lookback)
+        return [
+            ("expired", (Product.expiry_date > expired_since, Product.expiry_date <= now)),
+            ("expiring", (Product.expiry_date > now, Product.expiry_date <= horizon)),
+        ]
+
+    def enqueue(self, kind, conditions, now):
+        already_queued = exists().where(
+            Notification.product_id == Product.id,
+            Notification.kind == kind,
+            Notification.expiry_date == Product.expiry_date,
+        )
+        candidates = (
+            select(
+                Product.user_id,
+                Product.id,
+                literal(kind),
+                Product.expiry_date,
+                literal(now),
+            )
+            .where(Product.user_id.isnot(None), and_(*conditions), ~already_queued)
+            .order_by(Product.id)
+            .limit(self.batch_size)
+        )
+        statement = insert(Notification).from_select(
+            ["user_id", "product_id", "kind", "expiry_date", "created_at"], candidates
+        )
+
+        total = 0
+        while True:
+            last_id = last_notification_id()
+            inserted = db.session.execute(statement).rowcount
+            if kind == "expired" and inserted:
+                # Событие expired в журнал продуктов - в той же транзакции, что и уведомления
+                log_expired(last_id, now)
+            db.session.commit()
+            total += inserted
+            if inserted < self.batch_size:
+                return total
+
+    def run(self):
+        """Один проход сканера; возвращает {вид: количество новых уведомлений}."""
+        now = self.clock()
+        since = self.load_watermark(now)
+        counts = {"expired": 0, "expiring": 0}
+        for kind, conditions in self.windows(since, now):
+            counts[kind] += self.enqueue(kind, conditions, now)
+        self.save_watermark(now)
+        db.session.commit()
+        return counts
+
+
+def pending_notifications(limit=100):
+    """Недоставленные уведомления в порядке создания (для отправителя)."""
+    return (
+        Notification.query.filter(Notification.delivered_at.is_(None))
+        .order_by(Notification.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def mark_delivered(ids):
+    Notification.query.filter(Notification.id.in_(ids)).update(
+        {"delivered_at": datetime.now(timezone.utc)}, synchronize_session=False
+    )
+    db.session.commit()
@@ -0,0 +1,251 @@
+"""
+Кэш отрендеренных страниц и фрагментов по версии данных пользователя.
+
+Ключ записи - (пользователь, версия данных, день, имя). Версия хранится в
+таблице data_version и увеличивается в той же транзакции, что и запись
+продуктов или списка покупок: изменения через ORM отслеживаются событием
+after_flush, массовые Core-запросы (импорт, пакетные операции, автоматический
+список покупок) вызывают bump_data_version() явно. Версия читается одним
+запросом по первичному ключу, поэтому после записи новую версию видят все
+воркеры, а старые записи просто перестают запрашиваться и вытесняются.
+
+Статусы сроков и звания зависят от текущего времени: день входит в ключ, а
+запись живет не дольше PAGE_CACHE_TTL и не дольше ближайшей полуночи UTC.
+
+Хранилище выбирается PAGE_CACHE_URL: по умолчанию LRU в памяти процесса с
+бюджетом PAGE_CACHE_MAX_BYTES (0 отключает кэш), redis://... - общий кэш
+всех воркеров (нужен пакет redis). Другие хранилища регистрируются в BACKENDS.
+"""
+import hashlib
+import json
+import math
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+from flask import current_app, g, has_request_context, make_response, render_template, request, session
+from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import db
+from app.cache import TTLCache
+from app.models import DataVersion, Product, ShoppingItem
+from app.utils import request_now
+
+# Модели, запись которых меняет страницы пользователя
+VERSIONED_MODELS = (Product, ShoppingItem)
+
+# Ограничение числа записей in-process кэша; основной лимит - бюджет в байтах
+MAX_ENTRIES = 100_000
+
+
+def bump_data_version(user_id, connection=None, products=False):
+    """
+    Увеличивает версию данных пользователя в текущей транзакции
+
+    Args:
+        user_id: ID пользователя
+        connection: соединение транзакции (по умолчанию соединение db.session)
+        products: изменены продукты - увеличить и product_version
+    """
+    connection = connection or db.session.connection()
+    table = DataVersion.__table__
+    now = datetime.utcnow()
+    values = {"version": table.c.version + 1, "updated_at": now}
+    if products:
+        values["product_version"] = table.c.product_version + 1
+    bump = update(table).where(table.c.user_id == user_id).values(values)
+    if not connection.execute(bump).rowcount:
+        try:
+            with connection.begin_nested():
+                connection.execute(insert(table).values(
+                    user_id=user_id, version=1, product_version=int(products), updated_at=now
+                ))
+        except IntegrityError:
+            # Строку одновременно вставила параллельная транзакция
+            connection.execute(bump)
+    if has_request_context():
+        g.pop("data_versions", None)
+
+
+def data_versions(user_id):
+    # (версия данных, версия продуктов); строка читается один раз за запрос
+    versions = g.setdefault("data_versions", {})
+    if user_id not in versions:
+        row = db.session.execute(
+            select(DataVersion.version, DataVersion.product_version).where(DataVersion.user_id == user_id)
+        ).first()
+        versions[user_id] = tuple(row) if row else (0, 0)
+    return versions[user_id]
+
+
+def data_version(user_id):
+    """Текущая версия данных пользователя (продукты и список покупок)."""
+    return data_versions(user_id)[0]
+
+
+def product_version(user_id):
+    """Текущая версия продуктов пользователя; запись списка покупок ее не меняет."""
+    return data_versions(user_id)[1]
+
+
+@event.listens_for(Session, "after_flush")
+def bump_changed_users(session, flush_context):
+    # new / dirty / deleted здесь еще в состоянии до flush
+    changed = [*session.new, *session.deleted]
+    changed += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    users = {obj.user_id for obj in changed if isinstance(obj, VERSIONED_MODELS) and obj.user_id is not None}
+    product_users = {obj.user_id for obj in changed if isinstance(obj, Product)}
+    if users:
+        connection = session.connection()
+        for user_id in sorted(users):
+            bump_data_version(user_id, connection, products=user_id in product_users)
+
+
+class RedisBackend:
+    """Общий кэш страниц для всех воркеров в Redis (интерфейс TTLCache)."""
+
+    def __init__(self, url, prefix="fridge:page:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("PAGE_CACHE_URL=redis://... требует пакет redis") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key, default=None):
+        raw = self.client.get(self.prefix + key)
+        return default if raw is None else tuple(json.loads(raw))
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, math.ceil(ttl or 0)))
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+# Схема PAGE_CACHE_URL -> класс хранилища, создается как Backend(url)
+BACKENDS = {
+    "redis": RedisBackend,
+    "rediss": RedisBackend,
+}
+
+
+def make_backend(config):
+    url = config["PAGE_CACHE_URL"]
+    if url:
+        scheme = url.split(":", 1)[0]
+        if scheme not in BACKENDS:
+            raise RuntimeError(f"Неизвестное хранилище кэша страниц: {url!r}")
+        return BACKENDS[scheme](url)
+    if config["PAGE_CACHE_MAX_BYTES"] <= 0:
+        return None
+    # Запись: (время рендеринга, ETag, html); размер - по html
+    return TTLCache(
+        maxsize=MAX_ENTRIES,
+        ttl=config["PAGE_CACHE_TTL"],
+        maxbytes=config["PAGE_CACHE_MAX_BYTES"],
+        sizeof=lambda entry: sys.getsizeof(entry[2]),
+    )
+
+
+class PageCache:
+    """
+    Отрендеренные страницы и фрагменты текущего пользователя
+
+    Args:
+        backend: хранилище с интерфейсом TTLCache (get, set(key, value, ttl), delete)
+        ttl: максимальное время жизни записи в секундах
+    """
+
+    def __init__(self, backend, ttl=300):
+        self.backend = backend
+        self.ttl = ttl
+
+    def key(self, name):
+        user_id = current_user.id
+        return f"{user_id}:{data_version(user_id)}:{request_now().date().isoformat()}:{name}"
+
+    def expires_in(self):
+        now = request_now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+        return max(1, min(self.ttl, math.ceil((midnight - now).total_seconds())))
+
+    def get(self, name):
+        return self.backend.get(self.key(name))
+
+    def set(self, name, html):
+        entry = (time.time(), hashlib.sha1(html.encode()).hexdigest(), html)
+        self.backend.set(self.key(name), entry, ttl=self.expires_in())
+        return entry
+
+
+def init_page_cache(app):
+    backend = make_backend(app.config)
+    if backend is not None:
+        backend = PageCache(backend, ttl=app.config["PAGE_CACHE_TTL"])
+    app.extensions["page_cache"] = backend
+
+
+def page_cache():
+    return current_app.extensions.get("page_cache")
+
+
+def render_fragment(name, template, context):
+    """
+    Фрагмент шаблона из кэша или render_template(template, **context())
+
+    Args:
+        name: имя фрагмента (уникально в пределах пользователя)
+        template: шаблон фрагмента
+        context: функция, возвращающая данные шаблона; при попадании в кэш не вызывается
+
+    Returns:
+        Markup: HTML фрагмента
+    """
+    cache = page_cache()
+    if cache is None:
+        return Markup(render_template(template, **context()))
+    entry = cache.get("fragment:" + name)
+    if entry is None:
+        entry = cache.set("fragment:" + name, render_template(template, **context()))
+    return Markup(entry[2])
+
+
+def cached_page(view=None, *, unless=None):
+    """
+    Кэширует страницу целиком и отвечает 304 на условные GET (If-Modified-Since / If-None-Match)
+
+    Args:
+        view: функция представления (@cached_page без аргументов)
+        unless: функция без аргументов; если она вернула истину, страница не кэшируется
+    """
+    if view is None:
+        return lambda view: cached_page(view, unless=unless)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = page_cache()
+        # Flash-сообщения показываются один раз: такую страницу не кэшируем
+        if cache is None or request.method != "GET" or session.get("_flashes") or (unless and unless()):
+            return view(*args, **kwargs)
+
+        name = "page:" + request.full_path
+        entry = cache.get(name)
+        if entry is None:
+            html = view(*args, **kwargs)
+            if not isinstance(html, str):
+                return html
+            entry = cache.set(name, html)
+
+        rendered_at, etag, html = entry
+        response = make_response(html)
+        response.set_etag(etag)
+        response.last_modified = datetime.fromtimestamp(rendered_at, timezone.utc)
+        # Браузер хранит страницу, но перепроверяет ее при каждом открытии
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
@@ -0,0 +1,102 @@
+"""
+Хэширование и проверка паролей в ограниченном пуле потоков.
+
+scrypt и pbkdf2 (hashlib) отпускают GIL, поэтому хэширование в пуле не
+останавливает остальные потоки воркера gunicorn, а число одновременных
+хэширований в процессе ограничено PASSWORD_HASH_WORKERS. Очередь ограничена
+PASSWORD_HASH_QUEUE: когда она заполнена, запрос сразу получает
+PasswordHasherBusy (вход и регистрация отвечают 503), и всплеск входов или
+перебор паролей не отнимает процессор у остальных маршрутов.
+
+Хэш с параметрами, отличными от PASSWORD_HASH_METHOD, пересчитывается при
+успешном входе (needs_rehash). В воркерах gevent пул состоит из настоящих
+потоков ОС (gevent.threadpool), иначе хэширование занимало бы цикл событий.
+"""
+import concurrent.futures
+import os
+import sys
+import threading
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Очередь хэширования заполнена или результат не получен за timeout."""
+
+
+def threads_patched():
+    # gunicorn.conf.py с GUNICORN_WORKER_CLASS=gevent заменяет потоки threading на greenlet'ы
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+class PasswordHasher:
+    """
+    Args:
+        method: метод werkzeug с параметрами, как он записывается в хэш (scrypt:32768:8:1)
+        workers: потоков хэширования на процесс (0 - хэшировать в потоке запроса)
+        queue: сколько задач может ждать свободного потока
+        timeout: максимальное ожидание результата в секундах
+    """
+
+    def __init__(self, method, workers=2, queue=8, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = None
+
+    def pool(self):
+        # Пул создается в каждом процессе заново: потоки не переживают fork воркеров gunicorn
+        with self._lock:
+            if self._pid != os.getpid():
+                executor_class = concurrent.futures.ThreadPoolExecutor
+                if threads_patched():
+                    from gevent.threadpool import ThreadPoolExecutor as executor_class
+                self._executor = executor_class(self.workers, thread_name_prefix="password-hash")
+                self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+                self._pid = os.getpid()
+            return self._executor, self._slots
+
+    def run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        executor, slots = self.pool()
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy() from None
+
+    def hash(self, password):
+        return self.run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self.run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split("$", 1)[0] != self.method
+
+
+def init_password_hasher(app):
+    app.extensions["password_hasher"] = PasswordHasher(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        queue=app.config["PASSWORD_HASH_QUEUE"],
+        timeout=app.config["PASSWORD_HASH_TIMEOUT"],
+    )
+
+
+def password_hasher():
+    return current_app.extensions["password_hasher"]
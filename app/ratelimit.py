@@ -0,0 +1,79 @@
+"""
+Ограничение частоты попыток входа (token bucket).
+
+Ведро ключа (IP-адрес или учетная запись) вмещает burst жетонов и
+пополняется на per_minute жетонов в минуту; каждая попытка входа тратит по
+жетону из ведра IP и ведра учетной записи до проверки пароля, поэтому
+перебор паролей упирается в лимит, не расходуя процессор на хэширование.
+
+Ведра хранятся в памяти процесса (TTLCache): запись живет, пока ведро не
+наполнится снова, а при нескольких воркерах gunicorn лимит действует в
+каждом воркере отдельно.
+"""
+import threading
+import time
+from flask import current_app, request
+from app.cache import TTLCache
+
+
+class TokenBucketLimiter:
+    """
+    Args:
+        burst: емкость ведра (0 - без ограничения)
+        per_minute: скорость пополнения, жетонов в минуту
+        maxsize: максимальное число хранимых ведер
+        clock: источник времени (для тестов)
+    """
+
+    def __init__(self, burst, per_minute, maxsize=100_000, clock=time.monotonic):
+        if burst > 0 and per_minute <= 0:
+            raise ValueError("per_minute должен быть больше 0")
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.clock = clock
+        self.buckets = TTLCache(maxsize=maxsize, ttl=burst / self.rate if burst > 0 else 0, clock=clock)
+        self._lock = threading.Lock()
+
+    def acquire(self, key):
+        """
+        Тратит жетон из ведра ключа
+
+        Returns:
+            float: 0, если жетон есть, иначе через сколько секунд он появится
+        """
+        if self.burst <= 0:
+            return 0
+        with self._lock:
+            now = self.clock()
+            tokens, updated = self.buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                return (1 - tokens) / self.rate
+            tokens -= 1
+            # Запись не нужна после того, как ведро снова наполнится
+            self.buckets.set(key, (tokens, now), ttl=(self.burst - tokens) / self.rate)
+            return 0
+
+
+def init_login_limits(app):
+    app.extensions["login_limits"] = {
+        "ip": TokenBucketLimiter(app.config["LOGIN_IP_BURST"], app.config["LOGIN_IP_PER_MINUTE"]),
+        "account": TokenBucketLimiter(app.config["LOGIN_ACCOUNT_BURST"], app.config["LOGIN_ACCOUNT_PER_MINUTE"]),
+    }
+
+
+def limit_login(account):
+    """
+    Тратит жетоны попытки входа для IP-адреса запроса и учетной записи
+
+    Args:
+        account: имя пользователя или email из формы входа
+
+    Returns:
+        float: 0, если попытка разрешена, иначе сколько секунд ждать
+    """
+    limits = current_app.extensions["login_limits"]
+    return max(
+        limits["ip"].acquire(request.remote_addr or ""),
+        limits["account"].acquire((account or "").strip().lower()),
+    )
@@ -0,0 +1,389 @@
+"""
+Обновления открытых страниц через server-sent events (/api/events).
+
+Изменения продуктов и списка покупок собираются в сессии как небольшие
+дельты пользователя: изменения через ORM - событием after_flush (как версия
+данных в app/pagecache.py), массовые Core-запросы вызывают publish() или
+publish_resync() явно. Дельты одной транзакции объединяются в одно сообщение
+на пользователя и уходят подписчикам только после commit; при rollback они
+отбрасываются.
+
+Брокер выбирается EVENTS_BACKEND: local - подписчики в памяти процесса
+(разработка, один воркер); postgres - сообщение отправляется pg_notify в
+транзакции записи, а поток LISTEN в каждом процессе раздает его своим
+подписчикам, поэтому обновление доходит до страниц, открытых через любой
+воркер gunicorn. По умолчанию postgres для PostgreSQL, иначе local. Другие
+брокеры регистрируются в BACKENDS.
+
+Открытый поток держит соединение клиента, но не соединение с базой. Тысячи
+простаивающих потоков рассчитаны на воркеры gevent (GUNICORN_WORKER_CLASS=gevent,
+см. gunicorn.conf.py); в режиме gthread каждый поток занимает поток воркера,
+поэтому их число в процессе ограничено EVENTS_MAX_STREAMS.
+"""
+import json
+import logging
+import os
+import queue
+import selectors
+import threading
+import time
+from datetime import timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Product, ShoppingItem, rank_for_days
+from app.utils import as_utc, request_now
+
+logger = logging.getLogger(__name__)
+
+# Виды записей в сообщении
+KINDS = ("products", "shopping_items")
+
+# Статус срока в дельте продукта - как на главной странице (ProductRepository(expiring_days=3))
+EXPIRING_DAYS = 3
+
+# Через сколько миллисекунд браузер переподключается после обрыва потока
+RETRY_MS = 3000
+
+CHANNEL = "fridge_events"
+# pg_notify принимает не больше 8000 байт; большая дельта заменяется resync
+MAX_NOTIFY_BYTES = 7900
+
+
+class EventStreamsBusy(Exception):
+    """В процессе уже открыто EVENTS_MAX_STREAMS потоков событий."""
+
+
+class Subscription:
+    """
+    Очередь сообщений одного открытого потока
+
+    Args:
+        user_id: ID пользователя
+        size: сколько сообщений может ждать отправки; при переполнении
+            очередь заменяется одним resync всех видов записей
+    """
+
+    def __init__(self, user_id, size=100):
+        self.user_id = user_id
+        self.messages = queue.Queue(size)
+        self.lost = False
+
+    def put(self, message):
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            self.lost = True
+
+    def get(self, timeout):
+        """Следующее сообщение или None, если за timeout секунд сообщений не было."""
+        if self.lost:
+            self.lost = False
+            while True:
+                try:
+                    self.messages.get_nowait()
+                except queue.Empty:
+                    break
+            return {"resync": list(KINDS)}
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class LocalBroker:
+    """
+    Подписчики в памяти процесса; сообщения раздаются после commit
+
+    Args:
+        max_streams: предел открытых потоков в процессе (0 - поток событий отключен)
+        queue_size: размер очереди сообщений каждого потока
+    """
+
+    def __init__(self, max_streams=1000, queue_size=100):
+        self.max_streams = max_streams
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        with self._lock:
+            if self._count >= self.max_streams:
+                raise EventStreamsBusy()
+            subscription = Subscription(user_id, self.queue_size)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+            self._count -= 1
+
+    def dispatch(self, user_id, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def broadcast(self, message):
+        with self._lock:
+            subscribers = [s for subscribers in self._subscribers.values() for s in subscribers]
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def send(self, connection, messages):
+        """Вызывается перед commit транзакции с сообщениями [(user_id, message)]."""
+
+    def sent(self, messages):
+        """Вызывается после commit транзакции."""
+        for user_id, message in messages:
+            self.dispatch(user_id, message)
+
+
+class PostgresBroker(LocalBroker):
+    """
+    Сообщения через LISTEN/NOTIFY PostgreSQL
+
+    pg_notify выполняется в транзакции записи, поэтому PostgreSQL доставляет
+    сообщение только после commit. Поток LISTEN держит отдельное соединение
+    (вне пула) и раздает сообщения подписчикам своего процесса, в том числе
+    того, где была запись.
+
+    Args:
+        reconnect_delay: пауза перед переподключением LISTEN, сек
+    """
+
+    def __init__(self, max_streams=1000, queue_size=100, reconnect_delay=1):
+        super().__init__(max_streams, queue_size)
+        self.reconnect_delay = reconnect_delay
+        self._pid = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        subscription = super().subscribe(user_id)
+        self.start_listener(db.engine)
+        return subscription
+
+    def start_listener(self, engine):
+        # Поток LISTEN создается в каждом процессе заново: потоки не переживают fork воркеров gunicorn
+        with self._listener_lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self.listen, args=(engine,), name="events-listen", daemon=True).start()
+                self._pid = os.getpid()
+
+    def send(self, connection, messages):
+        for user_id, message in messages:
+            payload = json.dumps([user_id, message], ensure_ascii=False)
+            if len(payload.encode()) > MAX_NOTIFY_BYTES:
+                payload = json.dumps([user_id, {"resync": resync_kinds(message)}])
+            connection.execute(select(func.pg_notify(CHANNEL, payload)))
+
+    def sent(self, messages):
+        # Сообщения доставляет поток LISTEN
+        pass
+
+    def listen(self, engine):
+        reconnected = False
+        while True:
+            connection = None
+            try:
+                cargs, cparams = engine.dialect.create_connect_args(engine.url)
+                connection = engine.dialect.connect(*cargs, **cparams)
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                if reconnected:
+                    # Сообщения, отправленные без соединения, потеряны: страницы загружают данные заново
+                    self.broadcast({"resync": list(KINDS)})
+                reconnected = True
+                self.receive(connection)
+            except Exception as e:
+                logger.warning("Поток LISTEN %s прерван: %s", CHANNEL, e)
+            finally:
+                if connection is not None:
+                    connection.close()
+            time.sleep(self.reconnect_delay)
+
+    def receive(self, connection, idle_check=60):
+        with selectors.DefaultSelector() as selector:
+            selector.register(connection, selectors.EVENT_READ)
+            while True:
+                if not selector.select(timeout=idle_check):
+                    # Проверяем, что соединение живо, если долго не было сообщений
+                    with connection.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    user_id, message = json.loads(notify.payload)
+                    self.dispatch(user_id, message)
+
+
+# EVENTS_BACKEND -> класс брокера, создается как Broker(max_streams, queue_size)
+BACKENDS = {
+    "local": LocalBroker,
+    "postgres": PostgresBroker,
+}
+
+
+def init_events(app):
+    backend = app.config["EVENTS_BACKEND"]
+    if not backend:
+        uri = str(app.config.get("SQLALCHEMY_DATABASE_URI", ""))
+        backend = "postgres" if uri.startswith("postgresql") else "local"
+    if backend not in BACKENDS:
+        raise RuntimeError(f"Неизвестный брокер событий: {backend!r}")
+    app.extensions["events"] = BACKENDS[backend](
+        max_streams=app.config["EVENTS_MAX_STREAMS"],
+        queue_size=app.config["EVENTS_QUEUE_SIZE"],
+    )
+
+
+def events_broker():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get("events")
+
+
+def event_stream(broker, subscription, keepalive=15):
+    """
+    Тело ответа text/event-stream для подписки
+
+    Не использует контекст запроса и сессию базы: соединение с базой
+    возвращается в пул до начала потока.
+
+    Args:
+        broker: брокер, выдавший подписку
+        subscription: подписка пользователя
+        keepalive: через сколько секунд без сообщений отправлять комментарий
+    """
+    yield f"retry: {RETRY_MS}\n\n"
+    while True:
+        message = subscription.get(keepalive)
+        if message is None:
+            # Не дает прокси закрыть простаивающее соединение и выявляет отключившихся клиентов
+            yield ": keepalive\n\n"
+        else:
+            yield f"event: change\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+
+
+def product_delta(product, now=None):
+    """Продукт для страниц: to_dict() со статусом срока и званием, как в ProductRepository."""
+    now = now or request_now()
+    expiry_date = as_utc(product.expiry_date)
+    if expiry_date < now:
+        status = "expired"
+    elif expiry_date <= now + timedelta(days=EXPIRING_DAYS):
+        status = "expiring"
+    else:
+        status = "fresh"
+    rank = product.get_rank(now) if product.date_added else rank_for_days(0)
+    return dict(product.to_dict(), status=status, rank=rank)
+
+
+def pending_changes(session, user_id):
+    changes = session.info.setdefault("events", {})
+    if user_id not in changes:
+        changes[user_id] = {"resync": set(), **{kind: {} for kind in KINDS}}
+    return changes[user_id]
+
+
+def publish(user_id, kind, changed=(), deleted=(), session=None):
+    """
+    Добавляет дельту пользователя в текущую транзакцию (уходит после commit)
+
+    Args:
+        user_id: ID пользователя
+        kind: вид записей ("products" или "shopping_items")
+        changed: словари новых или измененных записей (с ключом id)
+        deleted: id удаленных записей
+        session: сессия транзакции (по умолчанию db.session)
+    """
+    entries = pending_changes(session or db.session, user_id)[kind]
+    for item in changed:
+        entries[item["id"]] = item
+    for id in deleted:
+        entries[id] = None
+
+
+def publish_resync(user_id, kind, session=None):
+    """Записи вида изменены массово: открытые страницы загружают их заново."""
+    pending_changes(session or db.session, user_id)["resync"].add(kind)
+
+
+def resync_kinds(message):
+    return sorted(set(message.get("resync", ())) | {kind for kind in KINDS if kind in message})
+
+
+def build_messages(changes):
+    """[(user_id, сообщение)] из накопленных дельт; сообщение - {вид: {changed, deleted}, resync}."""
+    messages = []
+    for user_id, change in sorted(changes.items()):
+        message = {}
+        for kind in KINDS:
+            entries = change[kind]
+            if entries and kind not in change["resync"]:
+                message[kind] = {
+                    "changed": [item for item in entries.values() if item is not None],
+                    "deleted": [id for id, item in entries.items() if item is None],
+                }
+        if change["resync"]:
+            message["resync"] = sorted(change["resync"])
+        if message:
+            messages.append((user_id, message))
+    return messages
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changes(session, flush_context):
+    if events_broker() is None:
+        return
+    now = request_now()
+    # new / dirty / deleted здесь еще в состоянии до flush, id новых записей уже известны
+    changed = [*session.new]
+    changed += [obj for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    for obj in changed:
+        if isinstance(obj, Product) and obj.user_id is not None:
+            publish(obj.user_id, "products", changed=[product_delta(obj, now)], session=session)
+        elif isinstance(obj, ShoppingItem) and obj.user_id is not None:
+            publish(obj.user_id, "shopping_items", changed=[obj.to_dict()], session=session)
+    for obj in session.deleted:
+        if isinstance(obj, (Product, ShoppingItem)) and obj.user_id is not None:
+            kind = "products" if isinstance(obj, Product) else "shopping_items"
+            publish(obj.user_id, kind, deleted=[obj.id], session=session)
+
+
+@event.listens_for(Session, "before_commit")
+def send_changes(session):
+    broker = events_broker()
+    if broker is None:
+        return
+    # Изменения, которые commit сбросил бы сам, тоже должны попасть в сообщение
+    session.flush()
+    changes = session.info.pop("events", None)
+    if changes:
+        messages = build_messages(changes)
+        broker.send(session.connection(), messages)
+        session.info.setdefault("events_sent", []).extend(messages)
+
+
+@event.listens_for(Session, "after_commit")
+def deliver_changes(session):
+    messages = session.info.pop("events_sent", None)
+    broker = events_broker()
+    if messages and broker is not None:
+        broker.sent(messages)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changes(session):
+    session.info.pop("events", None)
+    session.info.pop("events_sent", None)
@@ -0,0 +1,140 @@
+"""
+Подбор рецептов по продуктам в холодильнике.
+
+Каталог рецептов загружается из app/data/recipes.json один раз и
+индексируется обратным индексом: ключ (категория или основа слова
+ингредиента) -> рецепты, в которых он встречается. При подборе
+перебираются только рецепты, связанные с ключами имеющихся продуктов.
+
+Оценка рецепта - доля покрытых ключей, где каждый ключ весит тем больше,
+чем скорее истекает срок покрывающего его продукта: так в первую очередь
+предлагаются блюда из того, что скоро испортится.
+"""
+import heapq
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+
+RECIPES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "recipes.json")
+
+# За сколько дней до истечения срока продукт начинает получать повышенный вес
+URGENCY_HORIZON_DAYS = 7
+STEM_LENGTH = 5
+WORD_RE = re.compile(r"[a-zа-яё]+")
+
+
+def stems(text):
+    """Основы слов названия: нижний регистр, ё -> е, первые STEM_LENGTH букв ("помидоры" -> "помид")."""
+    words = WORD_RE.findall(text.lower().replace("ё", "е"))
+    return {word[:STEM_LENGTH] for word in words if len(word) > 2}
+
+
+def urgency(expiry_date, now):
+    """Вес продукта от 1 (срок далеко) до 2 (срок истекает сейчас)."""
+    if expiry_date is None:
+        return 1.0
+    days_left = (expiry_date - now).total_seconds() / 86400
+    return 1.0 + min(max(URGENCY_HORIZON_DAYS - days_left, 0), URGENCY_HORIZON_DAYS) / URGENCY_HORIZON_DAYS
+
+
+class Recipe:
+    __slots__ = ("name", "description", "categories", "keys")
+
+    def __init__(self, name, description="", categories=(), ingredients=()):
+        self.name = name
+        self.description = description
+        self.categories = tuple(categories)
+        # Сначала конкретные ингредиенты, затем категории; порядок определяет список продуктов
+        keys = [("stem", stem) for ingredient in ingredients for stem in sorted(stems(ingredient))]
+        keys += [("category", category) for category in self.categories]
+        self.keys = tuple(dict.fromkeys(keys))
+
+
+class RecipeCatalogue:
+    def __init__(self, recipes):
+        self.recipes = list(recipes)
+        # Основа слова ингредиента -> номера рецептов
+        self.index = defaultdict(list)
+        # Набор категорий -> номера рецептов: категорий мало, поэтому требование
+        # "есть продукты всех категорий рецепта" проверяется один раз на группу
+        self.groups = defaultdict(list)
+        for number, recipe in enumerate(self.recipes):
+            for kind, value in recipe.keys:
+                if kind == "stem":
+                    self.index[value].append(number)
+            self.groups[frozenset(recipe.categories)].append(number)
+        self.groups = list(self.groups.items())
+        self.inverse_size = [1.0 / max(len(recipe.keys), 1) for recipe in self.recipes]
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(Recipe(**data) for data in json.load(f))
+
+    def suggest(self, products, now=None, limit=3, max_products=4):
+        """
+        Подбирает рецепты по непросроченным продуктам
+
+        Args:
+            products: объекты с полями name, category, expiry_date
+            now: текущее время (naive UTC)
+            limit: сколько рецептов вернуть
+            max_products: сколько продуктов перечислить в рецепте
+
+        Returns:
+            list: словари name, description, products, score - по убыванию score
+        """
+        now = now or datetime.utcnow()
+
+        # Ключ -> (наибольший вес, названия продуктов)
+        available = {}
+        for product in products:
+            weight = urgency(getattr(product, "expiry_date", None), now)
+            keys = [("category", product.category)] + [("stem", stem) for stem in stems(product.name)]
+            for key in keys:
+                best, names = available.get(key, (0.0, []))
+                if product.name not in names:
+                    names.append(product.name)
+                available[key] = (max(best, weight), names)
+
+        scores = [0.0] * len(self.recipes)
+        category_weights = {}
+        for (kind, value), (weight, names) in available.items():
+            if kind == "category":
+                category_weights[value] = weight
+                continue
+            for number in self.index.get(value, ()):
+                scores[number] += weight
+
+        # Рецепт подходит, только если есть продукты всех его категорий
+        inverse_size = self.inverse_size
+        candidates = []
+        for categories, numbers in self.groups:
+            if not categories <= category_weights.keys():
+                continue
+            bonus = sum(category_weights[category] for category in categories)
+            candidates.extend(((scores[number] + bonus) * inverse_size[number], number) for number in numbers)
+
+        suggestions = []
+        for score, number in heapq.nlargest(limit, candidates):
+            recipe = self.recipes[number]
+            used = []
+            for key in recipe.keys:
+                for name in available.get(key, (0.0, ()))[1]:
+                    if name not in used:
+                        used.append(name)
+            suggestions.append({
+                "name": recipe.name,
+                "description": recipe.description,
+                "products": used[:max_products],
+                "score": round(score, 3),
+            })
+        return suggestions
+
+
+@lru_cache(maxsize=None)
+def load_catalogue(path=RECIPES_PATH):
+    return RecipeCatalogue.from_file(path)
@@ -0,0 +1,218 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import and_, case, func, literal, or_
+from app import db
+from app.models import Product, RANKS
+from app.categories import user_categories
+from app.utils import as_utc, request_now
+
+# Допустимые порядки постраничного вывода: имя -> колонка ключа (вторая часть ключа - id)
+PAGE_ORDERS = {
+    "expiry": Product.expiry_date,
+    "added": Product.date_added,
+}
+
+
+def encode_cursor(value, id):
+    # value None - курсор в хвосте строк с NULL в колонке порядка
+    raw = json.dumps([value.isoformat() if value is not None else None, id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Разбирает курсор страницы; ValueError, если курсор поврежден."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, id = json.loads(raw)
+        return (datetime.fromisoformat(value) if value is not None else None), int(id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Некорректный курсор: {cursor!r}") from e
+
+
+class ProductRow:
+    """
+    Строка продукта для представлений и шаблонов
+
+    Загружается из колонок (без ORM-экземпляров и identity map); статус и звание
+    приходят из SQL, дни до истечения и возраст считаются один раз при создании
+    относительно времени запроса.
+    """
+
+    __slots__ = (
+        "id", "name", "category", "quantity", "unit", "expiry_date", "date_added",
+        "status", "rank", "days_left", "age_days",
+    )
+
+    def __init__(self, id, name, category, quantity, unit, expiry_date, date_added, status, rank, now):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.quantity = quantity
+        self.unit = unit
+        self.expiry_date = expiry_date
+        self.date_added = date_added
+        self.status = status
+        self.rank = rank
+        # Та же семантика, что у Product.days_until_expiry() и days_in_fridge();
+        # на PostgreSQL date_added - timestamptz, поэтому сравниваем в aware UTC
+        now = as_utc(now)
+        expiry_date = as_utc(expiry_date)
+        date_added = as_utc(date_added) if date_added else None
+        if now > expiry_date:
+            self.days_left = -((now - expiry_date).days)
+        else:
+            self.days_left = (expiry_date - now).days
+        self.age_days = (now - date_added).days if date_added else 0
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "category": self.category,
+            "quantity": self.quantity,
+            "unit": self.unit,
+            "expiry_date": self.expiry_date.isoformat(),
+            "date_added": self.date_added.isoformat() if self.date_added else None,
+            "status": self.status,
+            "rank": self.rank,
+        }
+
+    def __repr__(self):
+        return f"<ProductRow {self.name}>"
+
+
+class ProductRepository:
+    """
+    Запросы к продуктам пользователя для главной страницы.
+
+    Классификация по срокам (просрочен / скоро испортится / свежий) и звания
+    вычисляются в SQL по индексируемым предикатам, поэтому представлениям и
+    шаблонам не нужно считать даты для каждой строки.
+
+    Args:
+        user_id: ID пользователя
+        now: текущее время (naive UTC), по умолчанию время запроса request_now()
+        expiring_days: горизонт "скоро испортится" в днях
+    """
+
+    def __init__(self, user_id, now=None, expiring_days=3):
+        self.user_id = user_id
+        self.now = now or request_now().replace(tzinfo=None)
+        self.expiring_days = expiring_days
+        self.soon = self.now + timedelta(days=expiring_days)
+
+    def _rows(self):
+        return db.session.query(
+            Product.id,
+            Product.name,
+            Product.category,
+            Product.quantity,
+            Product.unit,
+            Product.expiry_date,
+            Product.date_added,
+            self.status_column(),
+            self.rank_column(),
+        ).filter(Product.user_id == self.user_id)
+
+    def _fetch(self, query):
+        return [ProductRow(*row, now=self.now) for row in query]
+
+    def status_column(self):
+        # Совпадает с Product.is_expired() и get_expiring_products()
+        return case(
+            (Product.expiry_date < self.now, literal("expired")),
+            (Product.expiry_date <= self.soon, literal("expiring")),
+            else_=literal("fresh"),
+        ).label("status")
+
+    def rank_column(self):
+        # days_in_fridge() > N  <=>  date_added <= now - (N + 1) дней
+        whens = [
+            (Product.date_added <= self.now - timedelta(days=threshold + 1), literal(title))
+            for threshold, title in RANKS[:-1]
+        ]
+        return case(*whens, else_=literal(RANKS[-1][1])).label("rank")
+
+    def page(self, order="expiry", after=None, limit=50):
+        """
+        Страница продуктов с keyset-пагинацией по (expiry_date, id) или (date_added, id)
+
+        Строки с NULL в колонке порядка (date_added старых строк db_init.sql)
+        идут после остальных по id: отдельный запрос вместо coalesce оставляет
+        применимым индекс (user_id, date_added).
+
+        Args:
+            order: "expiry" или "added"
+            after: курсор последней строки предыдущей страницы
+            limit: размер страницы
+
+        Returns:
+            tuple: ([ProductRow], курсор следующей страницы или None)
+        """
+        column = PAGE_ORDERS[order]
+        value, last_id = decode_cursor(after) if after else (None, None)
+        rows = []
+        if last_id is None or value is not None:
+            query = self._rows()
+            if column.nullable:
+                query = query.filter(column.isnot(None))
+            if last_id is not None:
+                query = query.filter(or_(column > value, and_(column == value, Product.id > last_id)))
+            rows = self._fetch(query.order_by(column, Product.id).limit(limit + 1))
+        if len(rows) <= limit and column.nullable:
+            query = self._rows().filter(column.is_(None))
+            if last_id is not None and value is None:
+                query = query.filter(Product.id > last_id)
+            rows += self._fetch(query.order_by(Product.id).limit(limit + 1 - len(rows)))
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(getattr(last, column.key), last.id)
+        return rows, next_cursor
+
+    def expired(self, limit=None):
+        query = self._rows().filter(Product.expiry_date < self.now).order_by(Product.expiry_date, Product.id)
+        if limit:
+            query = query.limit(limit)
+        return self._fetch(query)
+
+    def expiring_soon(self, limit=None):
+        query = self._rows().filter(
+            Product.expiry_date > self.now,
+            Product.expiry_date <= self.soon,
+        ).order_by(Product.expiry_date, Product.id)
+        if limit:
+            query = query.limit(limit)
+        return self._fetch(query)
+
+    def available(self):
+        """Непросроченные продукты (название, категория, срок) для подбора рецептов."""
+        return (
+            db.session.query(Product.name, Product.category, Product.expiry_date)
+            .filter(Product.user_id == self.user_id, Product.expiry_date >= self.now)
+            .order_by(Product.expiry_date, Product.id)
+            .all()
+        )
+
+    def category_counts(self):
+        """Гистограмма категорий: [(категория, количество)] по убыванию количества."""
+        return user_categories(self.user_id)
+
+    def rank_counts(self):
+        """Количество продуктов по званиям (тиры Product.get_rank) в порядке RANKS."""
+        ranked = (
+            db.session.query(self.rank_column())
+            .filter(Product.user_id == self.user_id)
+            .subquery()
+        )
+        counts = dict(
+            db.session.query(ranked.c.rank, func.count()).group_by(ranked.c.rank).all()
+        )
+        return [(title, counts.get(title, 0)) for _, title in RANKS]
+
+    def veterans(self, limit=5):
+        """Top-N продуктов, дольше всех лежащих в холодильнике."""
+        return self._fetch(self._rows().order_by(Product.date_added, Product.id).limit(limit))
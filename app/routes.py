@@ -1,29 +1,52 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, current_app
 from datetime import datetime, timedelta
 from app import db
 from app.models import Product, ShoppingItem
-from app.utils import get_expiring_products, get_recipe_suggestions, get_expired_message, suggest_shopping_items
+from app.repository import ProductRepository
+from app.stats import get_statistics, invalidate_statistics, longest_living_rows
+from app.shopping import ShoppingItemError, generate_from_low_stock, parse_item
+from app.utils import get_recipe_suggestions, get_expired_message
+from app.frequency import record_added, record_consumed
+from app.events import log_event, removal_kind
+from app.pagecache import cached_page, render_fragment
 from flask_login import login_required, current_user
 
 main = Blueprint("main", __name__)
 
+PAGE_SIZE = 50
+
+
+def product_page(repo, order):
+    try:
+        return repo.page(order=order, after=request.args.get("after"), limit=PAGE_SIZE)
+    except ValueError as e:
+        abort(400, str(e))
+
 
 @main.route("/")
 @login_required
+@cached_page
 def index():
-    products = Product.query.filter_by(user_id=current_user.id).all()
-    expired_products = [p for p in products if p.is_expired()]
-    expiring_soon = get_expiring_products(products, days=3)
-    suggestions = get_recipe_suggestions(products)
-    veterans = sorted(products, key=lambda x: x.days_in_fridge(), reverse=True)[:5]
+    repo = ProductRepository(current_user.id, expiring_days=3)
+
+    # Фрагменты кэшируются по версии данных пользователя; при попадании запросы не выполняются
+    def products():
+        rows, next_cursor = product_page(repo, "expiry")
+        return {"rows": rows, "next_cursor": next_cursor}
 
     return render_template(
         "index.html",
-        products=products,
-        expired_products=expired_products,
-        expiring_soon=expiring_soon,
-        suggestions=suggestions,
-        veterans=veterans,
+        products_table=render_fragment(
+            "index:products:" + request.args.get("after", ""), "_products_table.html", products
+        ),
+        expired_products=repo.expired(limit=10),
+        suggestions_panel=render_fragment(
+            "index:suggestions", "_suggestions.html",
+            lambda: {"suggestions": get_recipe_suggestions(repo.available())},
+        ),
+        veterans_panel=render_fragment(
+            "index:veterans", "_veterans.html", lambda: {"veterans": repo.veterans(limit=5)}
+        ),
         get_expired_message=get_expired_message,
     )
 
@@ -48,7 +71,11 @@ def add_product():
         )
 
         db.session.add(product)
+        db.session.flush()
+        log_event("added", product)
+        record_added(current_user.id, [{"name": name, "category": category, "unit": unit}])
         db.session.commit()
+        invalidate_statistics(current_user.id)
 
         flash(f"Продукт {name} успешно добавлен!", "success")
         return redirect(url_for("main.index"))
@@ -68,7 +95,10 @@ def edit_product(id):
         product.unit = request.form["unit"]
         product.expiry_date = datetime.strptime(request.form["expiry_date"], "%Y-%m-%d")
 
+        if product.user_id is not None:
+            log_event("edited", product)
         db.session.commit()
+        invalidate_statistics(product.user_id)
 
         flash(f"Продукт {product.name} обновлен!", "success")
         return redirect(url_for("main.index"))
@@ -82,7 +112,12 @@ def delete_product(id):
     product = Product.query.get_or_404(id)
 
     db.session.delete(product)
+    if product.user_id is not None:
+        record_consumed(product.user_id, product.name)
+        # ?reason=consumed|discarded; по умолчанию просроченный продукт считается выброшенным
+        log_event(removal_kind(product, request.args.get("reason")), product)
     db.session.commit()
+    invalidate_statistics(product.user_id)
 
     flash(f"Продукт {product.name} удален!", "success")
     return redirect(url_for("main.index"))
@@ -90,19 +125,23 @@ def delete_product(id):
 
 @main.route("/statistics")
 @login_required
+@cached_page(unless=lambda: request.args.get("after"))
 def statistics():
-    products = Product.query.filter_by(user_id=current_user.id).all()
-    longest_living = sorted(products, key=lambda x: x.days_in_fridge(), reverse=True)
-    categories = {}
-
-    for product in products:
-        if product.category in categories:
-            categories[product.category] += 1
-        else:
-            categories[product.category] = 1
+    if request.args.get("after"):
+        # Следующие страницы рейтинга не кэшируются
+        stats = dict(get_statistics(current_user.id, top=PAGE_SIZE))
+        rows, stats["next_cursor"] = product_page(ProductRepository(current_user.id), "added")
+        stats["longest_living"] = longest_living_rows(rows)
+    else:
+        stats = get_statistics(current_user.id, top=PAGE_SIZE)
 
     return render_template(
-        "statistics.html", longest_living=longest_living, categories=categories
+        "statistics.html",
+        longest_living=stats["longest_living"],
+        next_cursor=stats["next_cursor"],
+        categories=stats["categories"],
+        ranks=stats["ranks"],
+        waste=stats["waste"],
     )
 
 
@@ -112,43 +151,22 @@ def shopping_list():
     # Получаем все элементы списка покупок пользователя
     items = ShoppingItem.query.filter_by(user_id=current_user.id).order_by(ShoppingItem.priority, ShoppingItem.is_purchased).all()
     
-    # Получаем категории продуктов для выпадающего списка
-    categories = db.session.query(Product.category).distinct().all()
-    categories = [c[0] for c in categories]
-    
-    # Получаем предложения продуктов на основе истории пользователя
-    suggestions = suggest_shopping_items(current_user.id, db, Product)
-    
-    return render_template("shopping_list.html", items=items, categories=categories, suggestions=suggestions)
+    # Категории и предложения страница загружает отдельно через /api/shopping_items/...
+    return render_template("shopping_list.html", items=items)
 
 
 @main.route("/add_shopping_item", methods=["POST"])
 @login_required
 def add_shopping_item():
-    name = request.form["name"]
-    category = request.form.get("category", "")
-    quantity = request.form.get("quantity", "")
-    unit = request.form.get("unit", "")
-    priority = int(request.form.get("priority", 2))
-    
-    # Проверяем правильность ввода количества
-    if quantity:
-        try:
-            quantity = float(quantity)
-        except ValueError:
-            quantity = None
-    else:
-        quantity = None
+    try:
+        values = parse_item(request.form)
+    except ShoppingItemError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("main.shopping_list"))
+    name = values["name"]
     
     # Создаем новый элемент списка покупок
-    item = ShoppingItem(
-        name=name,
-        category=category,
-        quantity=quantity,
-        unit=unit,
-        priority=priority,
-        user_id=current_user.id
-    )
+    item = ShoppingItem(user_id=current_user.id, **values)
     
     db.session.add(item)
     db.session.commit()
@@ -200,34 +218,13 @@ def toggle_shopping_item(id):
 @main.route("/generate_shopping_list")
 @login_required
 def generate_shopping_list():
-    # Получаем все продукты, которые скоро закончатся (менее 2 единиц)
-    low_stock_products = Product.query.filter(
-        Product.user_id == current_user.id,
-        Product.quantity < 2
-    ).all()
-    
-    # Получаем все текущие элементы списка покупок
-    current_items = ShoppingItem.query.filter_by(
-        user_id=current_user.id,
-        is_purchased=False
-    ).all()
-    current_item_names = [item.name.lower() for item in current_items]
-    
-    # Добавляем продукты с малым количеством в список покупок, если их еще нет там
-    added_count = 0
-    for product in low_stock_products:
-        if product.name.lower() not in current_item_names:
-            item = ShoppingItem(
-                name=product.name,
-                category=product.category,
-                unit=product.unit,
-                priority=1,  # Высокий приоритет для заканчивающихся продуктов
-                user_id=current_user.id
-            )
-            db.session.add(item)
-            added_count += 1
-    
-    db.session.commit()
+    # Заканчивающиеся продукты добавляются одним INSERT ... SELECT
+    added_count = generate_from_low_stock(
+        current_user.id,
+        default=current_app.config["LOW_STOCK_THRESHOLD"],
+        by_category=current_app.config["LOW_STOCK_THRESHOLDS_BY_CATEGORY"],
+        by_unit=current_app.config["LOW_STOCK_THRESHOLDS_BY_UNIT"],
+    )
     
     if added_count > 0:
         flash(f"Автоматически добавлено {added_count} продуктов в список покупок", "success")
@@ -0,0 +1,182 @@
+"""
+Поиск продуктов пользователя по названию для автодополнения.
+
+Результат - различные названия (без учета регистра) с категорией, единицей
+и числом продуктов: сначала совпадения по префиксу (по убыванию числа
+продуктов), затем похожие названия по доле триграмм запроса, найденных в
+названии (как word_similarity в pg_trgm, порог SIMILARITY_THRESHOLD), -
+опечатка в одном из слов длинного названия не мешает его найти.
+
+На PostgreSQL с pg_trgm поиск выполняется в базе по GIN-индексу
+(user_id, lower(name) gin_trgm_ops) из миграции v0009. Иначе (SQLite или
+нет расширения) используется индекс в памяти процесса: отсортированные
+названия для префикса и списки триграмм для нечеткого поиска. Индекс
+строится одним GROUP BY по ix_product_user_lower_name и кэшируется по
+версии продуктов пользователя (product_version): любая запись продуктов его
+сбрасывает, а запись списка покупок - нет.
+"""
+import heapq
+from bisect import bisect_left
+from collections import Counter
+from sqlalchemy import Boolean, case, func, literal, select, text
+from app import db
+from app.cache import TTLCache
+from app.frequency import name_key
+from app.models import Product
+from app.pagecache import product_version
+
+SIMILARITY_THRESHOLD = 0.5
+# С порогом 0.5 у 3 букв слишком мало триграмм ("мол" похоже на "Морковь");
+# 4 буквы и одна опечатка в 6-буквенном слове ("малоко") по-прежнему находятся
+MIN_FUZZY_LENGTH = 4
+MAX_LIMIT = 50
+
+# Индексы названий по (пользователь, версия продуктов); бюджет - по оценке размера индекса
+index_cache = TTLCache(maxsize=1024, ttl=600, maxbytes=64 * 1024 * 1024, sizeof=lambda index: index.nbytes)
+
+# Есть ли pg_trgm и индекс из v0009 (проверяется один раз на engine)
+_trigram_engines = {}
+
+
+def trigrams(key):
+    # Как pg_trgm: каждое слово дополняется двумя пробелами в начале и одним в конце
+    grams = set()
+    for word in key.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """
+    Названия продуктов одного пользователя в памяти
+
+    Args:
+        rows: (ключ lower(name), название, категория, единица, число продуктов)
+    """
+
+    def __init__(self, rows):
+        rows = sorted(rows)
+        self.keys = [row[0] for row in rows]
+        self.entries = [row[1:] for row in rows]
+        self.postings = {}
+        for position, key in enumerate(self.keys):
+            for gram in trigrams(key):
+                self.postings.setdefault(gram, []).append(position)
+        postings = sum(len(positions) for positions in self.postings.values())
+        self.nbytes = 200 * len(self.keys) + 8 * postings + 100 * len(self.postings)
+
+    def prefix(self, key):
+        start = bisect_left(self.keys, key)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(key):
+            end += 1
+        return range(start, end)
+
+    def search(self, query, limit=10):
+        key = name_key(query)
+        prefixed = self.prefix(key)
+        # Больше всего продуктов, при равенстве - по алфавиту (позиция в отсортированном списке)
+        best = heapq.nsmallest(limit, prefixed, key=lambda position: (-self.entries[position][3], position))
+        results = [self.result(position, "prefix", 1.0) for position in best]
+
+        if len(results) < limit and len(key) >= MIN_FUZZY_LENGTH:
+            grams = trigrams(key)
+            common = Counter()
+            for gram in grams:
+                common.update(self.postings.get(gram, ()))
+            matched = set(prefixed)
+            scored = []
+            for position, count in common.items():
+                score = count / len(grams)
+                if score >= SIMILARITY_THRESHOLD and position not in matched:
+                    scored.append((-score, -self.entries[position][3], position))
+            for score, _, position in heapq.nsmallest(limit - len(results), scored):
+                results.append(self.result(position, "fuzzy", -score))
+        return results
+
+    def result(self, position, match, score):
+        name, category, unit, count = self.entries[position]
+        return {"name": name, "category": category, "unit": unit, "products": count,
+                "match": match, "score": round(score, 3)}
+
+
+def name_rows(user_id):
+    key = func.lower(Product.name)
+    return db.session.execute(
+        select(key, func.min(Product.name), func.min(Product.category), func.min(Product.unit), func.count())
+        .where(Product.user_id == user_id)
+        .group_by(key)
+    ).all()
+
+
+def name_index(user_id):
+    """Индекс названий пользователя из кэша (ключ включает версию продуктов) или из базы."""
+    cache_key = (user_id, product_version(user_id))
+    index = index_cache.get(cache_key)
+    if index is None:
+        index = NameIndex(tuple(row) for row in name_rows(user_id))
+        index_cache.set(cache_key, index)
+    return index
+
+
+def use_trigram_index():
+    engine = db.engine
+    if engine not in _trigram_engines:
+        available = False
+        if engine.dialect.name == "postgresql":
+            available = db.session.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_product_user_name_trgm'")
+            ).first() is not None
+        _trigram_engines[engine] = available
+    return _trigram_engines[engine]
+
+
+def trigram_search(user_id, query, limit):
+    key = name_key(query)
+    lower_name = func.lower(Product.name)
+    is_prefix = lower_name.startswith(key, autoescape=True)
+    condition = is_prefix
+    if len(key) >= MIN_FUZZY_LENGTH:
+        # q <% name - word_similarity(q, name) не ниже порога; оператор использует GIN-индекс
+        db.session.execute(
+            select(func.set_config("pg_trgm.word_similarity_threshold", str(SIMILARITY_THRESHOLD), True))
+        )
+        condition = is_prefix | literal(key).op("<%", return_type=Boolean)(lower_name)
+    prefix = func.bool_or(is_prefix)
+    score = func.max(func.word_similarity(key, lower_name))
+    rows = db.session.execute(
+        select(
+            func.min(Product.name), func.min(Product.category), func.min(Product.unit),
+            func.count(), prefix, score,
+        )
+        .where(Product.user_id == user_id, condition)
+        .group_by(lower_name)
+        .order_by(prefix.desc(), case((prefix, literal(1.0)), else_=score).desc(), func.count().desc(), lower_name)
+        .limit(limit)
+    ).all()
+    return [
+        {"name": name, "category": category, "unit": unit, "products": count,
+         "match": "prefix" if matched else "fuzzy", "score": 1.0 if matched else round(float(score), 3)}
+        for name, category, unit, count, matched, score in rows
+    ]
+
+
+def search_products(user_id, query, limit=10):
+    """
+    Названия продуктов пользователя, подходящие к строке автодополнения
+
+    Args:
+        user_id: ID пользователя
+        query: введенная часть названия
+        limit: максимальное число результатов (не больше MAX_LIMIT)
+
+    Returns:
+        list: словари name, category, unit, products, match (prefix / fuzzy), score
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    if not name_key(query):
+        return []
+    if use_trigram_index():
+        return trigram_search(user_id, query, limit)
+    return name_index(user_id).search(query, limit)
@@ -0,0 +1,286 @@
+"""
+Операции со списком покупок.
+
+Пакетные операции выполняются одним UPDATE/DELETE по списку id, ограниченным
+владельцем (user_id), а весь пакет - в одной транзакции с одним commit.
+Автоматическое пополнение списка - один INSERT ... SELECT без загрузки
+продуктов в память. Core-запросы обходят события flush, поэтому дельты для
+открытых страниц (app/realtime.py) публикуются здесь явно.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import case, delete, func, insert, literal, not_, select, update
+from app import db
+from app.models import Product, ShoppingItem
+from app.pagecache import bump_data_version
+from app.realtime import publish, publish_resync
+
+OPERATIONS = ("add", "toggle", "purchase", "unpurchase", "delete")
+MAX_BATCH = 500
+
+
+class ShoppingItemError(ValueError):
+    pass
+
+
+def parse_name(value):
+    name = str(value or "").strip()
+    if not name:
+        raise ShoppingItemError("Не указано название продукта")
+    return name[:100]
+
+
+def parse_quantity(value):
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_priority(value):
+    try:
+        priority = int(value or 2)
+    except (TypeError, ValueError):
+        raise ShoppingItemError("Приоритет должен быть числом 1-3")
+    if priority not in (1, 2, 3):
+        raise ShoppingItemError("Приоритет должен быть числом 1-3")
+    return priority
+
+
+def parse_purchased(value):
+    if not isinstance(value, bool):
+        raise ShoppingItemError("is_purchased должен быть true или false")
+    return value
+
+
+# Поле элемента -> проверка значения; is_purchased меняется только у существующих элементов
+FIELDS = {
+    "name": parse_name,
+    "category": lambda value: str(value or "")[:50],
+    "quantity": parse_quantity,
+    "unit": lambda value: str(value or "")[:20],
+    "priority": parse_priority,
+    "is_purchased": parse_purchased,
+}
+ITEM_FIELDS = ("name", "category", "quantity", "unit", "priority")
+
+
+def parse_item(data):
+    """Проверяет поля нового элемента списка покупок (из формы или JSON)."""
+    if not isinstance(data, dict):
+        raise ShoppingItemError("Элемент должен быть объектом")
+    return {field: FIELDS[field](data.get(field)) for field in ITEM_FIELDS}
+
+
+def parse_changes(data):
+    """Проверяет частичное изменение элемента (PATCH): только переданные поля."""
+    if not isinstance(data, dict) or not data:
+        raise ShoppingItemError("Нет изменяемых полей")
+    unknown = sorted(set(data) - set(FIELDS))
+    if unknown:
+        raise ShoppingItemError(f"Неизвестные поля: {', '.join(unknown)}")
+    return {field: FIELDS[field](value) for field, value in data.items()}
+
+
+def update_item(user_id, item_id, data):
+    """
+    Изменяет переданные поля элемента списка покупок пользователя
+
+    Returns:
+        ShoppingItem или None, если у пользователя нет такого элемента
+
+    Raises:
+        ShoppingItemError: если изменения некорректны
+    """
+    changes = parse_changes(data)
+    item = db.session.get(ShoppingItem, item_id)
+    if item is None or item.user_id != user_id:
+        return None
+    for field, value in changes.items():
+        setattr(item, field, value)
+    db.session.commit()
+    return item
+
+
+def parse_ids(operation):
+    ids = operation.get("ids")
+    if not isinstance(ids, list) or not ids:
+        raise ShoppingItemError(f"Операция {operation.get('op')}: нужен непустой список ids")
+    try:
+        return {int(id) for id in ids}
+    except (TypeError, ValueError):
+        raise ShoppingItemError(f"Операция {operation.get('op')}: ids должны быть целыми числами")
+
+
+def apply_batch(user_id, operations):
+    """
+    Применяет пакет операций к списку покупок пользователя
+
+    Args:
+        user_id: ID пользователя
+        operations: список словарей {"op": ..., "ids": [...]} или {"op": "add", "items": [...]}
+
+    Returns:
+        dict: items - актуальное состояние затронутых элементов, deleted - удаленные id,
+        missing - id, которых нет у пользователя
+
+    Raises:
+        ShoppingItemError: если пакет некорректен (ничего не применяется)
+    """
+    if not isinstance(operations, list) or not operations:
+        raise ShoppingItemError("Нужен непустой список operations")
+
+    # Сначала проверяем весь пакет, чтобы не применять его частично
+    parsed = []
+    size = 0
+    for operation in operations:
+        op = operation.get("op") if isinstance(operation, dict) else None
+        if op not in OPERATIONS:
+            raise ShoppingItemError(f"Неизвестная операция: {op}")
+        if op == "add":
+            items = operation.get("items")
+            if not isinstance(items, list) or not items:
+                raise ShoppingItemError("Операция add: нужен непустой список items")
+            if not all(isinstance(item, dict) for item in items):
+                raise ShoppingItemError("Операция add: элементы items должны быть объектами")
+            payload = [parse_item(item) for item in items]
+        else:
+            payload = parse_ids(operation)
+        size += len(payload)
+        parsed.append((op, payload))
+    if size > MAX_BATCH:
+        raise ShoppingItemError(f"Слишком большой пакет: не более {MAX_BATCH} элементов")
+
+    requested = set().union(*(payload for op, payload in parsed if op != "add"))
+    owned = set()
+    if requested:
+        owned = set(db.session.scalars(
+            select(ShoppingItem.id).where(ShoppingItem.user_id == user_id, ShoppingItem.id.in_(requested))
+        ))
+
+    touched = set()
+    deleted = set()
+    items = []
+    try:
+        for op, payload in parsed:
+            if op == "add":
+                items = [ShoppingItem(user_id=user_id, **values) for values in payload]
+                db.session.add_all(items)
+                db.session.flush()
+                touched.update(item.id for item in items)
+                continue
+
+            ids = list(payload & owned - deleted)
+            if not ids:
+                continue
+            scope = (ShoppingItem.user_id == user_id, ShoppingItem.id.in_(ids))
+            if op == "delete":
+                db.session.execute(delete(ShoppingItem).where(*scope), execution_options={"synchronize_session": False})
+                deleted.update(ids)
+                touched.difference_update(ids)
+                continue
+
+            if op == "toggle":
+                value = not_(func.coalesce(ShoppingItem.is_purchased, False))
+            else:
+                value = op == "purchase"
+            db.session.execute(
+                update(ShoppingItem).where(*scope).values(is_purchased=value),
+                execution_options={"synchronize_session": False},
+            )
+            touched.update(ids)
+        if touched:
+            items = [item.to_dict() for item in db.session.scalars(
+                select(ShoppingItem)
+                .where(ShoppingItem.user_id == user_id, ShoppingItem.id.in_(touched))
+                .order_by(ShoppingItem.priority, ShoppingItem.is_purchased, ShoppingItem.id)
+                .execution_options(populate_existing=True)
+            )]
+        if touched or deleted:
+            # UPDATE / DELETE выполняются в обход ORM и событий flush
+            bump_data_version(user_id)
+            publish(user_id, "shopping_items", changed=items, deleted=deleted)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        "items": items,
+        "deleted": sorted(deleted),
+        "missing": sorted(requested - owned),
+    }
+
+
+def low_stock_threshold(default, by_category=None, by_unit=None):
+    """SQL-выражение порога "заканчивается" для строки product: категория > единица > default."""
+    whens = [(Product.category == category, value) for category, value in (by_category or {}).items()]
+    whens += [(Product.unit == unit, value) for unit, value in (by_unit or {}).items()]
+    if not whens:
+        return literal(default)
+    return case(*whens, else_=literal(default))
+
+
+def generate_from_low_stock(user_id, default=2, by_category=None, by_unit=None):
+    """
+    Добавляет в список покупок заканчивающиеся продукты одним INSERT ... SELECT
+
+    Продукт попадает в список, если его количество меньше порога, а в
+    некупленной части списка нет элемента с тем же названием (без учета
+    регистра). Одинаковые названия среди продуктов добавляются один раз:
+    название, категория и единица берутся из одной, последней добавленной
+    строки группы.
+
+    Returns:
+        int: количество добавленных элементов
+    """
+    threshold = low_stock_threshold(default, by_category, by_unit)
+    max_threshold = max([default, *(by_category or {}).values(), *(by_unit or {}).values()])
+    lower_name = func.lower(Product.name)
+
+    already_listed = (
+        select(ShoppingItem.id)
+        .where(
+            ShoppingItem.user_id == user_id,
+            ShoppingItem.is_purchased == False,  # noqa: E712
+            func.lower(ShoppingItem.name) == lower_name,
+        )
+        .exists()
+    )
+    ranked = (
+        select(
+            Product.name,
+            Product.category,
+            Product.unit,
+            func.row_number().over(partition_by=lower_name, order_by=Product.id.desc()).label("recency"),
+        )
+        .where(
+            Product.user_id == user_id,
+            # Диапазон по индексу (user_id, quantity), затем точный порог
+            Product.quantity < max_threshold,
+            Product.quantity < threshold,
+            ~already_listed,
+        )
+        .subquery()
+    )
+    low_stock = select(
+        ranked.c.name,
+        ranked.c.category,
+        ranked.c.unit,
+        literal(1),  # Высокий приоритет для заканчивающихся продуктов
+        literal(False),
+        literal(datetime.now(timezone.utc)),
+        literal(user_id),
+    ).where(ranked.c.recency == 1)
+    result = db.session.execute(
+        insert(ShoppingItem).from_select(
+            ["name", "category", "unit", "priority", "is_purchased", "date_added", "user_id"],
+            low_stock,
+        )
+    )
+    if result.rowcount:
+        bump_data_version(user_id)
+        publish_resync(user_id, "shopping_items")
+    db.session.commit()
+    return result.rowcount
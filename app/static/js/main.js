@@ -26,21 +26,453 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     // Анимация для сообщений
-    const alerts = document.querySelectorAll('.alert');
-    alerts.forEach(alert => {
+    document.querySelectorAll('.alert-dismissible').forEach(fadeAlert);
+
+    const shoppingPage = document.getElementById('shopping-list-page');
+    if (shoppingPage) {
+        initShoppingList(shoppingPage);
+    }
+
+    const productsPanel = document.getElementById('products-panel');
+    if (productsPanel) {
+        initProductsPanel(productsPanel);
+    }
+
+    document.querySelectorAll('input[data-search-url]').forEach(initNameAutocomplete);
+});
+
+function selectOption(select, value) {
+    if (!select) return;
+    for (let i = 0; i < select.options.length; i++) {
+        if (select.options[i].value === value) {
+            select.selectedIndex = i;
+            break;
+        }
+    }
+}
+
+// Пауза в наборе перед запросом подсказок, мс
+const SEARCH_DELAY = 150;
+
+// Автодополнение названия продукта из /api/products/search (datalist поля);
+// запрос уходит после паузы в наборе, незавершенный предыдущий запрос отменяется
+function initNameAutocomplete(input) {
+    const datalist = document.getElementById(input.getAttribute('list'));
+    let results = [];
+    let timer = null;
+    let controller = null;
+
+    input.addEventListener('input', function() {
+        // Выбрана подсказка: подставляем ее категорию и единицу
+        const chosen = results.find(result => result.name === input.value);
+        if (chosen) {
+            selectOption(input.form.elements.category, chosen.category);
+            selectOption(input.form.elements.unit, chosen.unit);
+            return;
+        }
+
+        clearTimeout(timer);
+        const query = input.value.trim();
+        if (!query) {
+            results = [];
+            datalist.replaceChildren();
+            return;
+        }
+        timer = setTimeout(() => {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            fetch(input.dataset.searchUrl + '?q=' + encodeURIComponent(query), {
+                headers: {'X-Requested-With': 'XMLHttpRequest'},
+                signal: controller.signal
+            }).then(response => response.json()).then(data => {
+                results = data.results;
+                datalist.replaceChildren(...results.map(result => {
+                    const option = document.createElement('option');
+                    option.value = result.name;
+                    option.label = result.category;
+                    return option;
+                }));
+            }).catch(error => {
+                // Подсказки необязательны: ошибки и отмененные запросы не показываем
+                if (error.name !== 'AbortError') console.warn(error);
+            });
+        }, SEARCH_DELAY);
+    });
+}
+
+// Поток обновлений /api/events: дельты после каждой записи продуктов и списка покупок,
+// в том числе из других вкладок и от других членов семьи. Сообщения, пропущенные
+// за время обрыва соединения, восстанавливаются полной загрузкой данных (resync)
+function subscribeToChanges(url, onChange) {
+    if (!url || !window.EventSource) return;
+    const source = new EventSource(url);
+    let connected = false;
+    source.addEventListener('open', function() {
+        if (connected) onChange({resync: ['products', 'shopping_items']});
+        connected = true;
+    });
+    source.addEventListener('change', function(e) {
+        onChange(JSON.parse(e.data));
+    });
+}
+
+// Статус срока -> класс строки и бейдж, как в _products_table.html
+const PRODUCT_STATUSES = {
+    expired: {row: 'table-danger', badge: 'bg-danger', text: 'Просрочен'},
+    expiring: {row: 'table-warning', badge: 'bg-warning text-dark', text: 'Скоро испортится'},
+    fresh: {row: '', badge: 'bg-success', text: 'Свежий'}
+};
+
+// Таблица продуктов главной страницы: строки правятся по дельтам без перезагрузки
+function initProductsPanel(panel) {
+    const urls = panel.dataset;
+
+    function formatDate(iso) {
+        return iso.slice(8, 10) + '.' + iso.slice(5, 7) + '.' + iso.slice(0, 4);
+    }
+
+    // Как str(float) в шаблоне: 1.0, 0.5
+    function formatQuantity(quantity) {
+        return Number.isInteger(quantity) ? quantity.toFixed(1) : String(quantity);
+    }
+
+    function link(url, className, icon) {
+        const a = document.createElement('a');
+        a.href = url;
+        a.className = 'btn btn-sm ' + className;
+        a.innerHTML = '<i class="bi ' + icon + '"></i>';
+        return a;
+    }
+
+    // Та же разметка, что и в _products_table.html
+    function renderRow(product, table) {
+        const status = PRODUCT_STATUSES[product.status];
+        const tr = document.createElement('tr');
+        tr.className = status.row;
+        tr.dataset.productId = product.id;
+        tr.dataset.expiry = product.expiry_date;
+        [
+            product.name,
+            product.category,
+            formatQuantity(product.quantity) + ' ' + product.unit,
+            formatDate(product.expiry_date)
+        ].forEach(text => {
+            const td = document.createElement('td');
+            td.textContent = text;
+            tr.appendChild(td);
+        });
+
+        const badges = document.createElement('td');
+        const badge = document.createElement('span');
+        badge.className = 'badge ' + status.badge;
+        badge.textContent = status.text;
+        const rank = document.createElement('span');
+        rank.className = 'badge bg-info text-dark';
+        rank.textContent = product.rank;
+        badges.append(badge, ' ', rank);
+
+        const actions = document.createElement('td');
+        const remove = link(table.dataset.deleteUrl.replace(/0$/, product.id), 'btn-outline-danger', 'bi-trash');
+        remove.addEventListener('click', function(e) {
+            if (!confirm('Вы уверены?')) e.preventDefault();
+        });
+        actions.append(link(table.dataset.editUrl.replace(/0$/, product.id), 'btn-outline-primary', 'bi-pencil'), ' ', remove);
+
+        tr.append(badges, actions);
+        return tr;
+    }
+
+    // Порядок страницы - (expiry_date, id), как у курсора ProductRepository.page
+    function before(expiry, id, row) {
+        return expiry < row.dataset.expiry || (expiry === row.dataset.expiry && id < Number(row.dataset.productId));
+    }
+
+    function upsertRow(table, product) {
+        const tbody = table.tBodies[0];
+        const existing = tbody.querySelector('tr[data-product-id="' + product.id + '"]');
+        if (existing) existing.remove();
+        const rows = [...tbody.rows];
+        // Продукт, который попадает на предыдущие или следующие страницы, здесь не показываем
+        if (!table.dataset.firstPage && rows.length && before(product.expiry_date, product.id, rows[0])) return;
+        const next = rows.find(row => before(product.expiry_date, product.id, row));
+        if (!next && table.dataset.hasNext) return;
+        tbody.insertBefore(renderRow(product, table), next || null);
+    }
+
+    function reloadProducts(table) {
+        fetch(urls.productsUrl, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+            .then(response => response.json())
+            .then(data => {
+                if (!data.items.length) {
+                    window.location.reload();
+                    return;
+                }
+                table.tBodies[0].replaceChildren(...data.items.map(product => renderRow(product, table)));
+                table.dataset.hasNext = data.next ? '1' : '';
+            })
+            .catch(error => console.warn(error));
+    }
+
+    subscribeToChanges(urls.eventsUrl, function(change) {
+        const table = document.getElementById('products-table');
+        const resync = (change.resync || []).includes('products');
+        if (!resync && !change.products) return;
+        // Пустой холодильник и следующие страницы проще отрисовать заново на сервере
+        if (!table || (resync && !table.dataset.firstPage)) {
+            window.location.reload();
+            return;
+        }
+        if (resync) {
+            reloadProducts(table);
+            return;
+        }
+        change.products.deleted.forEach(id => {
+            const row = table.tBodies[0].querySelector('tr[data-product-id="' + id + '"]');
+            if (row) row.remove();
+        });
+        change.products.changed.forEach(product => upsertRow(table, product));
+        if (!table.tBodies[0].rows.length) window.location.reload();
+    });
+}
+
+function fadeAlert(alert) {
+    alert.style.opacity = '0';
+    alert.style.transition = 'opacity 0.5s ease';
+    
+    setTimeout(() => {
+        alert.style.opacity = '1';
+    }, 100);
+    
+    // Автоматическое скрытие сообщений через 5 секунд
+    setTimeout(() => {
         alert.style.opacity = '0';
-        alert.style.transition = 'opacity 0.5s ease';
-        
-        setTimeout(() => {
-            alert.style.opacity = '1';
-        }, 100);
-        
-        // Автоматическое скрытие сообщений через 5 секунд
         setTimeout(() => {
-            alert.style.opacity = '0';
-            setTimeout(() => {
-                alert.remove();
-            }, 500);
-        }, 5000);
+            alert.remove();
+        }, 500);
+    }, 5000);
+}
+
+// Сообщение в стиле flash без перезагрузки страницы
+function showAlert(message, category, before) {
+    const alert = document.createElement('div');
+    alert.className = 'alert alert-' + category + ' alert-dismissible fade show';
+    alert.textContent = message;
+    const close = document.createElement('button');
+    close.type = 'button';
+    close.className = 'btn-close';
+    close.dataset.bsDismiss = 'alert';
+    alert.appendChild(close);
+    before.parentNode.insertBefore(alert, before);
+    fadeAlert(alert);
+}
+
+// Список покупок: изменения отправляются в /api/shopping_items, DOM обновляется на месте
+function initShoppingList(page) {
+    const urls = page.dataset;
+    const list = page.querySelector('.shopping-list');
+    const empty = document.getElementById('shopping-list-empty');
+    const form = document.getElementById('shopping-item-form');
+
+    function request(method, url, body) {
+        return fetch(url, {
+            method: method,
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Requested-With': 'XMLHttpRequest'
+            },
+            body: body === undefined ? undefined : JSON.stringify(body)
+        }).then(response => response.json().then(data => {
+            if (!response.ok) {
+                throw new Error(data.error || 'Ошибка сервера: ' + response.status);
+            }
+            return data;
+        }));
+    }
+
+    function fail(error) {
+        showAlert(error.message, 'danger', page);
+    }
+
+    function updateEmpty() {
+        empty.classList.toggle('d-none', list.children.length > 0);
+    }
+
+    function renderItemState(item) {
+        const checkbox = document.getElementById('item-' + item.id);
+        if (!checkbox) return;
+        const label = checkbox.nextElementSibling;
+        checkbox.checked = item.is_purchased;
+        label.classList.toggle('text-decoration-line-through', item.is_purchased);
+        checkbox.closest('li').classList.toggle('text-muted', item.is_purchased);
+        checkbox.closest('li').classList.toggle('bg-light', item.is_purchased);
+    }
+
+    // Та же разметка, что и в shopping_list.html
+    function renderItem(item) {
+        const li = document.createElement('li');
+        li.className = 'list-group-item d-flex justify-content-between align-items-center';
+        li.dataset.itemId = item.id;
+        li.dataset.priority = item.priority;
+
+        const check = document.createElement('div');
+        check.className = 'form-check flex-grow-1';
+        const checkbox = document.createElement('input');
+        checkbox.className = 'form-check-input shopping-checkbox';
+        checkbox.type = 'checkbox';
+        checkbox.id = 'item-' + item.id;
+        checkbox.dataset.itemId = item.id;
+        const label = document.createElement('label');
+        label.className = 'form-check-label';
+        label.htmlFor = checkbox.id;
+        label.append(item.name + ' ');
+        if (item.quantity) {
+            const quantity = document.createElement('small');
+            quantity.className = 'text-secondary';
+            quantity.textContent = '(' + item.quantity + ' ' + (item.unit || '') + ')';
+            label.appendChild(quantity);
+        }
+        if (item.priority === 1 || item.priority === 3) {
+            const badge = document.createElement('span');
+            badge.className = 'badge ms-2 ' + (item.priority === 1 ? 'bg-danger' : 'bg-secondary');
+            badge.textContent = item.priority === 1 ? 'Важно' : 'Низкий';
+            label.appendChild(badge);
+        }
+        check.append(checkbox, label);
+
+        const remove = document.createElement('a');
+        remove.href = '#';
+        remove.className = 'btn btn-sm btn-outline-danger delete-shopping-item';
+        remove.dataset.itemId = item.id;
+        remove.innerHTML = '<i class="bi bi-trash"></i>';
+
+        li.append(check, remove);
+        return li;
+    }
+
+    // Новый элемент встает перед первым элементом с более низким приоритетом
+    function insertItem(item) {
+        const li = renderItem(item);
+        const next = [...list.children].find(other => Number(other.dataset.priority) > item.priority);
+        list.insertBefore(li, next || null);
+        renderItemState(item);
+        updateEmpty();
+    }
+
+    // Клики по чекбоксам собираются в пакет и отправляются одним запросом
+    const pendingToggles = new Map();
+    let flushTimer = null;
+
+    function flushToggles() {
+        flushTimer = null;
+        // Два клика по одному элементу взаимно гасятся
+        const ids = [...pendingToggles].filter(([id, count]) => count % 2 === 1).map(([id]) => id);
+        pendingToggles.clear();
+        if (!ids.length) return;
+
+        request('POST', urls.batchUrl, {operations: [{op: 'toggle', ids: ids}]})
+            .then(data => data.items.forEach(renderItemState))
+            .catch(fail);
+    }
+
+    list.addEventListener('change', function(e) {
+        if (!e.target.classList.contains('shopping-checkbox')) return;
+        const id = Number(e.target.dataset.itemId);
+        pendingToggles.set(id, (pendingToggles.get(id) || 0) + 1);
+        renderItemState({id: id, is_purchased: e.target.checked});
+
+        clearTimeout(flushTimer);
+        flushTimer = setTimeout(flushToggles, 400);
+    });
+
+    list.addEventListener('click', function(e) {
+        const button = e.target.closest('.delete-shopping-item');
+        if (!button) return;
+        e.preventDefault();
+        request('DELETE', urls.itemsUrl + '/' + button.dataset.itemId)
+            .then(() => {
+                button.closest('li').remove();
+                updateEmpty();
+            })
+            .catch(fail);
+    });
+
+    form.addEventListener('submit', function(e) {
+        e.preventDefault();
+        const values = Object.fromEntries(new FormData(form));
+        request('POST', urls.itemsUrl, values)
+            .then(data => {
+                // Дельта /api/events могла прийти раньше ответа: заменяем, а не добавляем
+                replaceItem(data.item);
+                form.reset();
+                showAlert("Продукт '" + data.item.name + "' добавлен в список покупок", 'success', page);
+            })
+            .catch(fail);
+    });
+
+    // Категории и предложения не нужны для отметки покупок: загружаются отдельно после отрисовки
+    const categorySelect = document.getElementById('category');
+    request('GET', urls.categoriesUrl).then(data => {
+        data.categories.forEach(category => categorySelect.add(new Option(category, category)));
+    }).catch(fail);
+
+    function renderSuggestions(suggestions, container, buttonClass, showFrequency) {
+        suggestions.forEach(suggestion => {
+            const column = document.createElement('div');
+            column.className = 'col-md-6 mb-2';
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'btn btn-sm w-100 ' + buttonClass;
+            button.append(suggestion.name);
+            if (showFrequency) {
+                const badge = document.createElement('span');
+                badge.className = 'badge bg-secondary ms-1';
+                badge.textContent = suggestion.frequency + 'x';
+                button.append(' ', badge);
+            }
+            button.addEventListener('click', function() {
+                document.getElementById('name').value = suggestion.name;
+                selectOption(categorySelect, suggestion.category);
+                selectOption(document.getElementById('unit'), suggestion.unit);
+            });
+            column.appendChild(button);
+            container.appendChild(column);
+        });
+        container.closest('.card').classList.toggle('d-none', suggestions.length === 0);
+    }
+
+    // Изменения из других вкладок и от других членов семьи
+    function replaceItem(item) {
+        const li = list.querySelector('li[data-item-id="' + item.id + '"]');
+        if (li) li.remove();
+        insertItem(item);
+    }
+
+    function reloadItems() {
+        request('GET', urls.itemsUrl).then(data => {
+            list.replaceChildren();
+            data.items.forEach(insertItem);
+            updateEmpty();
+        }).catch(fail);
+    }
+
+    subscribeToChanges(urls.eventsUrl, function(change) {
+        if ((change.resync || []).includes('shopping_items')) {
+            reloadItems();
+            return;
+        }
+        const items = change.shopping_items;
+        if (!items) return;
+        items.deleted.forEach(id => {
+            const li = list.querySelector('li[data-item-id="' + id + '"]');
+            if (li) li.remove();
+        });
+        // Элементы с еще не отправленными кликами не трогаем: их состояние придет в ответе пакета
+        items.changed.filter(item => !pendingToggles.has(item.id)).forEach(replaceItem);
+        updateEmpty();
     });
-});
\ No newline at end of file
+
+    request('GET', urls.suggestionsUrl).then(data => {
+        renderSuggestions(data.popular, document.getElementById('popular-suggestions'), 'btn-outline-primary', true);
+        renderSuggestions(data.restock, document.getElementById('restock-suggestions'), 'btn-outline-warning', false);
+    }).catch(fail);
+}
@@ -0,0 +1,48 @@
+from app.analytics import waste_report
+from app.cache import TTLCache
+from app.pagecache import data_version
+from app.repository import ProductRepository
+
+# (версия данных, агрегаты) по пользователю; сбрасываются при изменении продуктов,
+# а версия данных - общая для всех процессов (ее увеличивает и воркер итогов порчи);
+# ttl ограничивает устаревание званий
+stats_cache = TTLCache(maxsize=4096, ttl=300)
+
+
+def longest_living_rows(rows):
+    return [
+        {"id": row.id, "name": row.name, "category": row.category, "days": row.age_days, "rank": row.rank}
+        for row in rows
+    ]
+
+
+def get_statistics(user_id, top=50):
+    """
+    Возвращает агрегированную статистику пользователя из кэша или из базы
+
+    Args:
+        user_id: ID пользователя
+        top: размер первой страницы рейтинга "долгожителей"
+
+    Returns:
+        dict: categories, ranks, longest_living, next_cursor, waste (см. waste_report)
+    """
+    version = data_version(user_id)
+    cached = stats_cache.get(user_id)
+    stats = cached[1] if cached is not None and cached[0] == version else None
+    if stats is None:
+        repo = ProductRepository(user_id)
+        rows, next_cursor = repo.page(order="added", limit=top)
+        stats = {
+            "categories": repo.category_counts(),
+            "ranks": repo.rank_counts(),
+            "longest_living": longest_living_rows(rows),
+            "next_cursor": next_cursor,
+            "waste": waste_report(user_id),
+        }
+        stats_cache.set(user_id, (version, stats))
+    return stats
+
+
+def invalidate_statistics(user_id):
+    stats_cache.delete(user_id)
@@ -1,5 +1,28 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import random
+from flask import g, has_request_context
+from app.recipes import load_catalogue
+
+def request_now():
+    """
+    Текущее время (aware UTC), одно на весь запрос
+
+    Все вычисления сроков в пределах запроса (статусы, дни до истечения, звания)
+    используют одно и то же значение, поэтому строки одной страницы согласованы
+    между собой и с SQL-классификацией ProductRepository. Вне запроса
+    (воркер, скрипты) возвращает текущее время.
+    """
+    if not has_request_context():
+        return datetime.now(timezone.utc)
+    if "now" not in g:
+        g.now = datetime.now(timezone.utc)
+    return g.now
+
+def as_utc(value):
+    # Даты в базе хранятся как naive UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
 
 def get_expiring_products(products, days=3):
     today = datetime.utcnow()
@@ -27,66 +50,6 @@ def get_expired_message(product):
     ]
     return random.choice(messages)
 
-def get_recipe_suggestions(products):
-    valid_products = [p for p in products if not p.is_expired()]
-    
-    if len(valid_products) < 2:
-        return []
-    
-    suggestions = []
-    
-    if any(p.category == "Овощи" for p in valid_products) and any(p.category == "Мясо" for p in valid_products):
-        suggestions.append({
-            "name": "Мясо с овощами",
-            "products": [p.name for p in valid_products if p.category in ["Овощи", "Мясо"]][:4],
-            "description": "Простое и вкусное блюдо из мяса с овощами."
-        })
-    
-    if any(p.category == "Молочные продукты" for p in valid_products) and any(p.category == "Фрукты" for p in valid_products):
-        suggestions.append({
-            "name": "Фруктовый смузи",
-            "products": [p.name for p in valid_products if p.category in ["Молочные продукты", "Фрукты"]][:3],
-            "description": "Освежающий смузи из фруктов и молочных продуктов."
-        })
-    
-    return suggestions
-
-def suggest_shopping_items(user_id, db, Product):
-    """
-    Предлагает часто добавляемые пользователем продукты для списка покупок
-    
-    Args:
-        user_id: ID пользователя
-        db: экземпляр базы данных
-        Product: модель Product
-        
-    Returns:
-        list: список словарей с предложениями продуктов
-    """
-    # Получаем все продукты пользователя с группировкой по названию и подсчетом количества
-    product_counts = db.session.query(
-        Product.name, 
-        Product.category, 
-        Product.unit, 
-        db.func.count(Product.id).label('count')
-    ).filter(
-        Product.user_id == user_id
-    ).group_by(
-        Product.name, 
-        Product.category, 
-        Product.unit
-    ).order_by(
-        db.desc('count')
-    ).limit(10).all()
-    
-    # Преобразуем результаты в список словарей
-    suggestions = []
-    for name, category, unit, count in product_counts:
-        suggestions.append({
-            "name": name,
-            "category": category,
-            "unit": unit,
-            "frequency": count
-        })
-    
-    return suggestions
\ No newline at end of file
+def get_recipe_suggestions(valid_products, limit=3):
+    # valid_products - уже отфильтрованные непросроченные продукты (ProductRepository.available)
+    return load_catalogue().suggest(valid_products, limit=limit)
@@ -0,0 +1,124 @@
+"""
+Бенчмарк аналитики порчи на журнале событий (по умолчанию 1 000 000 событий).
+
+Сравниваются пересчет итогов через массивы NumPy (app.analytics) и тот же
+подсчет циклом Python по строкам журнала, с чтением журнала и без него (на
+SQLite чтение строк занимает большую часть времени); затем измеряются пересчет
+итогов одного пользователя (проход воркера) и чтение раздела статистики.
+
+    python -m benchmarks.analytics
+    python -m benchmarks.analytics --events 100000 --users 100 --database postgresql://...
+"""
+import argparse
+import random
+import statistics as st
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.analytics import ANALYTICS_COLUMNS, aggregate, load_columns, rebuild_rollups, waste_report, write_rollups
+from app.events import KIND_CODES, iter_events
+from app.migrations import upgrade_database
+from app.models import ProductEvent, WasteRollup
+from benchmarks.datagen import CATEGORIES, NAMES, UNITS, insert_rows
+
+
+def event_rows(count, users, rng, days=730, now=None):
+    # Жизненный цикл продукта: added, иногда expired, затем consumed или discarded
+    now = now or datetime.utcnow()
+    product_id = 0
+    produced = 0
+    while produced < count:
+        product_id += 1
+        added = now - timedelta(days=rng.uniform(0, days))
+        expiry = added + timedelta(days=rng.uniform(1, 30))
+        removed = added + timedelta(days=rng.expovariate(1 / 10))
+        snapshot = {
+            "user_id": rng.randint(1, users),
+            "product_id": product_id,
+            "name": rng.choice(NAMES),
+            "category": rng.choice(CATEGORIES),
+            "quantity": 1.0,
+            "unit": rng.choice(UNITS),
+            "expiry_date": expiry,
+            "date_added": added,
+        }
+        lifecycle = [("added", added)]
+        if removed > expiry:
+            lifecycle.append(("expired", expiry))
+        if removed < now:
+            lifecycle.append(("discarded" if removed > expiry or rng.random() < 0.1 else "consumed", removed))
+        for kind, occurred_at in lifecycle[:count - produced]:
+            yield dict(snapshot, kind=KIND_CODES[kind], occurred_at=occurred_at)
+            produced += 1
+
+
+def python_rollups():
+    # Тот же подсчет без NumPy: цикл по строкам журнала
+    kinds = {code: kind for kind, code in KIND_CODES.items()}
+    totals = defaultdict(lambda: defaultdict(float))
+    for rows in iter_events(columns=ANALYTICS_COLUMNS):
+        for _, user_id, code, occurred_at, category, expiry_date, date_added in rows:
+            kind = kinds[code]
+            moment = expiry_date if kind == "expired" else occurred_at
+            total = totals[user_id, category, moment.date()]
+            total[kind] += 1
+            if kind in ("consumed", "discarded"):
+                left = expiry_date - occurred_at
+                total["lifetimes"] += 1
+                total["fridge_days"] += (occurred_at - date_added).days
+                total["days_left"] += left.days if left.days >= 0 else -(-left).days
+    return totals
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк аналитики порчи")
+    parser.add_argument("--events", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--database", default="sqlite://")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database})
+    with app.app_context():
+        upgrade_database(db.engine)
+        rows = event_rows(args.events, args.users, random.Random(args.seed))
+        _, seed_ms = timed(lambda: insert_rows(ProductEvent, rows))
+        db.session.commit()
+        print(f"Журнал: {args.events} событий, {args.users} пользователей, запись {seed_ms / 1000:.1f} с")
+
+        _, fetch_ms = timed(lambda: sum(len(rows) for rows in iter_events(columns=ANALYTICS_COLUMNS)))
+        print(f"Чтение журнала без обработки: {fetch_ms:.0f} мс")
+
+        (columns, categories), load_ms = timed(load_columns)
+        rollups, aggregate_ms = timed(lambda: aggregate(columns))
+        written, write_ms = timed(lambda: write_rollups(None, rollups, categories))
+        db.session.commit()
+        print(f"NumPy: чтение колонок {load_ms:.0f} мс, агрегация {aggregate_ms:.0f} мс, "
+              f"запись {written} строк итогов {write_ms:.0f} мс")
+
+        totals, python_ms = timed(python_rollups)
+        assert len(totals) == written
+        print(f"Цикл Python: чтение и агрегация {python_ms:.0f} мс, без чтения {python_ms - fetch_ms:.0f} мс "
+              f"(NumPy: {load_ms + aggregate_ms:.0f} и {load_ms + aggregate_ms - fetch_ms:.0f} мс)")
+
+        sample = random.Random(args.seed).sample(range(1, args.users + 1), min(50, args.users))
+        rebuild = []
+        report = []
+        for user_id in sample:
+            rebuild.append(timed(lambda: rebuild_rollups([user_id]))[1])
+            db.session.commit()
+            report.append(timed(lambda: waste_report(user_id))[1])
+        print(f"Пересчет одного пользователя: медиана {st.median(rebuild):.1f} мс")
+        print(f"Раздел статистики из итогов: медиана {st.median(report):.2f} мс, "
+              f"строк итогов {db.session.query(WasteRollup).count()}")
+
+
+if __name__ == "__main__":
+    main()
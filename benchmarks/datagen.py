@@ -0,0 +1,97 @@
+"""
+Генератор синтетических данных: N пользователей x M продуктов и элементов списка покупок.
+
+Распределения сроков годности (дней от текущего момента):
+    uniform  - равномерно от -10 до 60
+    normal   - нормальное, среднее 10, отклонение 10
+    fresh    - почти все свежие: равномерно от 3 до 90
+    expired  - половина просрочена: равномерно от -30 до 30
+"""
+import random
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import Product, ShoppingItem, User
+from app.categories import rebuild_categories
+
+CATEGORIES = ("Молочные продукты", "Мясо", "Овощи", "Фрукты", "Бакалея", "Напитки",
+              "Замороженные продукты", "Готовые блюда", "Другое")
+UNITS = ("кг", "г", "л", "мл", "шт", "упаковка")
+NAMES = (
+    "Молоко", "Кефир", "Сыр", "Творог", "Сметана", "Йогурт", "Курица", "Говядина", "Свинина", "Фарш",
+    "Рыба", "Картофель", "Морковь", "Лук", "Капуста", "Свекла", "Помидоры", "Огурцы", "Кабачки", "Перец",
+    "Яблоки", "Груши", "Бананы", "Апельсины", "Лимоны", "Виноград", "Рис", "Гречка", "Макароны", "Мука",
+    "Хлеб", "Яйца", "Масло", "Сахар", "Ягоды", "Мороженое", "Сок", "Вода", "Пельмени", "Пицца",
+)
+DISTRIBUTIONS = {
+    "uniform": lambda rng: rng.uniform(-10, 60),
+    "normal": lambda rng: rng.gauss(10, 10),
+    "fresh": lambda rng: rng.uniform(3, 90),
+    "expired": lambda rng: rng.uniform(-30, 30),
+}
+BATCH_SIZE = 10_000
+PASSWORD = "benchmark"
+
+
+def product_rows(user_id, count, rng, distribution="uniform", now=None):
+    now = now or datetime.utcnow()
+    expiry_days = DISTRIBUTIONS[distribution]
+    for i in range(count):
+        yield {
+            "name": f"{rng.choice(NAMES)} {i % 50}",
+            "category": rng.choice(CATEGORIES),
+            "quantity": round(rng.uniform(0.1, 5), 1),
+            "unit": rng.choice(UNITS),
+            "expiry_date": now + timedelta(days=expiry_days(rng)),
+            "date_added": now - timedelta(days=rng.uniform(0, 90)),
+            "user_id": user_id,
+        }
+
+
+def item_rows(user_id, count, rng, now=None):
+    now = now or datetime.utcnow()
+    for i in range(count):
+        yield {
+            "name": f"{rng.choice(NAMES)} {i % 50}",
+            "category": rng.choice(CATEGORIES),
+            "quantity": rng.choice((None, 1, 2, 0.5)),
+            "unit": rng.choice(UNITS),
+            "priority": rng.randint(1, 3),
+            "is_purchased": rng.random() < 0.3,
+            "date_added": now - timedelta(days=rng.uniform(0, 30)),
+            "user_id": user_id,
+        }
+
+
+def insert_rows(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(db.insert(model), batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+
+
+def generate(users=1, products=1000, items=100, distribution="uniform", seed=42, prefix="bench"):
+    """
+    Создает пользователей с продуктами и списками покупок (внутри app context)
+
+    Returns:
+        list: (id, username) созданных пользователей; пароль у всех PASSWORD
+    """
+    rng = random.Random(seed)
+    password_hash = generate_password_hash(PASSWORD)
+    created = []
+    for number in range(users):
+        username = f"{prefix}{number}"
+        user = User(username=username, email=f"{username}@example.com", password_hash=password_hash)
+        db.session.add(user)
+        db.session.flush()
+        insert_rows(Product, product_rows(user.id, products, rng, distribution))
+        rebuild_categories(user.id)
+        insert_rows(ShoppingItem, item_rows(user.id, items, rng))
+        created.append((user.id, username))
+    db.session.commit()
+    return created
@@ -0,0 +1,206 @@
+"""
+Открытые потоки /api/events под gunicorn: воркеры gevent и gthread.
+
+Запускает gunicorn с gunicorn.conf.py на временной базе SQLite (один
+воркер: брокер local раздает сообщения подписчикам своего процесса),
+открывает --streams потоков событий одного пользователя и измеряет:
+сколько потоков принято (остальные получают 503), память воркера,
+p50/p95 обычного запроса (--path) при открытых потоках и время, за которое
+дельта после записи в список покупок доходит до всех потоков.
+
+    python -m benchmarks.events [--streams 2000] [--modes gevent,gthread]
+"""
+import argparse
+import http.client
+import json
+import os
+import selectors
+import signal
+import socket
+import statistics as st
+import subprocess
+import sys
+import tempfile
+import time
+from app import create_app, db
+from app.migrations import upgrade_database
+from benchmarks.datagen import PASSWORD, generate
+from benchmarks.views import percentile
+
+HOST = "127.0.0.1"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def seed(uri):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri, "PASSWORD_HASH_WORKERS": 0})
+    with app.app_context():
+        upgrade_database(db.engine)
+        (_, username), = generate(users=1, products=200, items=20, prefix="events")
+    return username
+
+
+def start_server(uri, port, mode):
+    env = dict(
+        os.environ,
+        GUNICORN_WORKER_CLASS=mode,
+        GUNICORN_WORKERS="1",
+        GUNICORN_BIND=f"{HOST}:{port}",
+        GUNICORN_WORKER_CONNECTIONS="10000",
+        LOGIN_IP_BURST="0",
+        LOGIN_ACCOUNT_BURST="0",
+    )
+    factory = f"app:create_app({{'SQLALCHEMY_DATABASE_URI': {uri!r}}})"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", factory],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("gunicorn не запустился")
+
+
+def worker_rss_mb(master_pid):
+    # Память воркеров (дочерних процессов мастера) из /proc
+    total = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                status = dict(line.split(":", 1) for line in f if ":" in line)
+        except OSError:
+            continue
+        if int(status["PPid"]) == master_pid:
+            total += int(status.get("VmRSS", "0 kB").split()[0])
+    return total / 1024
+
+
+def login(port, username):
+    connection = http.client.HTTPConnection(HOST, port)
+    connection.request(
+        "POST", "/login", body=f"username_or_email={username}&password={PASSWORD}",
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    response = connection.getresponse()
+    response.read()
+    cookie = response.getheader("Set-Cookie").split(";", 1)[0]
+    connection.close()
+    return cookie
+
+
+def open_streams(port, cookie, count):
+    request = f"GET /api/events HTTP/1.1\r\nHost: {HOST}\r\nCookie: {cookie}\r\n\r\n".encode()
+    sockets, rejected = [], 0
+    for _ in range(count):
+        sock = socket.create_connection((HOST, port))
+        sock.sendall(request)
+        sockets.append(sock)
+    accepted = []
+    for sock in sockets:
+        sock.settimeout(10)
+        try:
+            head = sock.recv(4096)
+        except socket.timeout:
+            head = b""
+        if head.startswith(b"HTTP/1.1 200"):
+            accepted.append(sock)
+        else:
+            rejected += 1
+            sock.close()
+    return accepted, rejected
+
+
+def request_timings(port, cookie, path, count):
+    connection = http.client.HTTPConnection(HOST, port, timeout=30)
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        connection.request("GET", path, headers={"Cookie": cookie})
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200, response.status
+        timings.append((time.perf_counter() - start) * 1000)
+    connection.close()
+    return timings
+
+
+def delivery_time(port, cookie, streams, timeout=30):
+    selector = selectors.DefaultSelector()
+    for sock in streams:
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ)
+    connection = http.client.HTTPConnection(HOST, port)
+    start = time.perf_counter()
+    connection.request(
+        "POST", "/api/shopping_items", body=json.dumps({"name": "Молоко"}),
+        headers={"Cookie": cookie, "Content-Type": "application/json"},
+    )
+    connection.getresponse().read()
+    waiting = set(streams)
+    while waiting and time.perf_counter() - start < timeout:
+        for key, _ in selector.select(timeout=1):
+            if b"event: change" in key.fileobj.recv(65536):
+                waiting.discard(key.fileobj)
+                selector.unregister(key.fileobj)
+    selector.close()
+    return (time.perf_counter() - start) * 1000, len(streams) - len(waiting)
+
+
+def run(uri, username, mode, streams, path, requests):
+    port = free_port()
+    server = start_server(uri, port, mode)
+    try:
+        cookie = login(port, username)
+        idle_rss = worker_rss_mb(server.pid)
+        accepted, rejected = open_streams(port, cookie, streams)
+        time.sleep(1)
+        rss = worker_rss_mb(server.pid)
+        timings = request_timings(port, cookie, path, requests)
+        delivered_ms, delivered = delivery_time(port, cookie, accepted)
+        print(f"{mode}: принято потоков {len(accepted)}, отказов 503: {rejected}")
+        print(f"  память воркера {idle_rss:.0f} -> {rss:.0f} МБ "
+              f"({(rss - idle_rss) * 1024 / max(1, len(accepted)):.1f} КБ на поток)")
+        print(f"  {path} при открытых потоках: p50 {st.median(timings):.1f} мс, "
+              f"p95 {percentile(timings, 0.95):.1f} мс")
+        print(f"  дельта дошла до {delivered} потоков за {delivered_ms:.0f} мс")
+        for sock in accepted:
+            sock.close()
+    finally:
+        # По SIGTERM gunicorn ждет закрытия открытых потоков до graceful_timeout; бенчмарку ждать незачем
+        os.killpg(server.pid, signal.SIGKILL)
+        server.wait()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=2000, help="открыть потоков событий")
+    parser.add_argument("--modes", default="gevent,gthread", help="классы воркеров через запятую")
+    parser.add_argument("--path", default="/api/products")
+    parser.add_argument("--requests", type=int, default=100, help="обычных запросов при открытых потоках")
+    args = parser.parse_args(argv[1:])
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    uri = f"sqlite:///{path}"
+    try:
+        username = seed(uri)
+        for mode in args.modes.split(","):
+            run(uri, username, mode, args.streams, args.path, args.requests)
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
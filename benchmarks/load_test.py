@@ -0,0 +1,125 @@
+"""
+Нагрузочный тест запросов авторизованного пользователя.
+
+По умолчанию запускает приложение в процессе (SQLite во временном файле)
+и сравнивает запросы/сек и число SQL-запросов на запрос без кэша
+пользователя (USER_CACHE_TTL=0) и с ним:
+
+    python -m benchmarks.load_test [--requests 500] [--path /api/products]
+
+Против запущенного сервера (например, gunicorn) с конкурентностью:
+
+    python -m benchmarks.load_test --url http://localhost:5000 --user admin --password ... --concurrency 16
+"""
+import argparse
+import http.cookiejar
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import create_app, db, user_cache
+from app.migrations import upgrade_database
+from app.models import Product, User
+
+
+def seed(app):
+    with app.app_context():
+        upgrade_database(db.engine)
+        user = User(username="load", email="load@example.com")
+        user.set_password("load")
+        db.session.add(user)
+        db.session.commit()
+        now = datetime.utcnow()
+        db.session.add_all(
+            Product(name=f"Продукт {i}", category="Другое", quantity=1, unit="шт",
+                    expiry_date=now + timedelta(days=i % 20 - 5), user_id=user.id)
+            for i in range(50)
+        )
+        db.session.commit()
+
+
+def run_in_process(uri, path, requests, cache_ttl):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri, "USER_CACHE_TTL": cache_ttl})
+    user_cache.clear()
+    client = app.test_client()
+    client.post("/login", data={"username_or_email": "load", "password": "load"})
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        start = time.perf_counter()
+        for _ in range(requests):
+            response = client.get(path)
+            assert response.status_code == 200, response.status_code
+        elapsed = time.perf_counter() - start
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return requests / elapsed, statements[0] / requests
+
+
+def run_remote(url, path, user, password, requests, concurrency):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    opener.open(url + "/login", urllib.parse.urlencode({"username_or_email": user, "password": password}).encode())
+
+    remaining = [requests]
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            opener.open(url + path).read()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return requests / (time.perf_counter() - start)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--path", default="/api/products")
+    parser.add_argument("--url", help="адрес запущенного сервера")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument("--password", default="")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv[1:])
+
+    if args.url:
+        rps = run_remote(args.url.rstrip("/"), args.path, args.user, args.password, args.requests, args.concurrency)
+        print(f"{args.url}{args.path}: {rps:.1f} запросов/сек (конкурентность {args.concurrency})")
+        return 0
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    uri = f"sqlite:///{path}"
+    try:
+        seed(create_app({"SQLALCHEMY_DATABASE_URI": uri}))
+        for label, ttl in (("без кэша пользователя", 0), ("с кэшем пользователя", 60)):
+            rps, queries = run_in_process(uri, args.path, args.requests, ttl)
+            print(f"{label:>24}: {rps:8.1f} запросов/сек, {queries:.2f} SQL-запросов на запрос")
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,120 @@
+"""
+Вход под конкурентной нагрузкой: хэширование паролей в потоке запроса и в пуле.
+
+Потоки входа непрерывно отправляют POST /login, а параллельно потоки
+авторизованного пользователя запрашивают легкий маршрут (--path). Для каждого
+режима выводятся пропускная способность и p50/p95 входа, число отказов 503 при
+заполненной очереди и задержка легкого маршрута во время всплеска входов.
+Лимиты попыток входа отключены, кроме режима --stuffing (перебор паролей
+с одного IP-адреса).
+
+    python -m benchmarks.login [--logins 16] [--others 4] [--seconds 5]
+"""
+import argparse
+import os
+import statistics as st
+import sys
+import tempfile
+import threading
+import time
+from app import create_app, db
+from app.migrations import upgrade_database
+from app.models import User
+from benchmarks.views import percentile
+
+PASSWORD = "benchmark"
+
+
+def seed(uri):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri, "PASSWORD_HASH_WORKERS": 0})
+    with app.app_context():
+        upgrade_database(db.engine)
+        user = User(username="login", email="login@example.com")
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+
+def run(uri, path, logins, others, seconds, password=PASSWORD, **config):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": uri, "PAGE_CACHE_MAX_BYTES": 0,
+        "LOGIN_IP_BURST": 0, "LOGIN_ACCOUNT_BURST": 0, **config,
+    })
+    login_timings, other_timings, statuses = [], [], {}
+    lock = threading.Lock()
+
+    def login_worker():
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.post("/login", data={"username_or_email": "login", "password": password})
+            with lock:
+                login_timings.append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    def other_worker(client):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = client.get(path)
+            assert response.status_code == 200, response.status_code
+            with lock:
+                other_timings.append((time.perf_counter() - start) * 1000)
+
+    clients = []
+    for _ in range(others):
+        client = app.test_client()
+        client.post("/login", data={"username_or_email": "login", "password": PASSWORD})
+        clients.append(client)
+    deadline = time.perf_counter() + seconds
+    threads = [threading.Thread(target=login_worker) for _ in range(logins)]
+    threads += [threading.Thread(target=other_worker, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return login_timings, other_timings, statuses
+
+
+def report(label, seconds, login_timings, other_timings, statuses):
+    accepted = sum(count for status, count in statuses.items() if status < 400)
+    print(f"{label}:")
+    print(f"  вход: {accepted / seconds:7.1f}/с без отказа, p50 {st.median(login_timings):7.1f} мс, "
+          f"p95 {percentile(login_timings, 0.95):7.1f} мс, ответы {dict(sorted(statuses.items()))}")
+    if other_timings:
+        print(f"  легкий маршрут: {len(other_timings) / seconds:7.1f}/с, p50 {st.median(other_timings):7.1f} мс, "
+              f"p95 {percentile(other_timings, 0.95):7.1f} мс")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=16, help="потоков входа")
+    parser.add_argument("--others", type=int, default=4, help="потоков легкого маршрута")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--path", default="/api/products")
+    parser.add_argument("--workers", type=int, default=2, help="PASSWORD_HASH_WORKERS для режима пула")
+    parser.add_argument("--queue", type=int, default=8, help="PASSWORD_HASH_QUEUE для режима пула")
+    parser.add_argument("--stuffing", action="store_true", help="добавить перебор паролей с лимитами по умолчанию")
+    args = parser.parse_args(argv[1:])
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    uri = f"sqlite:///{path}"
+    try:
+        seed(uri)
+        common = (uri, args.path, args.logins, args.others, args.seconds)
+        report("хэширование в потоке запроса", args.seconds, *run(*common, PASSWORD_HASH_WORKERS=0))
+        report(f"пул {args.workers} потоков, очередь {args.queue}", args.seconds,
+               *run(*common, PASSWORD_HASH_WORKERS=args.workers, PASSWORD_HASH_QUEUE=args.queue))
+        if args.stuffing:
+            from app.config import Config
+            report("перебор паролей, лимиты по умолчанию", args.seconds, *run(
+                *common, password="wrong", PASSWORD_HASH_WORKERS=args.workers, PASSWORD_HASH_QUEUE=args.queue,
+                LOGIN_IP_BURST=Config.LOGIN_IP_BURST, LOGIN_ACCOUNT_BURST=Config.LOGIN_ACCOUNT_BURST,
+            ))
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
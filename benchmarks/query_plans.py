@@ -0,0 +1,118 @@
+"""
+Проверка планов запросов: основные запросы по product и shopping_item
+должны использовать составные индексы, а не полный просмотр таблицы.
+
+Запуск: python -m benchmarks.query_plans [DATABASE_URL]
+По умолчанию используется SQLite в памяти; для PostgreSQL выводится EXPLAIN.
+"""
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event, text
+from app import create_app, db
+from app.migrations import upgrade_database
+from app.models import Product, ShoppingItem, User, UserCategory
+from app.repository import ProductRepository
+from app.shopping import generate_from_low_stock
+from app.frequency import running_out, top_items
+from app.categories import category_cache, user_categories
+
+
+@contextmanager
+def capture_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "INSERT")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(conn, statement, parameters):
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+    return "\n".join(row[0] for row in rows)
+
+
+def seed(user_id, count=500):
+    now = datetime.utcnow()
+    db.session.add_all(
+        Product(
+            name=f"Продукт {i}",
+            category=f"Категория {i % 10}",
+            quantity=i % 5,
+            unit="шт",
+            expiry_date=now + timedelta(days=i % 30 - 10),
+            date_added=now - timedelta(days=i % 60),
+            user_id=user_id,
+        )
+        for i in range(count)
+    )
+    db.session.add_all(
+        ShoppingItem(name=f"Покупка {i}", priority=i % 3 + 1, is_purchased=bool(i % 2), user_id=user_id)
+        for i in range(count)
+    )
+    # Категории других пользователей: иначе на одном пользователе индекс по user_id не избирателен
+    db.session.add_all(
+        UserCategory(user_id=user_id + 1 + i // 10, name=f"Категория {i % 10}", product_count=1)
+        for i in range(count)
+    )
+    db.session.commit()
+    db.session.execute(text("ANALYZE"))
+
+
+def checks(user_id):
+    repo = ProductRepository(user_id)
+    return [
+        ("ProductRepository.page(expiry)", "ix_product_user_expiry", lambda: repo.page("expiry")),
+        ("ProductRepository.page(added)", "ix_product_user_added", lambda: repo.page("added")),
+        ("ProductRepository.expired", "ix_product_user_expiry", lambda: repo.expired(limit=10)),
+        ("ProductRepository.veterans", "ix_product_user_added", repo.veterans),
+        ("low stock products", "ix_product_user_quantity",
+         lambda: Product.query.filter(Product.user_id == user_id, Product.quantity < 2).all()),
+        ("unpurchased shopping items", "ix_shopping_item_user_status",
+         lambda: ShoppingItem.query.filter_by(user_id=user_id, is_purchased=False).all()),
+        ("generate_from_low_stock: NOT EXISTS", "ix_shopping_item_user_lower_name",
+         lambda: generate_from_low_stock(user_id)),
+        ("frequency.top_items", "ix_item_frequency_user_score", lambda: top_items(user_id)),
+        ("frequency.running_out", "ix_item_frequency_user_restock", lambda: running_out(user_id)),
+        ("product by name", "ix_product_user_lower_name",
+         lambda: Product.query.filter(Product.user_id == user_id, db.func.lower(Product.name) == "молоко").all()),
+        ("user categories", "ix_user_category_user_name",
+         lambda: (category_cache.clear(), user_categories(user_id))),
+    ]
+
+
+def main(argv):
+    uri = argv[1] if len(argv) > 1 else "sqlite://"
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    failures = 0
+    with app.app_context():
+        upgrade_database(db.engine)
+        user = User(username="plan", email="plan@example.com", password_hash="-")
+        db.session.add(user)
+        db.session.commit()
+        seed(user.id)
+
+        for name, index, run in checks(user.id):
+            with capture_statements(db.engine) as statements:
+                run()
+            with db.engine.connect() as conn:
+                plan = "\n".join(explain(conn, s, p) for s, p in statements)
+            ok = index in plan
+            failures += not ok
+            print(f"[{'OK' if ok else 'FAIL'}] {name}: ожидается {index}")
+            if not ok:
+                print("    " + plan.replace("\n", "\n    "))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,71 @@
+"""
+Бенчмарк подбора рецептов: тысячи рецептов против сотен продуктов.
+
+Запуск: python -m benchmarks.recipes [число рецептов] [число продуктов]
+"""
+import random
+import statistics as st
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+from app.recipes import Recipe, RecipeCatalogue
+
+CATEGORIES = ("Молочные продукты", "Мясо", "Овощи", "Фрукты", "Бакалея", "Напитки",
+              "Замороженные продукты", "Готовые блюда", "Другое")
+WORDS = [
+    "молоко", "кефир", "сыр", "творог", "сметана", "йогурт", "курица", "говядина", "свинина", "фарш",
+    "рыба", "картофель", "морковь", "лук", "капуста", "свекла", "помидоры", "огурцы", "кабачки", "перец",
+    "яблоки", "груши", "банан", "апельсин", "лимон", "виноград", "рис", "гречка", "макароны", "мука",
+    "хлеб", "яйца", "масло", "сахар", "соль", "ягоды", "мороженое", "сок", "чай", "кофе",
+]
+Product = namedtuple("Product", "name category expiry_date")
+
+
+def make_catalogue(count, rng):
+    return RecipeCatalogue(
+        Recipe(
+            name=f"Рецепт {i}",
+            categories=rng.sample(CATEGORIES, rng.randint(1, 3)),
+            ingredients=rng.sample(WORDS, rng.randint(2, 6)),
+        )
+        for i in range(count)
+    )
+
+
+def make_products(count, rng, now):
+    return [
+        Product(
+            f"{rng.choice(WORDS).capitalize()} {i}",
+            rng.choice(CATEGORIES),
+            now + timedelta(days=rng.randint(0, 30)),
+        )
+        for i in range(count)
+    ]
+
+
+def main(argv):
+    recipes = int(argv[1]) if len(argv) > 1 else 5000
+    products_count = int(argv[2]) if len(argv) > 2 else 300
+    rng = random.Random(42)
+    now = datetime.utcnow()
+
+    start = time.perf_counter()
+    catalogue = make_catalogue(recipes, rng)
+    build_ms = (time.perf_counter() - start) * 1000
+    products = make_products(products_count, rng, now)
+
+    timings = []
+    for _ in range(50):
+        start = time.perf_counter()
+        catalogue.suggest(products, now=now)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+
+    print(f"рецептов: {recipes}, продуктов: {products_count}")
+    print(f"построение индекса: {build_ms:.1f} мс (один раз на процесс)")
+    print(f"подбор: p50 {st.median(timings):.2f} мс, p95 {timings[int(len(timings) * 0.95) - 1]:.2f} мс")
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,100 @@
+"""
+Бенчмарк поиска названий продуктов (/api/products/search) на 100 000 продуктов пользователя.
+
+Запросы - префиксы названий от 1 до 6 букв и названия с опечаткой (нечеткий
+поиск). Измеряется полный запрос через тестовый клиент Flask: p50/p95 при
+построенном индексе (цель - p95 < 20 мс) и время первого запроса после
+изменения продуктов (построение индекса в памяти на SQLite).
+
+    python -m benchmarks.search [--products 100000] [--distinct] [--db postgresql://...]
+"""
+import argparse
+import os
+import random
+import statistics as st
+import sys
+import tempfile
+import time
+from app import create_app, db
+from app.migrations import upgrade_database
+from app.search import index_cache, use_trigram_index
+from benchmarks.datagen import NAMES, PASSWORD, generate
+from benchmarks.views import percentile
+
+TARGET_P95_MS = 20
+
+
+def typo(word, rng):
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice("абвгдеклмнопрст") + word[position + 1:]
+
+
+def queries(count, rng):
+    for _ in range(count):
+        name = rng.choice(NAMES).lower()
+        if rng.random() < 0.7:
+            yield name[:rng.randint(1, min(6, len(name)))]
+        else:
+            yield typo(name, rng)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска названий продуктов")
+    parser.add_argument("--db", help="URI базы (по умолчанию временный файл SQLite)")
+    parser.add_argument("--products", type=int, default=100_000, help="продуктов у пользователя")
+    parser.add_argument("--distinct", action="store_true", help="все названия разные (худший случай для индекса)")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args(argv[1:])
+
+    path = None
+    uri = args.db
+    if uri is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        uri = f"sqlite:///{path}"
+    try:
+        app = create_app({"SQLALCHEMY_DATABASE_URI": uri, "LOGIN_IP_BURST": 0, "LOGIN_ACCOUNT_BURST": 0})
+        with app.app_context():
+            upgrade_database(db.engine)
+            (user_id, username), _ = generate(users=2, products=args.products, items=0, prefix="search")
+            if args.distinct:
+                db.session.execute(
+                    db.text("UPDATE product SET name = name || ' #' || id WHERE user_id = :user_id"),
+                    {"user_id": user_id},
+                )
+                db.session.commit()
+            backend = "pg_trgm" if use_trigram_index() else "индекс в памяти"
+
+        client = app.test_client()
+        client.post("/login", data={"username_or_email": username, "password": PASSWORD})
+
+        def search(query):
+            start = time.perf_counter()
+            response = client.get("/api/products/search", query_string={"q": query})
+            elapsed = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200, response.status_code
+            return elapsed, len(response.get_json()["results"])
+
+        index_cache.clear()
+        cold, _ = search("мол")
+        rng = random.Random(42)
+        timings, found = [], []
+        for query in queries(args.queries, rng):
+            elapsed, count = search(query)
+            timings.append(elapsed)
+            found.append(count)
+
+        p95 = percentile(timings, 0.95)
+        print(f"{args.products} продуктов ({'разные названия' if args.distinct else 'повторяющиеся названия'}), "
+              f"{backend}")
+        print(f"первый запрос (построение индекса): {cold:.1f} мс")
+        print(f"p50 {st.median(timings):.2f} мс, p95 {p95:.2f} мс, в среднем результатов {st.mean(found):.1f}")
+        print(f"цель p95 < {TARGET_P95_MS} мс: {'OK' if p95 < TARGET_P95_MS else 'ПРЕВЫШЕНО'}")
+    finally:
+        if path:
+            os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
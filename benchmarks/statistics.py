@@ -0,0 +1,75 @@
+"""
+Бенчмарк страницы статистики: рост задержки от 100 до 100 000 продуктов.
+
+Сравниваются прежний подход (загрузка всех Product и подсчет в Python),
+агрегаты в SQL (app.stats.get_statistics без кэша) и чтение из кэша.
+
+Запуск: python -m benchmarks.statistics [DATABASE_URL]
+"""
+import random
+import statistics as st
+import sys
+import time
+from app import create_app, db
+from app.migrations import upgrade_database
+from app.models import Product, User
+from app.categories import rebuild_categories
+from app.stats import get_statistics, stats_cache
+from benchmarks.datagen import insert_rows, product_rows
+
+SIZES = (100, 1_000, 10_000, 100_000)
+
+
+def seed_products(user_id, count, rng):
+    insert_rows(Product, product_rows(user_id, count, rng))
+    rebuild_categories(user_id)
+    db.session.commit()
+
+
+def legacy_statistics(user_id):
+    products = Product.query.filter_by(user_id=user_id).all()
+    longest_living = sorted(products, key=lambda x: x.days_in_fridge(), reverse=True)
+    categories = {}
+    for product in products:
+        categories[product.category] = categories.get(product.category, 0) + 1
+    return longest_living, categories
+
+
+def measure(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return st.median(timings)
+
+
+def uncached(user_id):
+    stats_cache.clear()
+    return get_statistics(user_id)
+
+
+def main(argv):
+    uri = argv[1] if len(argv) > 1 else "sqlite://"
+    app = create_app({"SQLALCHEMY_DATABASE_URI": uri})
+    rng = random.Random(42)
+    print(f"{'products':>10} {'legacy, ms':>12} {'sql, ms':>10} {'cached, ms':>11}")
+    with app.app_context():
+        upgrade_database(db.engine)
+        for size in SIZES:
+            user = User(username=f"bench{size}", email=f"bench{size}@example.com", password_hash="-")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            seed_products(user_id, size, rng)
+
+            legacy = measure(lambda: legacy_statistics(user_id), repeat=3 if size >= 100_000 else 5)
+            sql = measure(lambda: uncached(user_id))
+            get_statistics(user_id)
+            cached = measure(lambda: get_statistics(user_id))
+            print(f"{size:>10} {legacy:>12.2f} {sql:>10.2f} {cached:>11.4f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
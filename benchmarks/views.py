@@ -0,0 +1,170 @@
+"""
+Бенчмарк основных страниц через тестовый клиент Flask.
+
+Создает синтетические данные (benchmarks/datagen.py), прогоняет index,
+statistics, shopping_list, generate_shopping_list и вход в систему и
+сообщает p50/p95 задержки, число SQL-запросов на запрос и пиковое
+выделение памяти. Результаты сохраняются в JSON для сравнения коммитов:
+
+    python -m benchmarks.views --products 5000 --output before.json
+    python -m benchmarks.views --products 5000 --output after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics as st
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import event
+from app import create_app, db, user_cache
+from app.migrations import upgrade_database
+from app.stats import stats_cache
+from benchmarks.datagen import DISTRIBUTIONS, PASSWORD, generate
+
+VIEWS = {
+    "index": ("GET", "/"),
+    "statistics": ("GET", "/statistics"),
+    "shopping_list": ("GET", "/shopping_list"),
+    "generate_shopping_list": ("GET", "/generate_shopping_list"),
+    "login": ("POST", "/login"),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def call(client, method, path, username):
+    if method == "POST":
+        return client.post(path, data={"username_or_email": username, "password": PASSWORD})
+    return client.get(path)
+
+
+def bench_view(engine, client, username, method, path, iterations):
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    timings = []
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for _ in range(iterations):
+            # Кэш статистики сбрасывается: измеряется построение страницы, а не попадание в кэш
+            stats_cache.clear()
+            start = time.perf_counter()
+            response = call(client, method, path, username)
+            timings.append((time.perf_counter() - start) * 1000)
+            assert response.status_code < 400, f"{path}: {response.status_code}"
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    stats_cache.clear()
+    tracemalloc.start()
+    call(client, method, path, username)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "p50_ms": round(st.median(timings), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "queries": statements[0] / iterations,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline):
+    print(f"\n{'view':<24} {'p50 было':>10} {'p50 стало':>10} {'изменение':>10}")
+    for view, result in results.items():
+        before = baseline.get("results", {}).get(view)
+        if not before:
+            continue
+        change = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+        print(f"{view:<24} {before['p50_ms']:>10.2f} {result['p50_ms']:>10.2f} {change:>+9.1f}%")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Бенчмарк основных страниц")
+    parser.add_argument("--db", help="URI базы (по умолчанию временный файл SQLite)")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--products", type=int, default=2000, help="продуктов на пользователя")
+    parser.add_argument("--items", type=int, default=200, help="элементов списка покупок на пользователя")
+    parser.add_argument("--distribution", choices=sorted(DISTRIBUTIONS), default="uniform")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--views", nargs="*", choices=sorted(VIEWS), default=list(VIEWS))
+    parser.add_argument("--page-cache", action="store_true", help="измерять с кэшем страниц (попадания)")
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--compare", help="JSON с результатами предыдущего прогона")
+    args = parser.parse_args(argv[1:])
+
+    path = None
+    uri = args.db
+    if uri is None:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        uri = f"sqlite:///{path}"
+
+    try:
+        # Повторные входы одного пользователя не должны упираться в лимит попыток
+        config = {"SQLALCHEMY_DATABASE_URI": uri, "LOGIN_IP_BURST": 0, "LOGIN_ACCOUNT_BURST": 0}
+        if not args.page_cache:
+            # По умолчанию измеряется построение страницы, а не попадание в кэш страниц
+            config["PAGE_CACHE_MAX_BYTES"] = 0
+        app = create_app(config)
+        with app.app_context():
+            upgrade_database(db.engine)
+            users = generate(args.users, args.products, args.items, args.distribution)
+            engine = db.engine
+
+        username = users[0][1]
+        client = app.test_client()
+        call(client, "POST", "/login", username)
+        user_cache.clear()
+
+        results = {}
+        for view in args.views:
+            method, url = VIEWS[view]
+            results[view] = bench_view(engine, client, username, method, url, args.iterations)
+            result = results[view]
+            print(f"{view:<24} p50 {result['p50_ms']:8.2f} мс  p95 {result['p95_ms']:8.2f} мс  "
+                  f"SQL {result['queries']:5.1f}  память {result['peak_kb']:9.1f} КБ")
+    finally:
+        if path:
+            os.remove(path)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "database": uri.split(":", 1)[0],
+            "users": args.users,
+            "products": args.products,
+            "items": args.items,
+            "distribution": args.distribution,
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
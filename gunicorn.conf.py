@@ -0,0 +1,35 @@
+# gunicorn.conf.py
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+threads = int(os.environ.get("GUNICORN_THREADS", 2))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# Приложение создается один раз в мастере, воркеры получают его через fork
+preload_app = True
+
+# gthread - поток на запрос; gevent - greenlet на соединение, тысячи открытых /api/events
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class == "gevent":
+    # Патчим до загрузки приложения (preload_app): блокировки и очереди модулей приложения
+    # создаются уже кооперативными, запросы psycopg2 не блокируют остальные greenlet'ы
+    from gevent import monkey
+
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
+    worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 1000))
+    # Часть соединений воркера остается обычным запросам
+    os.environ.setdefault("EVENTS_MAX_STREAMS", str(worker_connections * 9 // 10))
+else:
+    # Каждый поток событий занимает поток воркера: хотя бы один поток остается обычным запросам
+    os.environ.setdefault("EVENTS_MAX_STREAMS", str(max(0, threads - 1)))
+
+
+def post_fork(server, worker):
+    # Соединения пула, открытые в мастере, нельзя делить между процессами
+    from app import dispose_engines
+    from run import app
+
+    dispose_engines(app)
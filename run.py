@@ -1,7 +1,8 @@
 # run.py
-from app import create_app, db, models  
+from app import create_app
+from app.migrations import upgrade_database
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 from sqlalchemy_utils import database_exists, create_database
 
 db_user = os.environ.get("DB_USER", "postgres")
@@ -29,28 +30,14 @@ def init_db():
 
         db_engine = create_engine(database_uri)
 
-        with app.app_context():
-            try:
-                db.create_all()
-                print("Таблицы созданы через SQLAlchemy")
-            except Exception as e:
-                print(f"Ошибка при создании таблиц SQLAlchemy: {e}")
-
-        sql_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)), "db_init.sql"
-        )
-        if os.path.exists(sql_path):
-            with open(sql_path, "r", encoding="utf-8") as f:
-                sql_script = f.read()
-            try:
-                with db_engine.connect() as conn:
-                    conn.execute(text(sql_script))
-                    conn.commit()
-                print("База данных успешно инициализирована через SQL-скрипт!")
-            except Exception as e:
-                print(f"Ошибка при выполнении SQL-скрипта: {e}")
-        else:
-            print(f"Файл инициализации БД не найден: {sql_path}")
+        try:
+            applied = upgrade_database(db_engine)
+            if applied:
+                print(f"Применены миграции: {', '.join(map(str, applied))}")
+            else:
+                print("Схема базы данных актуальна")
+        except Exception as e:
+            print(f"Ошибка при применении миграций: {e}")
 
     except Exception as e:
         print(f"Ошибка при инициализации базы данных: {e}")
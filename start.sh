@@ -4,5 +4,8 @@ set -e
 # Ожидаем доступности PostgreSQL
 wait-for-it.sh db:5432 -t 60
 
+# Создаем базу и применяем миграции
+python -c "from run import init_db; init_db()"
+
 # Запускаем приложение
-python run.py 
\ No newline at end of file
+exec gunicorn -c gunicorn.conf.py run:app
@@ -0,0 +1,90 @@
+"""Сканер сроков годности (app/notifications.py) с фиктивными часами."""
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.migrations import upgrade_database
+from app.models import Notification, Product, User
+from app.notifications import ExpiryScanner
+
+START = datetime(2026, 1, 10, 12)
+
+
+class ExpiryScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "PASSWORD_HASH_WORKERS": 0})
+        self.context = self.app.app_context()
+        self.context.push()
+        upgrade_database(db.engine)
+        db.session.add(User(username="user", email="user@example.com", password_hash="-"))
+        db.session.commit()
+        self.now = START
+        self.scanner = ExpiryScanner(expiring_days=3, clock=lambda: self.now, batch_size=1)
+
+    def tearDown(self):
+        db.session.remove()
+        self.context.pop()
+
+    def add_product(self, name, expiry_date, date_added):
+        product = Product(name=name, category="Другое", quantity=1, unit="шт",
+                          expiry_date=expiry_date, date_added=date_added, user_id=1)
+        db.session.add(product)
+        db.session.commit()
+        return product.id
+
+    def notified(self):
+        return {(n.product_id, n.kind) for n in Notification.query}
+
+    def test_expiring_and_expired(self):
+        expiring = self.add_product("Молоко", START + timedelta(hours=12), START - timedelta(days=5))
+        later = self.add_product("Сыр", START + timedelta(days=5), START - timedelta(days=5))
+        self.add_product("Крупа", START + timedelta(days=60), START - timedelta(days=5))
+        self.assertEqual(self.scanner.run(), {"expired": 0, "expiring": 1})
+
+        self.now += timedelta(days=3)
+        self.assertEqual(self.scanner.run(), {"expired": 1, "expiring": 1})
+        self.assertEqual(self.notified(), {(expiring, "expiring"), (expiring, "expired"), (later, "expiring")})
+        # Повторный проход ничего не дублирует
+        self.assertEqual(self.scanner.run(), {"expired": 0, "expiring": 0})
+
+    def test_expiry_date_edited_into_horizon(self):
+        product_id = self.add_product("Йогурт", START + timedelta(days=30), START - timedelta(days=2))
+        self.assertEqual(self.scanner.run(), {"expired": 0, "expiring": 0})
+
+        self.now += timedelta(hours=1)
+        db.session.get(Product, product_id).expiry_date = self.now + timedelta(days=1)
+        db.session.commit()
+        self.now += timedelta(hours=1)
+        self.assertEqual(self.scanner.run(), {"expired": 0, "expiring": 1})
+
+        # Срок сдвинули в прошлое - продукт уже истек
+        self.now += timedelta(hours=1)
+        db.session.get(Product, product_id).expiry_date = self.now - timedelta(hours=2)
+        db.session.commit()
+        self.now += timedelta(hours=1)
+        self.assertEqual(self.scanner.run(), {"expired": 1, "expiring": 0})
+
+    def test_import_with_old_date_added(self):
+        self.scanner.run()
+        self.now += timedelta(hours=1)
+        # Импорт: дата добавления из файла раньше прошлого прохода
+        expiring = self.add_product("Творог", self.now + timedelta(days=2), START - timedelta(days=10))
+        expired = self.add_product("Кефир", self.now - timedelta(hours=3), START - timedelta(days=10))
+        self.now += timedelta(hours=1)
+        self.assertEqual(self.scanner.run(), {"expired": 1, "expiring": 1})
+        self.assertEqual(self.notified(), {(expiring, "expiring"), (expired, "expired")})
+
+    def test_long_expired_products_are_skipped(self):
+        self.add_product("Хлеб", START - timedelta(days=30), START - timedelta(days=40))
+        self.assertEqual(self.scanner.run(), {"expired": 0, "expiring": 0})
+
+    def test_downtime_longer_than_lookback(self):
+        self.scanner.run()
+        product_id = self.add_product("Сметана", START + timedelta(days=4), START)
+        # Воркер не работал неделю: окно истекших начинается с прошлого прохода
+        self.now += timedelta(days=7)
+        self.assertEqual(self.scanner.run(), {"expired": 1, "expiring": 0})
+        self.assertEqual(self.notified(), {(product_id, "expired")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+"""Постраничный вывод продуктов (app/repository.py)."""
+import unittest
+from datetime import datetime, timedelta
+from app import create_app, db
+from app.migrations import upgrade_database
+from app.models import Product, User
+from app.repository import ProductRepository, decode_cursor
+
+NOW = datetime(2026, 1, 10, 12)
+
+
+class ProductPageTest(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app({"SQLALCHEMY_DATABASE_URI": "sqlite://", "PASSWORD_HASH_WORKERS": 0})
+        self.context = self.app.app_context()
+        self.context.push()
+        upgrade_database(db.engine)
+        db.session.add(User(username="user", email="user@example.com", password_hash="-"))
+        db.session.commit()
+        self.repo = ProductRepository(1, now=NOW)
+
+    def tearDown(self):
+        db.session.remove()
+        self.context.pop()
+
+    def add_products(self, dates_added):
+        products = [
+            Product(name=f"Продукт {i}", category="Другое", quantity=1, unit="шт",
+                    expiry_date=NOW + timedelta(days=i), date_added=date_added, user_id=1)
+            for i, date_added in enumerate(dates_added)
+        ]
+        db.session.add_all(products)
+        db.session.commit()
+        # Значение по умолчанию подставляется при вставке: NULL записываем явно
+        for product, date_added in zip(products, dates_added):
+            if date_added is None:
+                db.session.execute(db.update(Product).where(Product.id == product.id).values(date_added=None))
+        db.session.commit()
+        return [product.id for product in products]
+
+    def pages(self, order, limit):
+        ids, after = [], None
+        while True:
+            rows, after = self.repo.page(order=order, after=after, limit=limit)
+            ids.append([row.id for row in rows])
+            if after is None:
+                return ids
+
+    def test_added_order_with_null_date_added(self):
+        ids = self.add_products([
+            NOW - timedelta(days=3), None, NOW - timedelta(days=5), None, NOW - timedelta(days=1), None,
+        ])
+        # Сначала по дате добавления, затем строки без даты по id; граница страниц на NULL
+        expected = [ids[2], ids[0], ids[4], ids[1], ids[3], ids[5]]
+        for limit in (1, 2, 3, 4, 6, 10):
+            pages = self.pages("added", limit)
+            self.assertEqual([id for page in pages for id in page], expected, limit)
+            self.assertTrue(all(pages), limit)
+
+    def test_cursor_on_null_row(self):
+        ids = self.add_products([None, None, NOW])
+        rows, after = self.repo.page(order="added", limit=2)
+        self.assertEqual([row.id for row in rows], [ids[2], ids[0]])
+        self.assertEqual(decode_cursor(after), (None, ids[0]))
+        rows, after = self.repo.page(order="added", after=after, limit=2)
+        self.assertEqual(([row.id for row in rows], after), ([ids[1]], None))
+
+    def test_expiry_order(self):
+        ids = self.add_products([NOW] * 5)
+        self.assertEqual(self.pages("expiry", 2), [ids[:2], ids[2:4], ids[4:]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+# worker.py
+"""
+Фоновый воркер: уведомления о сроках годности, итоги аналитики порчи и архивация журнала событий.
+
+    python worker.py            # сканировать каждые NOTIFY_INTERVAL секунд
+    python worker.py --once     # один проход (например, из cron)
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from app import db
+from app.analytics import refresh_rollups
+from app.events import archive_events
+from app.notifications import ExpiryScanner
+from run import app
+
+interval = int(os.environ.get("NOTIFY_INTERVAL", "300"))
+expiring_days = int(os.environ.get("NOTIFY_EXPIRING_DAYS", "3"))
+archive_days = int(os.environ.get("EVENT_ARCHIVE_DAYS", "90"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воркер уведомлений о сроках годности")
+    parser.add_argument("--once", action="store_true", help="выполнить один проход и выйти")
+    parser.add_argument("--interval", type=int, default=interval, help="пауза между проходами, сек")
+    parser.add_argument("--days", type=int, default=expiring_days, help="горизонт 'скоро испортится', дней")
+    parser.add_argument("--archive-days", type=int, default=archive_days,
+                        help="переносить в архив события старше N дней (0 - не переносить)")
+    args = parser.parse_args()
+
+    scanner = ExpiryScanner(expiring_days=args.days)
+    while True:
+        with app.app_context():
+            try:
+                counts = scanner.run()
+                print(f"Уведомления: просрочено {counts['expired']}, скоро испортится {counts['expiring']}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"Ошибка при сканировании сроков годности: {e}")
+            try:
+                written = refresh_rollups()
+                if written:
+                    print(f"Аналитика порчи: обновлено строк итогов {written}")
+            except Exception as e:
+                db.session.rollback()
+                print(f"Ошибка при пересчете аналитики порчи: {e}")
+            if args.archive_days > 0:
+                try:
+                    archived = archive_events(datetime.utcnow() - timedelta(days=args.archive_days))
+                    if archived:
+                        print(f"Журнал событий: перенесено в архив {archived}")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Ошибка при архивации журнала событий: {e}")
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()